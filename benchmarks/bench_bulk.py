@@ -0,0 +1,106 @@
+"""Completing a selection of tasks one by one versus with one bulk update.
+
+Run from the repository root (no display needed):
+
+    python benchmarks/bench_bulk.py
+
+For each list size, completes the top BATCH tasks of the list shown in an
+offscreen list view, and times two things separately: updating the store,
+its sorted views and the list ("list"), and writing the changes with each
+storage backend. "one by one" makes one store call and one storage write
+per task, the way every edit was made before bulk operations; "bulk" makes
+one update_many() call, which the list sees as one reset, and one write.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+
+from focused_tasks.storage import JournalStorage, JsonStorage, SqliteStorage
+from focused_tasks.task_store import TaskStore
+from focused_tasks.ui.task_list import TaskListModel, TaskListView
+
+from common import make_tasks
+
+SIZES = [1_000, 10_000]
+BATCH = 500
+
+
+STORAGES = {
+    "json": lambda directory: JsonStorage(os.path.join(directory, "tasks.json")),
+    "journal": lambda directory: JournalStorage(os.path.join(directory, "tasks.snapshot.json"),
+                                                os.path.join(directory, "tasks.journal"), None),
+    "sqlite": lambda directory: SqliteStorage(os.path.join(directory, "tasks.db"), None),
+}
+
+
+def bench_list(app, n, bulk):
+    store = TaskStore(make_tasks(n, completed=0))
+    model = TaskListModel(store)
+    view = TaskListView()
+    view.setModel(model)
+    model.set_view(store.view("Priority"))
+    while model.rowCount() < min(BATCH, n):
+        model.fetchMore()
+    view.show()
+    app.processEvents()
+    ids = [model.task_at(row).id for row in range(BATCH)]
+
+    start = time.perf_counter()
+    if bulk:
+        store.update_many(ids, completed=True)
+    else:
+        for task_id in ids:
+            store.update(task_id, completed=True)
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    view.close()
+    return elapsed
+
+
+def bench_storage(storage, n, bulk):
+    tasks = make_tasks(n, completed=0)
+    storage.load()
+    storage.apply([("add", task) for task in tasks])
+    storage.sync()
+    changed = []
+    for task in tasks[:BATCH]:
+        task = task.copy()
+        task.completed = True
+        changed.append(("update", task))
+
+    start = time.perf_counter()
+    if bulk:
+        storage.apply(changed)
+    else:
+        for op in changed:
+            storage.apply([op])
+    storage.sync()
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return elapsed
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    print(f"Completing {BATCH} tasks")
+    print(f"{'tasks':>8} {'mode':>11} {'list':>10} {'json':>10} {'journal':>10} {'sqlite':>10}")
+    for n in SIZES:
+        for bulk in (False, True):
+            results = [bench_list(app, n, bulk)]
+            for create_storage in STORAGES.values():
+                with tempfile.TemporaryDirectory() as directory:
+                    results.append(bench_storage(create_storage(directory), n, bulk))
+            mode = "bulk" if bulk else "one by one"
+            print(f"{n:>8} {mode:>11} " + " ".join(f"{t * 1e3:>8.1f}ms" for t in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Filtering by tag, project and due date, indexed versus a scan.
+
+Run from the repository root:
+
+    python benchmarks/bench_filters.py [--tasks 100000]
+
+Builds a store of synthetic tasks with random tags, projects and due
+dates, then for each filter times TaskStore.search() from a cold cache
+(the FieldIndex is already built) against matching every task with
+TaskFilter.matches() and sorting the result, and checks both give the
+same tasks. "build" is the time to index all the tasks once, and "edit"
+the time to retag and reschedule 1000 of them through the store.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from focused_tasks.filters import FieldIndex, TaskFilter, day_start
+from focused_tasks.task import new_task_ids
+from focused_tasks.task_store import TaskStore, sort_key_for
+
+from common import make_tasks, timed
+
+TAGS = ["work", "home", "errand", "call", "read", "urgent", "later", "idea"]
+PROJECTS = ["acme", "garden", "taxes", "house", "trip", "blog"]
+FILTERS = [
+    "tag:work and due<=today and not completed",
+    "+taxes #urgent",
+    "due:tomorrow",
+    "#idea -#work pending",
+    "due>today due<=2100-01-01 +trip",
+]
+EDITS = 1000
+
+
+def make_tagged_tasks(n):
+    rnd = random.Random(n)
+    today = date.today()
+    tasks = make_tasks(n, new_task_ids(n), text="task {} to do before the weekend")
+    for task in tasks:
+        task.tags = tuple(rnd.sample(TAGS, rnd.randrange(3)))
+        task.project = rnd.choice(PROJECTS) if rnd.random() < 0.5 else None
+        if rnd.random() < 0.4:
+            task.due_at = day_start(today + timedelta(days=rnd.randrange(-30, 60)))
+    return tasks
+
+
+def scan(tasks, text, sort_method):
+    task_filter = TaskFilter(text)
+    return sorted(filter(task_filter.matches, tasks), key=sort_key_for(sort_method))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    args = parser.parse_args()
+
+    tasks = make_tagged_tasks(args.tasks)
+    _, build = timed(FieldIndex, tasks)
+    print(f"{args.tasks} tasks, build {build * 1000:.1f}ms")
+
+    store = TaskStore(tasks)
+    store.view("Priority")
+    store.search("", "Priority", "#work")
+    print(f"  {'filter':<44} {'matches':>8} {'indexed':>10} {'scan':>10}")
+    for text in FILTERS:
+        # A different sort method each time keeps the search cache cold
+        store.search("", "Alphabetical", "")
+        found, indexed = timed(store.search, "", "Priority", text)
+        expected, scanned = timed(scan, tasks, text, "Priority")
+        assert [task.id for task in found] == [task.id for task in expected], text
+        print(f"  {text:<44} {len(found):>8} {indexed * 1000:>8.2f}ms {scanned * 1000:>8.2f}ms")
+
+    rnd = random.Random(0)
+    edited = rnd.sample([task.id for task in tasks], EDITS)
+    start = time.perf_counter()
+    for task_id in edited:
+        store.update_many([task_id], tags=tuple(rnd.sample(TAGS, 2)),
+                          due_at=day_start(date.today() + timedelta(days=rnd.randrange(30))))
+    edit = time.perf_counter() - start
+    found = store.search("", "Priority", FILTERS[0])
+    assert [task.id for task in found] == [task.id for task in scan(tasks, FILTERS[0], "Priority")]
+    print(f"  edit {EDITS} tasks {edit * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Search index lookups and the filtered views built from them.
+
+Run from the repository root:
+
+    python benchmarks/bench_search.py
+
+Task texts are 3 to 8 words drawn from a vocabulary with a skewed (Zipf
+like) word frequency. For each list size, reports building the index,
+keeping it up to date per added or deleted task, and for queries of
+different selectivity: the index lookup alone, and the whole search,
+which also builds the sorted view of the matches the list shows.
+"""
+
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from focused_tasks.search import SearchIndex, tokenize
+from focused_tasks.task import Priority, Task
+from focused_tasks.task_store import TaskStore
+
+SIZES = [10_000, 100_000]
+VOCABULARY = 20_000
+QUERIES = 200
+
+
+def make_words(rnd):
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(3, 9))))
+    return sorted(words)
+
+
+def make_tasks(n, words, rnd, first_id=0):
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    priorities = list(Priority)
+    return [Task(first_id + i, " ".join(rnd.choices(words, weights, k=rnd.randint(3, 8))),
+                 rnd.random() < 0.3, rnd.choice(priorities), 1_700_000_000 + rnd.randrange(10**7))
+            for i in range(n)]
+
+
+def timed(function, queries):
+    start = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def bench(n, words):
+    rnd = random.Random(n)
+    tasks = make_tasks(n, words, rnd)
+
+    start = time.perf_counter()
+    index = SearchIndex(tasks)
+    build = time.perf_counter() - start
+
+    extra = make_tasks(1000, words, rnd, first_id=n)
+    start = time.perf_counter()
+    for task in extra:
+        index.add(task)
+    for task in extra:
+        index.remove(task.id)
+    maintain = (time.perf_counter() - start) / (2 * len(extra))
+
+    store = TaskStore(tasks)
+    store.view("Priority")
+    store.search(words[0], "Priority")
+
+    # A rare whole word, a common whole word, a two letter prefix and
+    # two words typed in part
+    kinds = {
+        "rare word": [rnd.choice(words[len(words) // 2:]) for _ in range(QUERIES)],
+        "common word": [rnd.choice(words[:20]) for _ in range(QUERIES)],
+        "prefix": [rnd.choice(words)[:2] for _ in range(QUERIES)],
+        "two words": [" ".join(word[:4] for word in rnd.sample(tokenize(task.text), 2))
+                      for task in rnd.choices(tasks, k=QUERIES)],
+    }
+    results = []
+    for kind, queries in kinds.items():
+        matches = sum(len(index.search(tokenize(query))) for query in queries) / QUERIES
+        lookup = timed(lambda query: index.search(tokenize(query)), queries)
+        # A different query every time, so that no search is cached
+        search = timed(lambda query: store.search(query, "Priority"), queries)
+        results.append((kind, matches, lookup, search))
+    return build, maintain, results
+
+
+def main():
+    rnd = random.Random(0)
+    words = make_words(rnd)
+    for n in SIZES:
+        build, maintain, results = bench(n, words)
+        print(f"{n} tasks: index built in {build * 1e3:.0f}ms, "
+              f"{maintain * 1e6:.1f}us per added or deleted task")
+        print(f"  {'query':<12} {'matches':>8} {'lookup':>10} {'search':>10}")
+        for kind, matches, lookup, search in results:
+            print(f"  {kind:<12} {matches:>8.0f} {lookup * 1e6:>8.1f}us {search * 1e6:>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
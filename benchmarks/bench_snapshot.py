@@ -0,0 +1,90 @@
+"""Journal snapshots as JSON versus the binary format, by compression.
+
+Run from the repository root:
+
+    python benchmarks/bench_snapshot.py [--sizes 10000,100000,1000000]
+
+Writes the same synthetic tasks as a tasks.snapshot.json style file and
+as binary snapshots (uncompressed, zlib, and zstd if the zstandard package
+is installed), then reports each file's size and the time to write it and
+to read every task back. "random" is the time for 10k reads of a single
+task at random positions from an open SnapshotReader, and "ids" the same
+for id_at(), which decodes nothing but the id.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from focused_tasks.recurrence import COMMON_RULES
+from focused_tasks.snapshot import SnapshotReader, read_snapshot, write_snapshot, zstandard
+from focused_tasks.storage import iter_json_array, write_json_tasks
+from focused_tasks.task import Task, new_task_ids
+
+from common import make_tasks, timed
+
+LOOKUPS = 10_000
+
+
+def make_recurring_tasks(n):
+    # One in twenty tasks recurs, due a day after it was created
+    rnd = random.Random(n)
+    rules = list(COMMON_RULES.values())
+    tasks = make_tasks(n, new_task_ids(n), text="task {} to do before the weekend")
+    for task in tasks:
+        if rnd.random() < 0.05:
+            task.recurrence = rnd.choice(rules)
+            task.next_at = task.created_at + 86400
+    return tasks
+
+
+def read_json(path):
+    return [Task.from_dict(task) for task in iter_json_array(path)]
+
+
+def bench_lookups(path, count):
+    rnd = random.Random(0)
+    rows = [rnd.randrange(count) for _ in range(LOOKUPS)]
+    with SnapshotReader(path) as reader:
+        _, lookups = timed(lambda: [reader[row] for row in rows])
+        _, ids = timed(lambda: [reader.id_at(row) for row in rows])
+    return lookups, ids
+
+
+def bench_size(count, directory):
+    tasks = make_recurring_tasks(count)
+    print(f"{count} tasks")
+    print(f"  {'format':<12} {'size':>10} {'write':>9} {'load':>9} {'random':>9} {'ids':>9}")
+
+    path = os.path.join(directory, "tasks.snapshot.json")
+    _, write = timed(write_json_tasks, path, tasks)
+    loaded, load = timed(read_json, path)
+    assert len(loaded) == count
+    print(f"  {'json':<12} {os.path.getsize(path) / 2**20:8.1f} MB {write:8.3f}s {load:8.3f}s")
+
+    compressions = ["none", "zlib"] + (["zstd"] if zstandard is not None else [])
+    for compression in compressions:
+        path = os.path.join(directory, f"tasks.snapshot.{compression}.bin")
+        _, write = timed(write_snapshot, path, tasks, compression)
+        loaded, load = timed(read_snapshot, path)
+        assert [task.to_dict() for task in loaded[:100]] == [task.to_dict() for task in tasks[:100]]
+        lookups, ids = bench_lookups(path, count)
+        print(f"  {'bin ' + compression:<12} {os.path.getsize(path) / 2**20:8.1f} MB "
+              f"{write:8.3f}s {load:8.3f}s {lookups:8.3f}s {ids:8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        for count in map(int, args.sizes.split(",")):
+            bench_size(count, directory)
+
+
+if __name__ == "__main__":
+    main()
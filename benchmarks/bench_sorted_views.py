@@ -0,0 +1,64 @@
+"""Cost of sort mode switches and edits with the store's sorted views.
+
+Run from the repository root:
+
+    python benchmarks/bench_sorted_views.py
+
+For each list size, reports the one-off cost of building a view, the cost
+of switching to an already built one, the per-edit cost of keeping all
+three views sorted, and a full sorted() of the list for comparison.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from focused_tasks.task import Priority
+from focused_tasks.task_store import SORT_METHODS, TaskStore, sort_key_for
+
+from common import make_tasks
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+EDITS = 2_000
+
+
+def bench(n):
+    store = TaskStore(make_tasks(n))
+    rnd = random.Random(0)
+
+    start = time.perf_counter()
+    for sort_method in SORT_METHODS:
+        store.view(sort_method)
+    build = (time.perf_counter() - start) / len(SORT_METHODS)
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        store.view(rnd.choice(SORT_METHODS))
+    switch = (time.perf_counter() - start) / 1000
+
+    ids = [task.id for task in rnd.choices(list(store), k=EDITS)]
+    start = time.perf_counter()
+    for task_id in ids:
+        store.update(task_id, priority=rnd.choice(list(Priority)), completed=rnd.random() < 0.5)
+    edit = (time.perf_counter() - start) / EDITS
+
+    start = time.perf_counter()
+    sorted(store, key=sort_key_for("Priority"))
+    full_sort = time.perf_counter() - start
+
+    return build, switch, edit, full_sort
+
+
+def main():
+    print(f"{'tasks':>10} {'build':>10} {'switch':>10} {'edit':>10} {'sorted()':>10}")
+    for n in SIZES:
+        build, switch, edit, full_sort = bench(n)
+        print(f"{n:>10} {build * 1e3:>8.1f}ms {switch * 1e6:>8.2f}us "
+              f"{edit * 1e6:>8.1f}us {full_sort * 1e3:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Startup time with a large task file, loaded up front versus streamed.
+
+Run from the repository root (no display needed):
+
+    python benchmarks/bench_startup.py
+
+Writes a journal snapshot of each size to a temporary directory and opens
+the app on it. "blocking" is the time the app used to spend before its
+window could show: reading every task and sorting them for the list.
+With the streaming load, "window" is the time until the window is shown,
+"first rows" until the top of the list is on screen and "loaded" until
+every task is in. "longest stall" is the longest the event loop went
+without running while the rest of the tasks were streamed in.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QElapsedTimer, QEventLoop, QTimer
+from PyQt6.QtWidgets import QApplication
+
+from focused_tasks.archive import TaskArchive
+from focused_tasks.storage import JournalStorage, write_json_tasks
+from focused_tasks.task_store import TaskStore
+from focused_tasks.ui.app import ModernTodoApp
+
+from common import make_tasks
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def journal_storage(directory):
+    return JournalStorage(os.path.join(directory, "tasks.snapshot.json"),
+                          os.path.join(directory, "tasks.journal"), None)
+
+
+def bench_blocking(directory):
+    start = time.perf_counter()
+    storage = journal_storage(directory)
+    TaskStore(storage.load()).view("Priority")
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return elapsed
+
+
+def bench_streamed(app, directory):
+    # Timer ticks show how long the event loop goes without running
+    ticks = QElapsedTimer()
+    stall = [0]
+
+    def tick():
+        stall[0] = max(stall[0], ticks.restart())
+
+    start = time.perf_counter()
+    # Archiving old completed tasks after the load is not measured
+    window = ModernTodoApp(journal_storage(directory),
+                           archive=TaskArchive(os.path.join(directory, "tasks.archive")),
+                           archive_after=float("inf"))
+    window.show()
+    shown = time.perf_counter() - start
+
+    timer = QTimer()
+    timer.timeout.connect(tick)
+    timer.start(1)
+    ticks.start()
+
+    # Wait for events like the app's own event loop does, instead of
+    # spinning and competing with the loader thread
+    while window.task_model.rowCount() == 0:
+        app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+    first_rows = time.perf_counter() - start
+    while window.loader is not None:
+        app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+    loaded = time.perf_counter() - start
+
+    timer.stop()
+    window.close()
+    app.processEvents()
+    return shown, first_rows, loaded, stall[0] / 1000
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    print(f"{'tasks':>10} {'blocking':>10} {'window':>10} {'first rows':>11} "
+          f"{'loaded':>10} {'longest stall':>14}")
+    for n in SIZES:
+        with tempfile.TemporaryDirectory() as directory:
+            write_json_tasks(os.path.join(directory, "tasks.snapshot.json"), make_tasks(n))
+            blocking = bench_blocking(directory)
+            shown, first_rows, loaded, stall = bench_streamed(app, directory)
+        print(f"{n:>10} {blocking * 1e3:>8.0f}ms {shown * 1e3:>8.0f}ms {first_rows * 1e3:>9.0f}ms "
+              f"{loaded * 1e3:>8.0f}ms {stall * 1e3:>12.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Per-widget stylesheets versus one shared stylesheet with dynamic properties.
+
+Run from the repository root (no display needed):
+
+    python benchmarks/bench_stylesheet.py
+
+Builds task-card widgets the way the app used to, with setStyleSheet() on
+every card, priority button, checkbox, label and delete button, and the
+same cards styled by one application stylesheet (theme.STYLESHEET) that
+selects on object names and the dynamic properties "priority" and
+"completed". Reports the time to build and show the cards, and to change
+the priority of every card.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import (QApplication, QCheckBox, QFrame, QHBoxLayout, QLabel,
+                             QPushButton, QVBoxLayout, QWidget)
+
+from focused_tasks.task import Priority
+from focused_tasks.ui import theme
+
+COUNTS = [100, 500, 2000]
+
+
+def priority_sheet(priority):
+    color, hover_color = (c.name() for c in theme.PRIORITY_COLORS[priority])
+    return f"""
+        QPushButton {{
+            background-color: {color};
+            color: white;
+            border: none;
+            border-radius: 11px;
+            font-weight: bold;
+            font-size: 12px;
+        }}
+        QPushButton:hover {{
+            background-color: {hover_color};
+        }}
+    """
+
+
+def label_sheet(completed):
+    if completed:
+        return "color: #6e7175; font-family: 'Segoe UI'; font-size: 13px; text-decoration: line-through;"
+    return "color: #f8f9fa; font-family: 'Segoe UI'; font-size: 13px;"
+
+
+# Card rules in the shared stylesheet, one per state instead of one per widget
+CARD_RULES = "\n".join([
+    "QFrame#taskCard { background-color: #1e1f21; border-radius: 8px; padding: 2px; margin: 2px 1px; }",
+    "QFrame#taskCard:hover { background-color: #28292c; }",
+    "QPushButton#priorityButton { color: white; border: none; border-radius: 11px;"
+    " font-weight: bold; font-size: 12px; }",
+    *(f'QPushButton#priorityButton[priority="{p.label}"] {{ background-color: {c[0].name()}; }}\n'
+      f'QPushButton#priorityButton[priority="{p.label}"]:hover {{ background-color: {c[1].name()}; }}'
+      for p, c in theme.PRIORITY_COLORS.items()),
+    "QCheckBox#taskCheck::indicator { width: 16px; height: 16px; border-radius: 8px;"
+    " border: 2px solid #6a6a6a; }",
+    "QLabel#taskLabel { color: #f8f9fa; font-family: 'Segoe UI'; font-size: 13px; }",
+    'QLabel#taskLabel[completed="true"] { color: #6e7175; text-decoration: line-through; }',
+    "QPushButton#deleteButton { background-color: transparent; border: none; color: #6c757d;"
+    " font-size: 18px; font-weight: bold; }",
+])
+
+
+def build_card(shared, priority, completed, text):
+    card = QFrame()
+    layout = QHBoxLayout(card)
+    button = QPushButton("!")
+    button.setFixedSize(22, 22)
+    checkbox = QCheckBox()
+    checkbox.setChecked(completed)
+    label = QLabel(text)
+    label.setWordWrap(True)
+    delete = QPushButton("×")
+
+    if shared:
+        card.setObjectName("taskCard")
+        button.setObjectName("priorityButton")
+        button.setProperty("priority", priority.label)
+        checkbox.setObjectName("taskCheck")
+        label.setObjectName("taskLabel")
+        label.setProperty("completed", completed)
+        delete.setObjectName("deleteButton")
+    else:
+        card.setObjectName("taskCard")
+        card.setStyleSheet("#taskCard { background-color: #1e1f21; border-radius: 8px; padding: 2px;"
+                           " margin: 2px 1px; } #taskCard:hover { background-color: #28292c; }")
+        button.setStyleSheet(priority_sheet(priority))
+        checkbox.setStyleSheet("QCheckBox::indicator { width: 16px; height: 16px; border-radius: 8px;"
+                               " border: 2px solid #6a6a6a; }")
+        label.setStyleSheet(label_sheet(completed))
+        delete.setStyleSheet("QPushButton { background-color: transparent; border: none;"
+                             " color: #6c757d; font-size: 18px; font-weight: bold; }")
+
+    for widget in (button, checkbox, label, delete):
+        layout.addWidget(widget)
+    card.priority_button = button
+    return card
+
+
+def bench(app, shared, count):
+    app.setStyleSheet(theme.STYLESHEET + CARD_RULES if shared else "")
+    priorities = list(Priority)
+
+    container = QWidget()
+    layout = QVBoxLayout(container)
+    container.show()
+    app.processEvents()
+
+    start = time.perf_counter()
+    cards = []
+    for i in range(count):
+        card = build_card(shared, priorities[i % 3], i % 4 == 0, f"Task {i}")
+        layout.addWidget(card)
+        cards.append(card)
+    app.processEvents()
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i, card in enumerate(cards):
+        priority = priorities[(i + 1) % 3]
+        if shared:
+            theme.set_state(card.priority_button, "priority", priority.label)
+        else:
+            card.priority_button.setStyleSheet(priority_sheet(priority))
+    app.processEvents()
+    change = time.perf_counter() - start
+
+    container.deleteLater()
+    app.processEvents()
+    return build, change
+
+
+def main():
+    app = QApplication(sys.argv)
+    print(f"{'cards':>6} {'style':>10} {'build':>10} {'change':>12}")
+    for count in COUNTS:
+        for shared in (False, True):
+            build, change = bench(app, shared, count)
+            print(f"{count:>6} {'shared' if shared else 'per-widget':>10} "
+                  f"{build * 1e3:>8.1f}ms {change / count * 1e6:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Benchmark suite: where the app's time goes as the list grows.
+
+Run from the repository root (no display needed):
+
+    python benchmarks/bench_suite.py [--sizes 1000,10000] [--storage sqlite]
+    python benchmarks/bench_suite.py --output new.json --compare old.json
+
+For each size (default 1k, 10k, 100k and 1M tasks) a synthetic task list
+is saved with the chosen backend and opened in an offscreen window, which
+is then timed doing what a user does:
+
+    load                  load_tasks(), until every task is in the list
+    render <mode>         render_tasks() for each sort mode, the first
+                          time it is shown and once more afterwards
+    add / delete /        add_task(), delete_task() and
+    priority              update_task_priority(), repainted
+    save 1 / save batch   save_tasks() with one change and with BATCH,
+                          until the writer has put them on disk
+    focus                 losing and gaining focus, repainted
+    peak memory           peak RSS of the process, in MB
+
+Latencies are the median of SAMPLES runs, with the 95th percentile next
+to them. Every size runs in a process of its own, so peak memory is that
+size's alone. The results are printed and written as JSON (by default to
+bench-<revision>.json). --compare prints each metric against an earlier
+file and exits with 1 if any got slower by more than --threshold (and
+by more than MIN_DELTA).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SAMPLES = 30
+BATCH = 1000
+# Smaller differences are noise, whatever the ratio (ms, or MB for memory)
+MIN_DELTA = 0.5
+SORT_MODES = ["Priority", "Creation Date", "Alphabetical"]
+
+
+def create_storage(kind, directory):
+    from focused_tasks.storage import BinaryJournalStorage, JournalStorage, JsonStorage, SqliteStorage
+
+    if kind == "binary":
+        return BinaryJournalStorage(os.path.join(directory, "tasks.snapshot.bin"),
+                                    os.path.join(directory, "tasks.bin.journal"), None)
+    if kind == "json":
+        return JsonStorage(os.path.join(directory, "tasks.json"))
+    if kind == "sqlite":
+        return SqliteStorage(os.path.join(directory, "tasks.db"), None)
+    return JournalStorage(os.path.join(directory, "tasks.snapshot.json"),
+                          os.path.join(directory, "tasks.journal"), None)
+
+
+def save_tasks(kind, directory, tasks):
+    from focused_tasks.snapshot import write_snapshot
+    from focused_tasks.storage import write_json_tasks
+
+    if kind == "binary":
+        write_snapshot(os.path.join(directory, "tasks.snapshot.bin"), tasks)
+    elif kind == "journal":
+        write_json_tasks(os.path.join(directory, "tasks.snapshot.json"), tasks)
+    elif kind == "json":
+        write_json_tasks(os.path.join(directory, "tasks.json"), tasks)
+    else:
+        storage = create_storage(kind, directory)
+        storage.apply([("add", task) for task in tasks])
+        storage.close()
+
+
+def peak_memory():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def timed(app, function, *args):
+    # Includes the repaint the change causes
+    start = time.perf_counter()
+    function(*args)
+    app.processEvents()
+    return time.perf_counter() - start
+
+
+def add_latency(results, name, samples):
+    samples = sorted(samples)
+    results[name] = statistics.median(samples) * 1e3
+    results[name + " p95"] = samples[int(len(samples) * 0.95) - 1] * 1e3
+
+
+def run_size(n, kind):
+    """Benchmark one list size and return its results, times in ms."""
+    from PyQt6.QtCore import QEventLoop
+    from PyQt6.QtWidgets import QApplication
+
+    from focused_tasks.archive import TaskArchive
+    from focused_tasks.task import Priority
+    from focused_tasks.ui.app import ModernTodoApp
+
+    from common import make_tasks
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    app.setStyle("Fusion")
+    results = {}
+    rnd = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        save_tasks(kind, directory, make_tasks(n))
+
+        start = time.perf_counter()
+        # Archiving old completed tasks after the load is not measured
+        window = ModernTodoApp(create_storage(kind, directory),
+                               archive=TaskArchive(os.path.join(directory, "tasks.archive")),
+                               archive_after=float("inf"))
+        window.show()
+        while window.loader is not None:
+            app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+        app.processEvents()
+        results["load"] = (time.perf_counter() - start) * 1e3
+
+        # The list opens in Priority order, which the load already sorted
+        for again in (False, True):
+            for mode in SORT_MODES[1:] + SORT_MODES[:1]:
+                name = f"render {mode}" + (" again" if again else "")
+                results[name] = timed(app, window.sort_combo.setCurrentText, mode) * 1e3
+
+        ids = [task.id for task in window.store]
+        added = []
+        samples = []
+        for i in range(SAMPLES):
+            window.task_input.setText(f"benchmark task {i}")
+            samples.append(timed(app, window.add_task))
+            added.append(next(task.id for task in window.store
+                              if task.text == f"benchmark task {i}"))
+        add_latency(results, "add", samples)
+
+        samples = []
+        for _ in range(SAMPLES):
+            priority = rnd.choice(list(Priority))
+            samples.append(timed(app, window.update_task_priority, rnd.choice(ids), priority))
+        add_latency(results, "priority", samples)
+
+        add_latency(results, "delete", [timed(app, window.delete_task, task_id)
+                                        for task_id in added])
+
+        samples = []
+        for _ in range(SAMPLES):
+            task = window.store.get(rnd.choice(ids)).copy()
+            samples.append(timed(app, lambda: (window.save_tasks(("update", task)),
+                                               window.writer.flush())))
+        add_latency(results, "save 1", samples)
+        batch = [("update", window.store.get(task_id)) for task_id in rnd.sample(ids, min(BATCH, n))]
+        results["save batch"] = timed(app, lambda: (window.save_tasks(*batch),
+                                                    window.writer.flush())) * 1e3
+
+        samples = []
+        for _ in range(SAMPLES):
+            samples.append(timed(app, window.on_focus_lost) + timed(app, window.on_focus_gained))
+        add_latency(results, "focus", samples)
+
+        window.close()
+        app.processEvents()
+
+    results["peak memory"] = peak_memory()
+    return results
+
+
+def revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results):
+    sizes = list(results)
+    print(f"{'':<28}" + "".join(f"{size:>12}" for size in sizes))
+    for name in results[sizes[0]]:
+        unit = "MB" if name == "peak memory" else "ms"
+        cells = []
+        for size in sizes:
+            value = results[size].get(name)
+            cells.append(f"{'-':>12}" if value is None else f"{value:>10.2f}{unit}")
+        print(f"{name:<28}" + "".join(cells))
+
+
+def compare(results, baseline, threshold):
+    """Print each metric against the baseline; returns True if any regressed."""
+    regressed = False
+    print(f"\nCompared with {baseline['revision']} (slower by more than {threshold:.0%} is flagged)")
+    for size, metrics in results.items():
+        old_metrics = baseline["results"].get(size)
+        if old_metrics is None:
+            continue
+        for name, value in metrics.items():
+            old = old_metrics.get(name)
+            if value is None or not old:
+                continue
+            ratio = value / old
+            flag = ""
+            if ratio > 1 + threshold and value - old > MIN_DELTA:
+                flag = "  slower"
+                regressed = True
+            print(f"{size:>10} {name:<28} {old:>10.2f} -> {value:>10.2f}  {ratio:>5.2f}x{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app at growing list sizes.")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma-separated numbers of tasks")
+    parser.add_argument("--storage", choices=["journal", "binary", "json", "sqlite"], default="journal")
+    parser.add_argument("--output", help="JSON file for the results (default: bench-<revision>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown that counts as a regression (default: 0.10)")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_size(args.worker, args.storage)))
+        return 0
+
+    results = {}
+    for n in [int(size) for size in args.sizes.split(",")]:
+        print(f"Benchmarking {n} tasks...", file=sys.stderr)
+        # Qt's warnings about the offscreen platform are only shown on failure
+        worker = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", str(n),
+                                 "--storage", args.storage], capture_output=True, text=True)
+        if worker.returncode != 0:
+            print(worker.stderr, file=sys.stderr)
+            return worker.returncode
+        results[str(n)] = json.loads(worker.stdout.splitlines()[-1])
+
+    print_results(results)
+    report = {
+        "revision": revision(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage": args.storage,
+        "results": results,
+    }
+    output = args.output or f"bench-{report['revision']}.json"
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            if compare(results, json.load(file), args.threshold):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Memory per task: tasks.json dicts versus Task records.
+
+Run from the repository root:
+
+    python benchmarks/bench_task_memory.py [count]
+
+Builds `count` tasks (default 1M) as the dicts json.load() returns for
+tasks.json, then converts them to Task records and drops the dicts, and
+reports the memory tracemalloc sees for each. The text strings are shared
+by both, so the difference is the cost of the containers and of the
+id/created_at/priority values, ints in a Task.
+"""
+
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from focused_tasks.task import Task
+
+
+def make_json(count):
+    priorities = ("high", "medium", "low")
+    return json.dumps([
+        {
+            "id": f"2025042717{i:010d}",
+            "text": f"Task number {i}",
+            "completed": i % 3 == 0,
+            "priority": priorities[i % 3],
+            "created_at": f"2025-04-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:{i // 60 % 60:02d}",
+        }
+        for i in range(count)
+    ])
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    payload = make_json(count)
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+
+    dicts = json.loads(payload)
+    dict_bytes = tracemalloc.get_traced_memory()[0] - base
+
+    tasks = [Task.from_dict(task) for task in dicts]
+    del dicts
+    gc.collect()
+    task_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    assert len(tasks) == count
+    print(f"{count} tasks")
+    print(f"  dicts: {dict_bytes / 2**20:8.1f} MiB  {dict_bytes / count:6.0f} B/task")
+    print(f"  Task:  {task_bytes / 2**20:8.1f} MiB  {task_bytes / count:6.0f} B/task")
+    print(f"  saved: {1 - task_bytes / dict_bytes:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
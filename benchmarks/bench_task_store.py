@@ -0,0 +1,56 @@
+"""Per-operation cost of TaskStore lookups and mutations as the list grows.
+
+Run from the repository root:
+
+    python benchmarks/bench_task_store.py
+
+Every operation should cost about the same at 100 tasks as at 1M.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from focused_tasks.task import Task
+from focused_tasks.task_store import TaskStore
+
+SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+OPS = 10_000
+
+
+def make_task(i):
+    return Task(i, f"Task {i}", created_at=1_704_110_400)
+
+
+def per_op_ns(func, args):
+    start = time.perf_counter_ns()
+    for arg in args:
+        func(arg)
+    return (time.perf_counter_ns() - start) / len(args)
+
+
+def bench(n):
+    store = TaskStore(make_task(i) for i in range(n))
+    store.subscribe(lambda changes: None)
+    ids = random.Random(n).sample(range(n), min(n, OPS))
+    new = [make_task(i) for i in range(n, n + len(ids))]
+    return {
+        "get": per_op_ns(store.get, ids),
+        "update": per_op_ns(lambda task_id: store.update(task_id, completed=True), ids),
+        "delete": per_op_ns(store.delete, ids),
+        "add": per_op_ns(store.add, new),
+    }
+
+
+def main():
+    print(f"{'tasks':>10} {'get':>10} {'update':>10} {'delete':>10} {'add':>10}   (ns/op)")
+    for n in SIZES:
+        result = bench(n)
+        print(f"{n:>10} " + " ".join(f"{result[op]:>10.0f}" for op in ("get", "update", "delete", "add")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Synthetic tasks and timing shared by the benchmarks.
+
+The benchmark scripts import this as a sibling module, after putting the
+repository root on sys.path.
+"""
+
+import random
+import time
+
+from focused_tasks.task import Priority, Task
+
+
+def make_tasks(n, ids=None, completed=0.3, text="task {}"):
+    """Return n tasks with random priorities and creation times.
+
+    The same n always gives the same tasks. ids defaults to 0..n-1, a
+    `completed` fraction of the tasks is done, and each text is `text`
+    formatted with a random number below n.
+    """
+    rnd = random.Random(n)
+    priorities = list(Priority)
+    return [Task(task_id, text.format(rnd.randrange(n)), rnd.random() < completed,
+                 rnd.choice(priorities), 1_700_000_000 + rnd.randrange(10**7))
+            for task_id in (range(n) if ids is None else ids)]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
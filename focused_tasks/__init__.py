@@ -0,0 +1,6 @@
+"""Focused Tasks, a todo list that shrinks to a minimal view when unfocused.
+
+The data layer (task, task_store, search, storage, archive) and the
+command-line interface (cli) do not use Qt; the window lives in the ui
+package and is started by gui.main().
+"""
@@ -0,0 +1,114 @@
+"""Archive for completed tasks that are no longer part of the task list.
+
+Archived tasks are kept in one append-only file that is only read when the
+archive is searched, so they cost nothing at startup or when saving.
+
+Every append is one frame: a 4-byte big-endian length followed by that
+many bytes of zlib-compressed JSON lines, one record per line:
+
+    {"op": "archive", "task": {...}}    a task in the tasks.json shape
+    {"op": "restore", "id": task_id}    the task went back to the list
+
+The latest record for a task wins, so a task can be archived and restored
+any number of times. A frame torn by a crash is dropped on the next write.
+"""
+import json
+import os
+import struct
+import threading
+import zlib
+
+from .search import matches, tokenize
+from .task import Task, dict_task_id, parse_task_id
+
+_FRAME_HEADER = struct.Struct(">I")
+
+
+def select(tasks, start=None, end=None, text=""):
+    """Return the tasks created in [start, end) whose text matches text.
+
+    start and end are epoch seconds and either may be None; text matches
+    like the list's search box. Newest tasks come first.
+    """
+    terms = tokenize(text)
+    found = [task for task in tasks
+             if (start is None or task.created_at >= start)
+             and (end is None or task.created_at < end)
+             and (not terms or matches(task, terms))]
+    found.sort(key=lambda task: (task.created_at, task.id), reverse=True)
+    return found
+
+
+class TaskArchive:
+    """Append-only, compressed archive of tasks."""
+
+    def __init__(self, path="tasks.archive"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._checked = False
+
+    def _read(self):
+        # Returns the records of every complete frame and the offset where
+        # the last complete frame ends
+        records = []
+        valid_end = 0
+        if not os.path.exists(self.path):
+            return records, valid_end
+        with open(self.path, "rb") as file:
+            while True:
+                header = file.read(_FRAME_HEADER.size)
+                if len(header) < _FRAME_HEADER.size:
+                    break
+                (size,) = _FRAME_HEADER.unpack(header)
+                try:
+                    lines = zlib.decompress(file.read(size)).decode("utf-8").splitlines()
+                    frame = [json.loads(line) for line in lines]
+                except (zlib.error, ValueError):
+                    # Torn write at the end of the archive from a crash
+                    break
+                records.extend(frame)
+                valid_end = file.tell()
+        return records, valid_end
+
+    def _append(self, records):
+        data = zlib.compress("".join(json.dumps(record) + "\n" for record in records).encode("utf-8"))
+        with self._lock:
+            if not self._checked:
+                # Drop a torn frame so new frames are not appended after it
+                _, valid_end = self._read()
+                if os.path.exists(self.path) and valid_end < os.path.getsize(self.path):
+                    with open(self.path, "r+b") as file:
+                        file.truncate(valid_end)
+                self._checked = True
+            with open(self.path, "ab") as file:
+                file.write(_FRAME_HEADER.pack(len(data)) + data)
+                file.flush()
+                os.fsync(file.fileno())
+
+    def archive(self, tasks):
+        """Add tasks to the archive; they are on disk when this returns."""
+        if tasks:
+            self._append([{"op": "archive", "task": task.to_dict()} for task in tasks])
+
+    def restore(self, task_ids):
+        """Take tasks out of the archive.
+
+        The caller puts the tasks back on the list first, so that a crash
+        in between leaves them in both places rather than in neither.
+        """
+        if task_ids:
+            self._append([{"op": "restore", "id": str(task_id)} for task_id in task_ids])
+
+    def load(self):
+        """Read every task currently in the archive."""
+        tasks = {}
+        for record in self._read()[0]:
+            if record["op"] == "restore":
+                tasks.pop(parse_task_id(record["id"]), None)
+            else:
+                tasks[dict_task_id(record["task"])] = record["task"]
+        return [Task.from_dict(data) for data in tasks.values()]
+
+    def query(self, start=None, end=None, text=""):
+        """Read the archived tasks matching select()'s arguments."""
+        return select(self.load(), start, end, text)
@@ -0,0 +1,238 @@
+"""Command-line interface to the task list, without the GUI.
+
+Works on the same storage backends as To-Do.py and makes its changes
+through a TaskStore, so every command is one batch of storage operations.
+Nothing here imports PyQt6, which keeps startup fast enough for shell
+pipelines. Run it as cli.py from the repository root or as
+python -m focused_tasks.cli:
+
+    python cli.py add "Buy milk" "Call Bob" --priority high
+    cat todo.txt | python cli.py add -
+    python cli.py add "Water plants" --repeat "every 3 days"
+    python cli.py add "Send invoice #work +acme" --due tomorrow
+    python cli.py list --pending --search milk
+    python cli.py list --filter "tag:work and due<=today and not completed"
+    python cli.py list --completed | cut -d " " -f 1 | python cli.py delete -
+    python cli.py export backup.json
+
+A running GUI watches its storage file and merges changes made from the
+command line shortly after they are written, so it can stay open.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from .filters import day_start, is_name, parse_date, parse_task_input
+from .recurrence import first_occurrence
+from .storage import STORAGE_BACKENDS, create_storage, read_json_tasks, write_json_tasks
+from .task import Priority, Task, new_task_ids, parse_task_id
+from .task_store import SORT_CHOICES, TaskStore
+
+
+def read_args(values):
+    # A single "-" stands for one value per line of stdin
+    if values == ["-"]:
+        return [line.strip() for line in sys.stdin if line.strip()]
+    return values
+
+
+def open_store(storage):
+    store = TaskStore(storage.load())
+    # Every change to the store is persisted, like in the app
+    store.subscribe(lambda changes: storage.apply(
+        [(op, task.id if op == "delete" else task) for op, task in changes]))
+    return store
+
+
+def known_ids(store, values):
+    # Unknown ids are reported and skipped
+    found = []
+    for value in values:
+        task_id = parse_task_id(value)
+        if task_id in store:
+            found.append(task_id)
+        else:
+            print(f"Error: no task with id {value}", file=sys.stderr)
+    return found
+
+
+def name_arg(value):
+    if not is_name(value):
+        raise argparse.ArgumentTypeError(f"not a tag or project name: {value!r}")
+    return value.lower()
+
+
+def date_arg(value):
+    try:
+        return parse_date(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def format_task(task):
+    mark = "[x]" if task.completed else "[ ]"
+    repeat = "" if task.recurrence is None else f" ({task.recurrence})"
+    fields = ""
+    if task.project is not None:
+        fields += f" +{task.project}"
+    fields += "".join(f" #{tag}" for tag in task.tags)
+    if task.due_at is not None:
+        fields += f" due:{datetime.fromtimestamp(task.due_at).date().isoformat()}"
+    return f"{task.id} {mark} {task.priority.label:<6} {task.text}{repeat}{fields}"
+
+
+def task_fields(text, args):
+    # #tag, +project and due:DATE words in the text, then the options
+    text, fields = parse_task_input(text)
+    if args.tag:
+        fields["tags"] = tuple(dict.fromkeys(fields.get("tags", ()) + tuple(args.tag)))
+    if args.project is not None:
+        fields["project"] = args.project
+    if args.due is not None:
+        fields["due_at"] = day_start(args.due)
+    return text, fields
+
+
+def cmd_add(store, args):
+    texts = read_args(args.text)
+    priority = Priority.from_label(args.priority)
+    # Recurring tasks repeat from now on; the app spawns their instances
+    next_at = None if args.repeat is None else first_occurrence(args.repeat)
+    tasks = []
+    for task_id, text in zip(new_task_ids(len(texts)), texts):
+        text, fields = task_fields(text, args)
+        tasks.append(Task(task_id, text, priority=priority, recurrence=args.repeat,
+                          next_at=next_at, **fields))
+    store.add_many(tasks)
+    for task in tasks:
+        print(task.id)
+    return 0
+
+
+def cmd_list(store, args):
+    sort_method = SORT_CHOICES[args.sort]
+    tasks = store.search(args.search, sort_method, args.filter)
+    if tasks is None:
+        tasks = store.view(sort_method)
+    lines = [format_task(task) for task in tasks
+             if args.status is None or task.completed == (args.status == "completed")]
+    if lines:
+        print("\n".join(lines))
+    return 0
+
+
+def cmd_complete(store, args):
+    task_ids = read_args(args.ids)
+    found = known_ids(store, task_ids)
+    store.update_many(found, completed=not args.undo)
+    return 0 if len(found) == len(task_ids) else 1
+
+
+def cmd_delete(store, args):
+    task_ids = read_args(args.ids)
+    found = known_ids(store, task_ids)
+    store.delete_many(found)
+    return 0 if len(found) == len(task_ids) else 1
+
+
+def cmd_set_priority(store, args):
+    task_ids = read_args(args.ids)
+    found = known_ids(store, task_ids)
+    store.update_many(found, priority=Priority.from_label(args.priority))
+    return 0 if len(found) == len(task_ids) else 1
+
+
+def cmd_export(store, args):
+    if args.path == "-":
+        json.dump([task.to_dict() for task in store], sys.stdout, indent=2)
+        print()
+    else:
+        write_json_tasks(args.path, store)
+    return 0
+
+
+def cmd_import(store, args):
+    # Tasks with an id already in the list replace it
+    data = json.load(sys.stdin) if args.path == "-" else read_json_tasks(args.path)
+    tasks = [Task.from_dict(item) for item in data]
+    store.add_many(tasks)
+    print(f"Imported {len(tasks)} tasks")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Focused Tasks from the command line")
+    parser.add_argument("--storage", choices=sorted(STORAGE_BACKENDS), default="journal",
+                        help="storage backend for tasks (default: journal)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    priorities = [priority.label for priority in Priority]
+
+    add = commands.add_parser("add", help="add tasks")
+    add.add_argument("text", nargs="+", help="one task per argument, or - to read one per line of stdin")
+    add.add_argument("--priority", choices=priorities, default="low")
+    add.add_argument("--repeat", metavar="RULE",
+                     help='repeat the tasks: daily, weekly, monthly, "every N days|weeks|months" '
+                          'or "cron M H DOM MON DOW"')
+    add.add_argument("--tag", action="append", type=name_arg, help="tag the tasks; may be repeated")
+    add.add_argument("--project", type=name_arg, help="put the tasks in a project")
+    add.add_argument("--due", metavar="DATE", type=date_arg,
+                     help="due date: today, tomorrow or YYYY-MM-DD")
+    add.set_defaults(run=cmd_add)
+
+    list_ = commands.add_parser("list", help="list tasks")
+    list_.add_argument("--sort", choices=sorted(SORT_CHOICES), default="priority")
+    list_.add_argument("--search", default="", help="only tasks with words starting with every word of this")
+    list_.add_argument("--filter", default="",
+                       help='only tasks matching a filter, such as "#work due<=today not completed"')
+    status = list_.add_mutually_exclusive_group()
+    status.add_argument("--pending", dest="status", action="store_const", const="pending")
+    status.add_argument("--completed", dest="status", action="store_const", const="completed")
+    list_.set_defaults(run=cmd_list)
+
+    ids_help = "task ids, or - to read one per line of stdin"
+    complete = commands.add_parser("complete", help="mark tasks completed")
+    complete.add_argument("ids", nargs="+", help=ids_help)
+    complete.add_argument("--undo", action="store_true", help="mark them not completed instead")
+    complete.set_defaults(run=cmd_complete)
+
+    delete = commands.add_parser("delete", help="delete tasks")
+    delete.add_argument("ids", nargs="+", help=ids_help)
+    delete.set_defaults(run=cmd_delete)
+
+    set_priority = commands.add_parser("set-priority", help="change the priority of tasks")
+    set_priority.add_argument("priority", choices=priorities)
+    set_priority.add_argument("ids", nargs="+", help=ids_help)
+    set_priority.set_defaults(run=cmd_set_priority)
+
+    export = commands.add_parser("export", help="write all tasks to a tasks.json style file")
+    export.add_argument("path", help="file to write, or - for stdout")
+    export.set_defaults(run=cmd_export)
+
+    import_ = commands.add_parser("import", help="add tasks from a tasks.json style file")
+    import_.add_argument("path", help="file to read, or - for stdin")
+    import_.set_defaults(run=cmd_import)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    storage = create_storage(args.storage)
+    try:
+        store = open_store(storage)
+        return args.run(store, args)
+    except BrokenPipeError:
+        # The reader, such as head, has all it wanted. Output still
+        # buffered would fail again at exit, so it goes to devnull
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""Filtering tasks by tag, project, due date and completion.
+
+A filter is a string of terms that must all hold; "and" between them is
+optional, and "not" in front of a term, or a leading "-", negates it:
+
+    #work, tag:work          tagged work
+    +home, project:home      in project home
+    due<=today, due>DATE     due before the end of today, after DATE;
+                             also due<, due>= and due= (or due:DATE)
+    due:none                 no due date
+    completed, pending       completed or not
+
+DATE is today, tomorrow, yesterday or YYYY-MM-DD, in local time, and a
+due date is a day up to its end. "tag:work and due<=today and not
+completed" is a valid filter.
+
+New tasks take their tags, project and due date from the same #tag,
++project and due:DATE words in their text (see parse_task_input()).
+
+FieldIndex answers the tag, project and due terms of a filter from
+secondary indexes instead of looking at every task, so a filter costs in
+proportion to the tasks it matches.
+"""
+import re
+from bisect import bisect_left, insort
+from datetime import date, datetime, time, timedelta
+
+# Fields of a task that filters look at, other than completed
+FIELDS = ("tags", "project", "due_at")
+
+# Tag and project names start with a letter, so "#1" stays text
+_NAME = re.compile(r"[^\W\d][\w-]*")
+_DUE = re.compile(r"due(<=|>=|<|>|=|:)(.+)")
+
+# Bounds of due ranges that are open at one end
+EARLIEST = -(1 << 63)
+LATEST = 1 << 63
+
+
+def parse_date(text, today=None):
+    """The local day a date word names, as a date; raises ValueError if none."""
+    today = date.today() if today is None else today
+    word = text.lower()
+    if word == "today":
+        return today
+    if word == "tomorrow":
+        return today + timedelta(days=1)
+    if word == "yesterday":
+        return today - timedelta(days=1)
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Not a date: {text!r}") from None
+
+
+def day_start(day):
+    """Epoch seconds of the local midnight that starts day."""
+    return int(datetime.combine(day, time()).timestamp())
+
+
+def is_name(text):
+    """Whether text can be a tag or project name."""
+    return _NAME.fullmatch(text) is not None
+
+
+def _name(text):
+    if not is_name(text):
+        raise ValueError(f"Not a tag or project name: {text!r}")
+    return text.lower()
+
+
+def parse_task_input(text, today=None):
+    """Split the #tag, +project and due:DATE words off a new task's text.
+
+    Returns the rest of the text and the fields to give the task. Words
+    that only look like these, such as "#1" or "due:soon", stay in the
+    text.
+    """
+    words = []
+    tags = []
+    fields = {}
+    for word in text.split():
+        if len(word) > 1 and word[0] in "#+" and _NAME.fullmatch(word[1:]):
+            if word[0] == "#":
+                if word[1:].lower() not in tags:
+                    tags.append(word[1:].lower())
+            else:
+                fields["project"] = word[1:].lower()
+        elif word.lower().startswith("due:"):
+            try:
+                fields["due_at"] = day_start(parse_date(word[4:], today))
+            except ValueError:
+                words.append(word)
+        else:
+            words.append(word)
+    if tags:
+        fields["tags"] = tuple(tags)
+    return " ".join(words), fields
+
+
+class TaskFilter:
+    """A parsed filter; raises ValueError for a string that is not one.
+
+    Its terms are tuples: ("tag", name), ("project", name), ("due", start,
+    end) for due dates in [start, end), ("due", None, None) for none at
+    all, and ("completed", flag). Relative dates are resolved when the
+    filter is parsed, and key tells filters apart by their resolved terms.
+    """
+
+    def __init__(self, text, today=None):
+        self.text = text
+        self.terms = []
+        negate = False
+        for word in text.split():
+            lower = word.lower()
+            if lower == "and":
+                continue
+            if lower == "not":
+                negate = not negate
+                continue
+            if word.startswith("-") and len(word) > 1:
+                negate = not negate
+                word, lower = word[1:], lower[1:]
+            self.terms.append((negate, self._term(word, lower, today)))
+            negate = False
+        if negate:
+            raise ValueError("Filter ends with \"not\"")
+        self.key = tuple(self.terms)
+
+    @staticmethod
+    def _term(word, lower, today):
+        if lower in ("completed", "done"):
+            return ("completed", True)
+        if lower in ("pending", "open"):
+            return ("completed", False)
+        if word.startswith("#"):
+            return ("tag", _name(word[1:]))
+        if word.startswith("+"):
+            return ("project", _name(word[1:]))
+        if lower.startswith("tag:"):
+            return ("tag", _name(word[4:]))
+        if lower.startswith("project:"):
+            return ("project", _name(word[8:]))
+        match = _DUE.fullmatch(lower)
+        if match:
+            op, value = match.groups()
+            if op == ":" and value == "none":
+                return ("due", None, None)
+            day = parse_date(value, today)
+            start, end = day_start(day), day_start(day + timedelta(days=1))
+            return {
+                "<": ("due", EARLIEST, start),
+                "<=": ("due", EARLIEST, end),
+                ">": ("due", end, LATEST),
+                ">=": ("due", start, LATEST),
+                "=": ("due", start, end),
+                ":": ("due", start, end),
+            }[op]
+        raise ValueError(f"Unknown filter term: {word!r}")
+
+    def __bool__(self):
+        return bool(self.terms)
+
+    def matches(self, task):
+        return all(_holds(term, task.tags, task.project, task.due_at, task.completed) != negate
+                   for negate, term in self.terms)
+
+    def indexed_terms(self):
+        """The terms FieldIndex can look up: tag, project and due date ones, not negated."""
+        return [term for negate, term in self.terms
+                if not negate and term[0] != "completed" and term[1:] != (None, None)]
+
+    def fully_indexed(self):
+        """Whether the ids indexed_terms() match are exactly the filter's matches."""
+        return len(self.indexed_terms()) == len(self.terms)
+
+
+def _holds(term, tags, project, due_at, completed):
+    kind = term[0]
+    if kind == "tag":
+        return term[1] in tags
+    if kind == "project":
+        return project is not None and project.lower() == term[1]
+    if kind == "due":
+        if term[1] is None:
+            return due_at is None
+        return due_at is not None and term[1] <= due_at < term[2]
+    return completed == term[1]
+
+
+class FieldIndex:
+    """Secondary indexes over the fields filters look at.
+
+    Tags and projects map to the set of ids that have them, and the tasks
+    with a due date are kept as (due_at, id) pairs in due date order, so a
+    due range is found with two bisects. Like SearchIndex, the index is
+    kept up to date one task at a time, each change costing only that
+    task's entries.
+    """
+
+    def __init__(self, tasks=()):
+        self._tags = {}
+        self._projects = {}
+        self._due = []
+        self._fields = {}
+        for task in tasks:
+            self._add(task, sort=False)
+        self._due.sort()
+
+    def __len__(self):
+        return len(self._fields)
+
+    def add(self, task):
+        """Index a task, replacing what was indexed under its id."""
+        self._add(task, sort=True)
+
+    def _add(self, task, sort):
+        if task.id in self._fields:
+            self.remove(task.id)
+        project = None if task.project is None else task.project.lower()
+        self._fields[task.id] = (task.tags, project, task.due_at)
+        for tag in task.tags:
+            self._tags.setdefault(tag, set()).add(task.id)
+        if project is not None:
+            self._projects.setdefault(project, set()).add(task.id)
+        if task.due_at is not None:
+            if sort:
+                insort(self._due, (task.due_at, task.id))
+            else:
+                self._due.append((task.due_at, task.id))
+
+    def remove(self, task_id):
+        fields = self._fields.pop(task_id, None)
+        if fields is None:
+            return
+        tags, project, due_at = fields
+        for tag in tags:
+            self._discard(self._tags, tag, task_id)
+        if project is not None:
+            self._discard(self._projects, project, task_id)
+        if due_at is not None:
+            del self._due[bisect_left(self._due, (due_at, task_id))]
+
+    @staticmethod
+    def _discard(index, name, task_id):
+        ids = index[name]
+        ids.discard(task_id)
+        if not ids:
+            del index[name]
+
+    def update(self, task):
+        # Only a change to an indexed field changes the index
+        project = None if task.project is None else task.project.lower()
+        if self._fields.get(task.id) != (task.tags, project, task.due_at):
+            self.add(task)
+
+    def _due_range(self, start, end):
+        return bisect_left(self._due, (start,)), bisect_left(self._due, (end,))
+
+    def _count(self, term):
+        if term[0] == "tag":
+            return len(self._tags.get(term[1], ()))
+        if term[0] == "project":
+            return len(self._projects.get(term[1], ()))
+        first, last = self._due_range(term[1], term[2])
+        return last - first
+
+    def _ids(self, term):
+        if term[0] == "tag":
+            return self._tags.get(term[1], set())
+        if term[0] == "project":
+            return self._projects.get(term[1], set())
+        first, last = self._due_range(term[1], term[2])
+        return {task_id for _, task_id in self._due[first:last]}
+
+    def search(self, terms, ids=None):
+        """Return the ids matching every term, of ids if given.
+
+        There must be a term, or ids.
+
+        Terms are taken from the one with the fewest matches, which are
+        counted without collecting them. Once few ids are left, checking
+        their own fields is cheaper than collecting a common term's ids.
+        """
+        candidates = sorted((self._count(term), term) for term in terms)
+        for count, term in candidates:
+            if ids is not None and len(ids) * 8 < count:
+                fields = self._fields
+                ids = {task_id for task_id in ids if task_id in fields
+                       and _holds(term, *fields[task_id], None)}
+            else:
+                ids = self._ids(term) if ids is None else ids & self._ids(term)
+            if not ids:
+                break
+        # The index's own sets are never handed out
+        return set() if ids is None else set(ids)
@@ -0,0 +1,76 @@
+"""Entry point of the app's window.
+
+Qt and the UI modules are only imported once the command line has been
+parsed, so --help answers at once and --profile-startup can time those
+imports too.
+"""
+import argparse
+import sys
+
+from .instrumentation import instrumentation
+from .profiling import StartupProfile
+from .storage import STORAGE_BACKENDS
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Focused Tasks")
+    parser.add_argument("--storage", choices=sorted(STORAGE_BACKENDS), default="journal",
+                        help="storage backend for tasks (default: journal)")
+    parser.add_argument("--save-delay", type=int, default=250, metavar="MS",
+                        help="batch changes for this long before writing them (default: 250)")
+    parser.add_argument("--archive-after", type=float, default=30, metavar="DAYS",
+                        help="archive completed tasks created this many days ago (default: 30)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long startup and each import took, once the window is up")
+    parser.add_argument("--perf", action="store_true",
+                        help="time the hot paths and show them above the date (Ctrl+Shift+P)")
+    parser.add_argument("--perf-trace", metavar="PATH",
+                        help="like --perf, and write the timings to PATH (.json or .csv) "
+                             "on Ctrl+Shift+D and on exit")
+    parser.add_argument("--api-port", type=int, metavar="PORT",
+                        help="serve the task list as a JSON API on http://localhost:PORT")
+    return parser
+
+
+def main(argv=None):
+    args, qt_args = build_parser().parse_known_args(argv)
+
+    if args.perf or args.perf_trace:
+        instrumentation.enable()
+
+    profile = None
+    if args.profile_startup:
+        profile = StartupProfile()
+        profile.start()
+
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    from .storage import create_storage
+    from .ui.app import ModernTodoApp
+    if profile is not None:
+        profile.mark("imports")
+
+    app = QApplication(sys.argv[:1] + qt_args)
+
+    # Set application style
+    app.setStyle("Fusion")
+    if profile is not None:
+        profile.mark("QApplication")
+
+    # Create and show the application
+    window = ModernTodoApp(create_storage(args.storage), args.save_delay / 1000,
+                           archive_after=args.archive_after * 86400, perf_trace=args.perf_trace,
+                           api_port=args.api_port)
+    if profile is not None:
+        profile.mark("window created")
+    window.show()
+
+    if profile is not None:
+        # Runs once the event loop has started and shown the window
+        def report():
+            profile.mark("window shown")
+            profile.report()
+        QTimer.singleShot(0, report)
+
+    return app.exec()
@@ -0,0 +1,209 @@
+"""Undo and redo of the edits made to the task list.
+
+Every edit is recorded as a command that knows how to apply its inverse
+to a TaskStore, not as a copy of the list, so the history costs memory in
+proportion to the tasks edited. A command undoes and redoes with one bulk
+store call per batch, so undoing a clear of 50k tasks is one change to
+the list and one write to storage.
+"""
+from collections import deque
+from functools import partial
+
+
+class AddCommand:
+    """Tasks that were added."""
+
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def task_ids(self):
+        return {task.id for task in self.tasks}
+
+    def undo(self, store):
+        store.delete_many([task.id for task in self.tasks])
+
+    def redo(self, store):
+        store.add_many(self.tasks)
+
+
+class DeleteCommand:
+    """Tasks that were deleted; the history keeps them for undo."""
+
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def task_ids(self):
+        return {task.id for task in self.tasks}
+
+    def undo(self, store):
+        store.add_many(self.tasks)
+
+    def redo(self, store):
+        store.delete_many([task.id for task in self.tasks])
+
+
+class UpdateCommand:
+    """Fields changed to the same values on a number of tasks.
+
+    Only the changed fields are kept, for tasks grouped by what those
+    fields were before, so an undo is one update per group; typically there
+    are only a few. Tasks that already had the new values are left out.
+    """
+
+    def __init__(self, tasks, changes):
+        self.changes = changes
+        self.groups = {}
+        names = list(changes)
+        new = tuple(changes.values())
+        for task in tasks:
+            old = tuple(getattr(task, name) for name in names)
+            if old != new:
+                self.groups.setdefault(old, []).append(task.id)
+        self._names = names
+
+    def __len__(self):
+        return sum(len(task_ids) for task_ids in self.groups.values())
+
+    def task_ids(self):
+        return {task_id for task_ids in self.groups.values() for task_id in task_ids}
+
+    def undo(self, store):
+        for old, task_ids in self.groups.items():
+            store.update_many(task_ids, **dict(zip(self._names, old)))
+
+    def redo(self, store):
+        store.update_many([task_id for task_ids in self.groups.values() for task_id in task_ids],
+                          **self.changes)
+
+
+class ArchiveCommand:
+    """Tasks moved from the list to the archive.
+
+    The archive is written on the thread of writer, the list's
+    BackgroundWriter: before the tasks' deletion is saved, and after their
+    return to the list is, so a crash leaves them in both places rather
+    than in neither. If archiving fails, their deletion is not saved and
+    on_error is called there with the tasks and the exception, for the
+    caller to put them back.
+    """
+
+    def __init__(self, tasks, archive, writer, on_error=None):
+        self.tasks = list(tasks)
+        self.archive = archive
+        self.writer = writer
+        self.on_error = on_error
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def task_ids(self):
+        return {task.id for task in self.tasks}
+
+    def undo(self, store):
+        store.add_many(self.tasks)
+        task_ids = [task.id for task in self.tasks]
+        self.writer.after(lambda: self.archive.restore(task_ids))
+
+    def redo(self, store):
+        # Copies, as the tasks may be back on the list and changing by the
+        # time they are written
+        tasks = [task.copy() for task in self.tasks]
+        on_error = None if self.on_error is None else partial(self.on_error, self.tasks)
+        with self.writer.before(lambda: self.archive.archive(tasks), [task.id for task in tasks], on_error):
+            store.delete_many([task.id for task in tasks])
+
+
+class History:
+    """Bounded undo and redo stacks of commands on a store.
+
+    The edit methods change the store and record the change in one step.
+    Tasks that are no longer in the store, for instance because another
+    window deleted them, are skipped by both undo and redo. Changes made
+    to tasks outside the history, such as a recurring task handing its
+    rule to a new instance, make the commands on them stale; discard()
+    drops those.
+
+    The oldest commands are dropped once there are more than limit, or
+    once together they hold more than max_tasks tasks; the latest command
+    is always kept, however large.
+    """
+
+    def __init__(self, store, limit=100, max_tasks=1_000_000):
+        self.store = store
+        self.limit = limit
+        self.max_tasks = max_tasks
+        self._undo = deque()
+        self._redo = []
+        self._size = 0
+
+    def push(self, command):
+        """Record a change already made to the store."""
+        if not len(command):
+            return
+        self._redo.clear()
+        self._append(command)
+
+    def _append(self, command):
+        self._undo.append(command)
+        self._size += len(command)
+        while len(self._undo) > 1 and (len(self._undo) > self.limit or self._size > self.max_tasks):
+            self._size -= len(self._undo.popleft())
+
+    def discard(self, task_ids):
+        """Drop the commands on any of task_ids, which changed outside the history."""
+        task_ids = set(task_ids)
+        if not task_ids:
+            return
+        self._undo = deque(command for command in self._undo if task_ids.isdisjoint(command.task_ids()))
+        self._redo = [command for command in self._redo if task_ids.isdisjoint(command.task_ids())]
+        self._size = sum(map(len, self._undo))
+
+    def add_many(self, tasks):
+        self.store.add_many(tasks)
+        self.push(AddCommand(tasks))
+
+    def update_many(self, task_ids, **changes):
+        # The old values are read before the store changes them
+        command = UpdateCommand([task for task in map(self.store.get, task_ids) if task is not None],
+                                changes)
+        updated = self.store.update_many(task_ids, **changes)
+        self.push(command)
+        return updated
+
+    def delete_many(self, task_ids):
+        deleted = self.store.delete_many(task_ids)
+        self.push(DeleteCommand(deleted))
+        return deleted
+
+    def undo(self):
+        """Undo the latest command; returns False if there was none."""
+        if not self._undo:
+            return False
+        # A command that fails stays where it was
+        command = self._undo[-1]
+        command.undo(self.store)
+        self._undo.pop()
+        self._size -= len(command)
+        self._redo.append(command)
+        return True
+
+    def redo(self):
+        """Redo the latest undone command; returns False if there was none."""
+        if not self._redo:
+            return False
+        command = self._redo[-1]
+        command.redo(self.store)
+        self._redo.pop()
+        self._append(command)
+        return True
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._size = 0
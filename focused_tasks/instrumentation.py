@@ -0,0 +1,179 @@
+"""Opt-in timing of the app's hot paths.
+
+Hot paths are wrapped with timed() or measure() under a name, and do
+nothing but check a flag until the instrumentation is enabled. Once it
+is, every call is recorded: per path a count, total, maximum, a
+histogram over BUCKETS and the most recent durations for percentiles,
+and for all paths together a trace of the latest calls.
+
+dump() writes the trace to a file, as CSV if its name ends in .csv and
+as JSON otherwise, where it comes with the per-path summary.
+"""
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# Upper bounds of the histogram buckets, in ms; slower calls go in a last one
+BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class PathStats:
+    """Durations recorded for one hot path, in ms."""
+
+    def __init__(self, recent=1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+        self.recent = deque(maxlen=recent)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        bucket = 0
+        while bucket < len(BUCKETS) and ms > BUCKETS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+        self.recent.append(ms)
+
+    def percentile(self, q):
+        """The q-th percentile of the recent durations."""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+    def to_dict(self):
+        labels = [f"<={bound}ms" for bound in BUCKETS] + [f">{BUCKETS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_ms": self.total,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": self.max,
+            "histogram": dict(zip(labels, self.histogram)),
+        }
+
+
+class Instrumentation:
+    """Records how long the named hot paths take, while enabled.
+
+    Paths can be recorded from any thread, such as the background writer.
+    """
+
+    def __init__(self, max_events=100_000):
+        self.enabled = False
+        self.paths = {}
+        self.events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def record(self, name, seconds):
+        ms = seconds * 1e3
+        with self._lock:
+            stats = self.paths.get(name)
+            if stats is None:
+                stats = self.paths[name] = PathStats()
+            stats.add(ms)
+            self.events.append((time.perf_counter() - self._start, name, ms))
+
+    @contextmanager
+    def _measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def measure(self, name):
+        """Context manager recording the time spent in its block."""
+        if not self.enabled:
+            return nullcontext()
+        return self._measure(name)
+
+    def timed(self, name):
+        """Decorator recording the time spent in each call of a function."""
+        def decorate(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def summary(self):
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self.paths.items()}
+
+    def since(self, elapsed):
+        """The events recorded since elapsed seconds after the start."""
+        recent = []
+        with self._lock:
+            for event in reversed(self.events):
+                if event[0] <= elapsed:
+                    break
+                recent.append(event)
+        recent.reverse()
+        return recent
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def dump(self, path, gauges=None):
+        """Write the trace to path, as CSV or JSON by its extension."""
+        with self._lock:
+            events = list(self.events)
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(["time_s", "path", "duration_ms"])
+                for elapsed, name, ms in events:
+                    writer.writerow([f"{elapsed:.6f}", name, f"{ms:.3f}"])
+            return
+        trace = {
+            "paths": self.summary(),
+            "gauges": gauges or {},
+            "events": [[round(elapsed, 6), name, round(ms, 3)] for elapsed, name, ms in events],
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(trace, file, indent=1)
+
+
+def rss_mb():
+    """Resident memory of this process in MB, or its peak where that is all there is."""
+    try:
+        with open("/proc/self/statm", "r") as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+# The app's instrumentation, enabled with --perf or from the overlay
+instrumentation = Instrumentation()
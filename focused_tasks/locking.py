@@ -0,0 +1,82 @@
+"""Advisory file locks shared between processes.
+
+Every process that opens the same task files locks the same lock file
+around reading and writing them, so two windows, or a window and the
+command line, never interleave their changes. The locks are advisory:
+they only keep out processes that take them too.
+"""
+import errno
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Exclusive lock on a file, held by one thread of one process at a time.
+
+    Re-entrant within a thread, so a method holding the lock can call
+    another that takes it. The lock file is created on first use and left
+    in place afterwards; only the lock on it matters.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        # Locks on a file are held per process, so the threads of this one
+        # take turns through a lock of their own first
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, "a+b")
+                _lock(self._file)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+
+def _lock(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        return
+    # msvcrt locks a byte range. Each LK_LOCK call gives up after 10 tries
+    # of a second, so it is called again until the lock is free, to wait
+    # as long as flock() does; any other error is raised
+    file.seek(0)
+    while True:
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError as e:
+            if e.errno != errno.EDEADLOCK:
+                raise
+
+
+def _unlock(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
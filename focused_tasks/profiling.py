@@ -0,0 +1,110 @@
+"""Startup profiling: how long each phase and each import took.
+
+StartupProfile installs an import hook, like python -X importtime but
+without restarting the interpreter, so it can be switched on from the
+command line. Only modules imported after start() are timed.
+"""
+import sys
+import time
+
+
+class _TimedLoader:
+    # Wraps a module's loader to time creating and executing the module
+
+    def __init__(self, loader, name, profile):
+        self._loader = loader
+        self._name = name
+        self._profile = profile
+
+    def create_module(self, spec):
+        create_module = getattr(self._loader, "create_module", None)
+        if create_module is None:
+            return None
+        return self._profile.time_import(self._name, create_module, spec)
+
+    def exec_module(self, module):
+        self._profile.time_import(self._name, self._loader.exec_module, module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _ImportHook:
+    # First on sys.meta_path: finds modules through the other finders and
+    # hands back their specs with a timed loader
+
+    def __init__(self, profile):
+        self._profile = profile
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, "find_spec", None)
+            if finder is self or find_spec is None:
+                continue
+            spec = find_spec(name, path, target)
+            if spec is not None:
+                if hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, name, self._profile)
+                return spec
+        return None
+
+
+class StartupProfile:
+    """Times the phases of startup and the modules imported during it.
+
+    Call mark() at the end of every phase and report() once started up.
+    Import times are reported like -X importtime: "self" excludes the
+    imports a module makes itself, "cumulative" includes them.
+    """
+
+    def __init__(self):
+        self.phases = []
+        self.imports = {}
+        self._hook = None
+        self._nested = []
+        self._start = self._last = time.perf_counter()
+
+    def start(self):
+        self._hook = _ImportHook(self)
+        sys.meta_path.insert(0, self._hook)
+
+    def stop(self):
+        if self._hook in sys.meta_path:
+            sys.meta_path.remove(self._hook)
+
+    def time_import(self, name, function, *args):
+        # Time spent in the imports made meanwhile is collected in a
+        # frame of its own, to tell self time from cumulative time
+        self._nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            times = self.imports.setdefault(name, [0.0, 0.0])
+            times[0] += elapsed - nested
+            times[1] += elapsed
+
+    def mark(self, phase):
+        """End a phase of startup, which started when the last one ended."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self, file=None, top=20):
+        """Print the phases and the slowest imports, and stop timing imports."""
+        self.stop()
+        file = file if file is not None else sys.stderr
+        print("Startup profile", file=file)
+        for phase, elapsed in self.phases:
+            print(f"  {phase:<20} {elapsed * 1e3:>8.1f} ms", file=file)
+        print(f"  {'total':<20} {(self._last - self._start) * 1e3:>8.1f} ms", file=file)
+
+        slowest = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        print(f"{len(self.imports)} modules imported, slowest first:", file=file)
+        print(f"  {'self':>9} {'cumulative':>11}  module", file=file)
+        for name, (self_time, cumulative) in slowest:
+            print(f"  {self_time * 1e3:>6.1f} ms {cumulative * 1e3:>8.1f} ms  {name}", file=file)
@@ -0,0 +1,287 @@
+"""Recurring tasks: recurrence rules and the scheduler that spawns them.
+
+A rule is a short string kept on the task:
+
+    daily, weekly, monthly     every day, week or month
+    every N days|weeks|months  every N of them
+    cron M H DOM MON DOW       cron-like: minute, hour, day of month,
+                               month and day of week (0 or 7 is Sunday),
+                               each *, a number, a range a-b, a list a,b
+                               or any of those with a /step
+
+Interval rules repeat at the time of day of their anchor, the occurrence
+they count from, in local time. Monthly ones fall on the last day of
+months too short for the anchor's day, which then anchors the next. As
+in cron, a day matches when it matches either the day of month or the
+day of week, if both are given.
+
+Nothing here imports PyQt6; the app arms a single timer for
+RecurrenceScheduler.next_time().
+"""
+import calendar
+import heapq
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from .task import Task, new_task_ids
+
+# Rules the app offers in its menus, by label
+COMMON_RULES = {
+    "Daily": "daily",
+    "Weekly": "weekly",
+    "Monthly": "monthly",
+}
+
+UNITS = {"day": "days", "days": "days", "week": "weeks", "weeks": "weeks",
+         "month": "months", "months": "months"}
+
+# Cron rules that match nothing (such as February 30th) give up after this
+CRON_SEARCH_DAYS = 8 * 366
+
+
+def _add_months(moment, months):
+    month = moment.month - 1 + months
+    year = moment.year + month // 12
+    month = month % 12 + 1
+    day = min(moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+
+class IntervalRule:
+    """Every count days, weeks or months from the anchor."""
+
+    def __init__(self, count, unit):
+        if count < 1:
+            raise ValueError("a recurrence interval must be at least 1")
+        self.count = count
+        self.unit = unit
+
+    def _occurrence(self, start, step):
+        if self.unit == "months":
+            return _add_months(start, step)
+        return start + timedelta(days=step * (7 if self.unit == "weeks" else 1))
+
+    def next_after(self, anchor, after):
+        """The first occurrence later than after, in epoch seconds."""
+        start = datetime.fromtimestamp(anchor)
+        end = datetime.fromtimestamp(after)
+        # Jump close to after in one step; at most a step or two remain
+        if self.unit == "months":
+            elapsed = (end.year - start.year) * 12 + end.month - start.month
+        else:
+            elapsed = (end.date() - start.date()).days // (7 if self.unit == "weeks" else 1)
+        step = max(0, elapsed // self.count - 1) * self.count
+        while True:
+            occurrence = int(self._occurrence(start, step).timestamp())
+            if occurrence > after:
+                return occurrence
+            step += self.count
+
+
+def _parse_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/", 1)
+            step = int(step)
+            if step < 1:
+                raise ValueError(f"bad step in {field!r}")
+        if part == "*":
+            first, last = low, high
+        elif "-" in part:
+            first, last = map(int, part.split("-", 1))
+        else:
+            first = last = int(part)
+        if not low <= first <= last <= high:
+            raise ValueError(f"{field!r} is out of range {low}-{high}")
+        values.update(range(first, last + 1, step))
+    return values
+
+
+class CronRule:
+    """Minutes matching a cron-like expression; the anchor is not used."""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("a cron rule has 5 fields: minute hour day month weekday")
+        self.minutes = sorted(_parse_field(fields[0], 0, 59))
+        self.hours = sorted(_parse_field(fields[1], 0, 23))
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        # Sunday is 0 or 7 in cron and 6 in Python's weekday()
+        self.weekdays = {(day - 1) % 7 for day in _parse_field(fields[4], 0, 7)}
+        self.any_day = fields[2].startswith("*")
+        self.any_weekday = fields[4].startswith("*")
+
+    def _day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        by_day = day.day in self.days
+        by_weekday = day.weekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return by_day and by_weekday
+        return by_day or by_weekday
+
+    def next_after(self, anchor, after):
+        """The first matching minute later than after, or None if there is none."""
+        start = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(CRON_SEARCH_DAYS):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        moment = day.replace(hour=hour, minute=minute)
+                        if moment >= start:
+                            return int(moment.timestamp())
+            day += timedelta(days=1)
+        return None
+
+
+@lru_cache(maxsize=256)
+def parse_rule(text):
+    """Parse a recurrence rule; raises ValueError if it is not one."""
+    words = text.strip().lower().split()
+    try:
+        if len(words) == 1 and words[0] in ("daily", "weekly", "monthly"):
+            unit = {"daily": "days", "weekly": "weeks", "monthly": "months"}[words[0]]
+            return IntervalRule(1, unit)
+        if len(words) == 3 and words[0] == "every" and words[2] in UNITS:
+            return IntervalRule(int(words[1]), UNITS[words[2]])
+        if len(words) == 2 and words[0] == "every" and words[1] in UNITS:
+            return IntervalRule(1, UNITS[words[1]])
+        if words and words[0] == "cron":
+            return CronRule(" ".join(words[1:]))
+    except ValueError as e:
+        raise ValueError(f"Invalid recurrence rule {text!r}: {e}") from None
+    raise ValueError(f"Unknown recurrence rule: {text!r}")
+
+
+def first_occurrence(rule, now=None):
+    """next_at for a task that starts repeating now, or None if it never recurs."""
+    now = int(time.time()) if now is None else now
+    return parse_rule(rule).next_after(now, now)
+
+
+class RecurrenceScheduler:
+    """The next occurrences of the recurring tasks in a store.
+
+    Occurrences are kept in a min-heap of (next_at, task id), so the
+    earliest is always at the top and scheduling or taking one is
+    O(log n). Tasks whose occurrence changes or that stop recurring are
+    not searched for in the heap; the current next_at of every scheduled
+    task is kept in a dict, and heap entries that no longer match it are
+    dropped when they reach the top. Once stale entries outnumber the
+    live ones the heap is rebuilt from the dict.
+
+    rebuild() fills the heap from every task once; after that it is kept
+    up to date with on_tasks_changed(), a store listener, and the tasks
+    are never scanned again.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._heap = []
+        self._scheduled = {}
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    def rebuild(self):
+        self._scheduled = {task.id: task.next_at for task in self.store
+                           if task.recurrence is not None and task.next_at is not None}
+        self._compact()
+
+    def _compact(self):
+        self._heap = [(next_at, task_id) for task_id, next_at in self._scheduled.items()]
+        heapq.heapify(self._heap)
+
+    def schedule(self, task):
+        """Schedule a task's next occurrence; returns whether it changed."""
+        next_at = task.next_at if task.recurrence is not None else None
+        if self._scheduled.get(task.id) == next_at:
+            return False
+        if next_at is None:
+            del self._scheduled[task.id]
+            return True
+        self._scheduled[task.id] = next_at
+        heapq.heappush(self._heap, (next_at, task.id))
+        if len(self._heap) > 2 * len(self._scheduled) + 64:
+            self._compact()
+        return True
+
+    def on_tasks_changed(self, changes):
+        """Store listener; returns whether any occurrence changed."""
+        changed = False
+        for op, task in changes:
+            if op == "delete":
+                changed |= self._scheduled.pop(task.id, None) is not None
+            else:
+                changed |= self.schedule(task)
+        return changed
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._scheduled.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def next_time(self):
+        """Epoch seconds of the earliest occurrence, or None if there is none."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def due(self, now):
+        """Unschedule and return the ids of the tasks due by now."""
+        task_ids = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            _, task_id = heapq.heappop(self._heap)
+            del self._scheduled[task_id]
+            task_ids.append(task_id)
+            self._drop_stale()
+        return task_ids
+
+    def spawn_due(self, now=None):
+        """Add the next instance of every task that is due.
+
+        Returns the ids of the due tasks, which stop recurring, and the
+        instances added. A task whose rule cannot be parsed is left as it
+        is, and no longer scheduled.
+
+        The new instance takes over the rule, and the one before it keeps
+        the rest: its text, tags and project, which the instance copies.
+        A due date moves along by as many days as the instance is dated
+        after the task before it. Occurrences missed while the app was
+        closed spawn a single instance, dated at the first of them.
+        """
+        now = int(time.time()) if now is None else now
+        due = [self.store.get(task_id) for task_id in self.due(now)]
+        due = [task for task in due if task is not None]
+        if not due:
+            return [], []
+
+        spawned = []
+        instances = []
+        for task, task_id in zip(due, new_task_ids(len(due))):
+            try:
+                rule = parse_rule(task.recurrence)
+            except ValueError as e:
+                print(f"Error in recurring task {task.id}: {e}")
+                continue
+            # The instance is dated at the occurrence that fell due, and its
+            # own next one is the first still to come
+            due_at = None
+            if task.due_at is not None:
+                days = (datetime.fromtimestamp(task.next_at).date()
+                        - datetime.fromtimestamp(task.created_at).date())
+                due_at = int((datetime.fromtimestamp(task.due_at) + days).timestamp())
+            spawned.append(task.id)
+            instances.append(Task(task_id, task.text, False, task.priority, task.next_at,
+                                  task.recurrence, rule.next_after(task.next_at, now),
+                                  task.tags, task.project, due_at))
+
+        self.store.update_many(spawned, recurrence=None, next_at=None)
+        self.store.add_many(instances)
+        return spawned, instances
@@ -0,0 +1,103 @@
+"""Word index for searching task text."""
+import re
+from bisect import bisect_left, insort
+
+_WORD = re.compile(r"\w+")
+
+# Sorts after every token starting with a given prefix
+_PREFIX_END = "\U0010ffff"
+
+
+def tokenize(text):
+    """Split text into lowercase words."""
+    return _WORD.findall(text.lower())
+
+
+def matches(task, terms):
+    """Whether every term is the start of a word in the task's text."""
+    words = tokenize(task.text)
+    return all(any(word.startswith(term) for word in words) for term in terms)
+
+
+class SearchIndex:
+    """Inverted index from words to the ids of the tasks containing them.
+
+    The distinct words are also kept sorted, so every word starting with a
+    search term is found with one bisect. Tasks are added, updated and
+    removed one at a time, each costing only the words of that task.
+    """
+
+    def __init__(self, tasks=()):
+        self._postings = {}
+        self._words = []
+        self._task_words = {}
+        for task in tasks:
+            self.add(task)
+
+    def __len__(self):
+        return len(self._task_words)
+
+    def add(self, task):
+        """Index a task, replacing what was indexed under its id."""
+        if task.id in self._task_words:
+            self.remove(task.id)
+        words = tuple(set(tokenize(task.text)))
+        self._task_words[task.id] = words
+        for word in words:
+            ids = self._postings.get(word)
+            if ids is None:
+                self._postings[word] = {task.id}
+                insort(self._words, word)
+            else:
+                ids.add(task.id)
+
+    def remove(self, task_id):
+        for word in self._task_words.pop(task_id, ()):
+            ids = self._postings[word]
+            ids.discard(task_id)
+            if not ids:
+                del self._postings[word]
+                del self._words[bisect_left(self._words, word)]
+
+    def update(self, task):
+        # Only a changed text changes the index
+        if set(tokenize(task.text)) != set(self._task_words.get(task.id, ())):
+            self.remove(task.id)
+            self.add(task)
+
+    def _prefixed(self, term):
+        # The words starting with term
+        start = bisect_left(self._words, term)
+        end = bisect_left(self._words, term + _PREFIX_END, start)
+        return self._words[start:end]
+
+    def search(self, terms):
+        """Return the ids of the tasks matching every term as a word prefix."""
+        if not terms:
+            return set(self._task_words)
+
+        # Start from the term with the fewest matches and narrow down with
+        # set intersections, which run at C speed. Once few tasks are left,
+        # checking their own words is cheaper than collecting a common
+        # term's matches
+        postings = self._postings
+        candidates = []
+        for term in set(terms):
+            words = self._prefixed(term)
+            candidates.append((sum(len(postings[word]) for word in words), term, words))
+        candidates.sort()
+
+        ids = None
+        for count, term, words in candidates:
+            if ids is not None and len(ids) * 8 < count:
+                task_words = self._task_words
+                ids = {task_id for task_id in ids
+                       if any(word.startswith(term) for word in task_words[task_id])}
+                continue
+            found = set()
+            for word in words:
+                found |= postings[word]
+            ids = found if ids is None else ids & found
+            if not ids:
+                break
+        return ids
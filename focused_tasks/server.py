@@ -0,0 +1,414 @@
+"""Local HTTP/JSON API over the task list of a running window.
+
+Other tools on the machine can read and change the list while the app is
+open, with tasks in the tasks.json shape:
+
+    GET    /tasks       the list, a page at a time; takes ?sort=priority,
+                        date or alpha, ?status=pending or completed,
+                        ?search=words, ?filter= (see filters.py),
+                        ?offset= and ?limit= (at most MAX_LIMIT,
+                        default PAGE_SIZE)
+    GET    /tasks/ID    one task
+    POST   /tasks       add a task, {"text": ..., "priority": ...,
+                        "completed": ..., "recurrence": ..., "tags": [...],
+                        "project": ..., "due_at": ...}, or a list of them
+    PATCH  /tasks/ID    change any of those fields; null stops the
+                        recurrence and clears the project or due date
+    DELETE /tasks/ID    delete a task
+
+GET responses carry an ETag that changes with every change to the list,
+and a request whose If-None-Match has the current one gets 304 Not
+Modified, without the list being read at all.
+
+The server only listens on localhost. Requests from web pages are kept
+out by requiring a localhost Host header, against DNS rebinding, and a
+JSON body for changes, which browsers never send cross-site without the
+preflight this server does not answer.
+
+Requests are parsed by an asyncio loop on a thread of its own, but
+handled by TaskApi on the thread that owns the store, the UI thread in the
+app: ApiDispatcher queues them and calls wake once per batch, and the
+owner then runs every queued request in one TaskStore.batch(), so that a
+burst of requests reaches the list and storage as one change.
+"""
+import asyncio
+import concurrent.futures
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from .filters import day_start, is_name, parse_date
+from .recurrence import first_occurrence
+from .task import Priority, Task, new_task_ids, parse_task_id
+from .task_store import SORT_CHOICES
+
+PAGE_SIZE = 100
+MAX_LIMIT = 1000
+MAX_BODY = 16 * 1024 * 1024
+# Keep-alive connections with no request for this long are closed, in seconds
+IDLE_TIMEOUT = 30
+
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "[::1]")
+
+
+class ApiError(Exception):
+    """A request that gets an error response."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    def __init__(self, method, path, query=None, headers=None, body=b""):
+        self.method = method
+        self.path = path
+        self.query = query or {}
+        self.headers = headers or {}
+        self.body = body
+
+    def json(self):
+        try:
+            return json.loads(self.body)
+        except ValueError as e:
+            raise ApiError(400, f"Invalid JSON: {e}") from None
+
+
+class Response:
+    def __init__(self, status, data=None, headers=None):
+        self.status = status
+        self.data = data
+        self.headers = headers or {}
+
+
+def check_request(request):
+    """Reject requests that may come from a web page; returns an error Response or None."""
+    host = request.headers.get("host", "")
+    if host.rsplit(":", 1)[0] not in LOCAL_HOSTS and host not in LOCAL_HOSTS:
+        return Response(403, {"error": "Only local requests are allowed"})
+    if request.body and request.headers.get("content-type", "").split(";")[0].strip() != "application/json":
+        return Response(415, {"error": "Request bodies must be application/json"})
+    return None
+
+
+def _due_at(value):
+    # A date or a date and time, as in tasks.json, or null
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ApiError(400, "due_at must be a date or null")
+    try:
+        if len(value) <= len("YYYY-MM-DD"):
+            return day_start(parse_date(value))
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError as e:
+        raise ApiError(400, f"Invalid due_at: {e}") from None
+
+
+def _int_param(query, name, default, high=None):
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer") from None
+    if value < 0:
+        raise ApiError(400, f"{name} must not be negative")
+    return value if high is None else min(value, high)
+
+
+class TaskApi:
+    """The API's requests, handled on the thread that owns the store."""
+
+    def __init__(self, store):
+        self.store = store
+        # Tells this run's ETags from those of earlier runs
+        self._epoch = format(time.time_ns() // 1000, "x")
+        # Why changes are refused, if they are
+        self.read_only = None
+
+    def etag(self):
+        return f'"{self._epoch}-{self.store.version}"'
+
+    def handle(self, request):
+        try:
+            return self._route(request)
+        except ApiError as e:
+            return Response(e.status, {"error": str(e)})
+
+    def _route(self, request):
+        parts = [part for part in request.path.split("/") if part]
+        if not parts or parts[0] != "tasks" or len(parts) > 2:
+            raise ApiError(404, f"No such resource: {request.path}")
+        task_id = parse_task_id(parts[1]) if len(parts) == 2 else None
+
+        if request.method == "GET":
+            # Nothing needs reading if the client's copy is current
+            etag = self.etag()
+            if request.headers.get("if-none-match") == etag:
+                return Response(304, headers={"ETag": etag})
+            data = self.list_tasks(request.query) if task_id is None else self._task(task_id).to_dict()
+            return Response(200, data, {"ETag": etag})
+        if self.read_only is not None and request.method in ("POST", "PATCH", "DELETE"):
+            raise ApiError(503, f"Tasks are read-only: {self.read_only}")
+        if task_id is None:
+            if request.method == "POST":
+                return self.add_tasks(request.json())
+            allowed = "GET, POST"
+        else:
+            if request.method == "PATCH":
+                return self.update_task(task_id, request.json())
+            if request.method == "DELETE":
+                self._task(task_id)
+                self.store.delete(task_id)
+                return Response(204)
+            allowed = "GET, PATCH, DELETE"
+        return Response(405, {"error": f"{request.method} is not allowed here"}, {"Allow": allowed})
+
+    def _task(self, task_id):
+        task = self.store.get(task_id)
+        if task is None:
+            raise ApiError(404, f"No task with id {task_id}")
+        return task
+
+    def list_tasks(self, query):
+        sort_method = SORT_CHOICES.get(query.get("sort", "priority"))
+        if sort_method is None:
+            raise ApiError(400, f"sort must be one of {', '.join(SORT_CHOICES)}")
+        status = query.get("status")
+        if status not in (None, "pending", "completed"):
+            raise ApiError(400, "status must be pending or completed")
+        offset = _int_param(query, "offset", 0)
+        limit = _int_param(query, "limit", PAGE_SIZE, MAX_LIMIT)
+
+        try:
+            view = self.store.find(query.get("search", ""), sort_method, query.get("filter", ""))
+        except ValueError as e:
+            raise ApiError(400, str(e)) from None
+        if view is None:
+            view = self.store.view(sort_method)
+        # Every sort puts pending tasks before completed ones, so each
+        # status is a range of rows
+        first, end = 0, len(view)
+        if status is not None:
+            split = view.bisect((True,))
+            first, end = (0, split) if status == "pending" else (split, end)
+        start = min(first + offset, end)
+        rows = range(start, min(start + limit, end))
+        return {
+            "total": end - first,
+            "offset": offset,
+            "limit": limit,
+            "tasks": [view[row].to_dict() for row in rows],
+        }
+
+    def _fields(self, data, new):
+        # The task fields set by a POST or PATCH body, checked
+        if not isinstance(data, dict):
+            raise ApiError(400, "A task must be a JSON object")
+        unknown = set(data) - {"text", "completed", "priority", "recurrence", "tags", "project", "due_at"}
+        if unknown:
+            raise ApiError(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+        fields = {}
+        if "text" in data or new:
+            text = data.get("text")
+            if not isinstance(text, str) or not text.strip():
+                raise ApiError(400, "text must be a non-empty string")
+            fields["text"] = text.strip()
+        if "completed" in data:
+            if not isinstance(data["completed"], bool):
+                raise ApiError(400, "completed must be true or false")
+            fields["completed"] = data["completed"]
+        if "priority" in data:
+            label = data["priority"]
+            if not isinstance(label, str) or label.upper() not in Priority.__members__:
+                raise ApiError(400, "priority must be high, medium or low")
+            fields["priority"] = Priority.from_label(label)
+        if "recurrence" in data:
+            rule = data["recurrence"]
+            if rule is not None and not isinstance(rule, str):
+                raise ApiError(400, "recurrence must be a rule or null")
+            try:
+                next_at = None if rule is None else first_occurrence(rule)
+            except ValueError as e:
+                raise ApiError(400, str(e)) from None
+            if rule is not None and next_at is None:
+                raise ApiError(400, f"recurrence {rule!r} never recurs")
+            fields["recurrence"] = rule
+            fields["next_at"] = next_at
+        if "tags" in data:
+            tags = data["tags"]
+            if not isinstance(tags, list) or not all(isinstance(tag, str) and is_name(tag) for tag in tags):
+                raise ApiError(400, "tags must be a list of names")
+            fields["tags"] = tuple(dict.fromkeys(tag.lower() for tag in tags))
+        if "project" in data:
+            project = data["project"]
+            if project is not None and not (isinstance(project, str) and is_name(project)):
+                raise ApiError(400, "project must be a name or null")
+            fields["project"] = None if project is None else project.lower()
+        if "due_at" in data:
+            fields["due_at"] = _due_at(data["due_at"])
+        return fields
+
+    def add_tasks(self, data):
+        items = data if isinstance(data, list) else [data]
+        fields = [self._fields(item, new=True) for item in items]
+        tasks = [Task(task_id, **item_fields)
+                 for task_id, item_fields in zip(new_task_ids(len(fields)), fields)]
+        self.store.add_many(tasks)
+        if isinstance(data, list):
+            return Response(201, [task.to_dict() for task in tasks])
+        return Response(201, tasks[0].to_dict(), {"Location": f"/tasks/{tasks[0].id}"})
+
+    def update_task(self, task_id, data):
+        self._task(task_id)
+        fields = self._fields(data, new=False)
+        if fields:
+            self.store.update(task_id, **fields)
+        return Response(200, self._task(task_id).to_dict())
+
+
+class ApiDispatcher:
+    """Hands requests from the server's thread to the store's owner, in batches."""
+
+    def __init__(self, api, wake):
+        self.api = api
+        self.wake = wake
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def submit(self, request):
+        """Queue a request, from any thread; returns a Future of its Response."""
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._pending.append((request, future))
+            first = len(self._pending) == 1
+        # One wake-up per batch: later requests join the queued ones
+        if first:
+            self.wake()
+        return future
+
+    def run_pending(self):
+        """Handle every queued request, on the thread that owns the store."""
+        with self._lock:
+            pending, self._pending = self._pending, deque()
+        if not pending:
+            return
+        with self.api.store.batch(len(pending)):
+            for request, future in pending:
+                try:
+                    future.set_result(self.api.handle(request))
+                except Exception as e:
+                    # A bug in a handler fails its request, not the batch
+                    print(f"Error handling {request.method} {request.path}: {e}")
+                    future.set_result(Response(500, {"error": "Internal error"}))
+
+
+class ApiServer:
+    """HTTP/1.1 server for the API, with an asyncio loop on its own thread."""
+
+    def __init__(self, dispatcher, port=8765, host="127.0.0.1"):
+        self.dispatcher = dispatcher
+        self.host = host
+        self.port = port
+        self._thread = None
+        self._loop = None
+        self._stopping = None
+        self._error = None
+
+    def start(self):
+        """Start listening; raises OSError if the port cannot be used."""
+        started = threading.Event()
+        self._thread = threading.Thread(target=asyncio.run, args=(self._serve(started),),
+                                        name="api-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        if self._error is not None:
+            raise self._error
+
+    def stop(self):
+        # Requests still waiting for the owner are dropped with their connections
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stopping.set)
+            self._thread.join(timeout=5)
+
+    async def _serve(self, started):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        except OSError as e:
+            self._error = e
+            started.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        started.set()
+        await self._stopping.wait()
+        server.close()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), IDLE_TIMEOUT)
+                except ApiError as e:
+                    await self._write(writer, Response(e.status, {"error": str(e)}), close=True)
+                    break
+                if request is None:
+                    break
+                try:
+                    response = check_request(request)
+                    if response is None:
+                        response = await asyncio.wrap_future(self.dispatcher.submit(request))
+                except Exception as e:
+                    # Whatever went wrong, the client gets an answer
+                    print(f"Error handling {request.method} {request.path}: {e}")
+                    response = Response(500, {"error": "Internal error"})
+                close = request.headers.get("connection", "").lower() == "close"
+                await self._write(writer, response, close)
+                if close:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            # Also raised by readline() for lines over the stream's limit
+            raise ApiError(400, "Malformed request") from None
+        if length > MAX_BODY:
+            raise ApiError(413, "Request body too large")
+        body = await reader.readexactly(length) if length > 0 else b""
+        url = urlsplit(target)
+        return Request(method.upper(), unquote(url.path), dict(parse_qsl(url.query)), headers, body)
+
+    async def _write(self, writer, response, close=False):
+        body = b""
+        if response.data is not None:
+            body = json.dumps(response.data).encode("utf-8")
+        lines = [f"HTTP/1.1 {response.status} {HTTPStatus(response.status).phrase}"]
+        headers = dict(response.headers)
+        if response.status not in (204, 304):
+            headers["Content-Type"] = "application/json"
+            headers["Content-Length"] = str(len(body))
+        if close:
+            headers["Connection"] = "close"
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
@@ -0,0 +1,360 @@
+"""Compact, versioned binary snapshot of the task list.
+
+An alternative to a tasks.json array for the journal's snapshot, which at
+scale is mostly repeated keys and formatted timestamps to parse. The file
+is a fixed header followed by a body, compressed as a whole or not:
+
+    header   magic b"FTSNAP", format version, compression, task count,
+             string count, body size and size as stored (HEADER)
+    body     interned strings: a u32 length and UTF-8 bytes each
+             offsets: a u64 per task, where its record starts in the body
+             records: one per task, each a u32 length of the rest, then
+                 the id, created_at, next_at, due_at (epoch seconds),
+                 flags (completed, has next_at, has recurrence, has
+                 due_at, has project), priority rank, indexes of the
+                 recurrence rule and project in the strings and the
+                 number of tags (RECORD), then a u32 index in the strings
+                 per tag (TAG) and the UTF-8 text
+
+Priorities are stored as their rank, and recurrence rules, projects and
+tags once each in the string table, so a record holds nothing but the
+task's own values.
+Uncompressed snapshots are read through mmap: the offsets give every
+record's position up front, so any task can be decoded on its own and
+its id read without decoding the rest, which lets the journal skip the
+records its log has replaced. Loading the whole list still decodes every
+other task, text included. Compressed snapshots (COMPRESSIONS; zstd
+needs the zstandard package) are decompressed in one go first.
+
+Readers refuse versions newer than VERSION, which goes up with any change
+to the layout. Version 1 kept the id as a string after the record's
+fixed part (RECORD_V1), version 2 had no due date, project or tags
+(RECORD_V2), and versions up to 3 held string lengths and indexes in
+16 bits (RECORD_V3), which capped a snapshot at 65,536 distinct rules,
+projects and tags; such snapshots are still read.
+
+Run as python -m focused_tasks.snapshot SOURCE TARGET to convert between
+a tasks.json style file and a snapshot, by TARGET's extension (.bin for a
+snapshot).
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+from .task import Priority, Task, parse_task_id
+
+try:
+    import zstandard
+except ImportError:  # Optional
+    zstandard = None
+
+MAGIC = b"FTSNAP"
+VERSION = 4
+HEADER = struct.Struct("<6sHBxIIQQ")
+RECORD = struct.Struct("<IqqqqBBIII")
+RECORD_V3 = struct.Struct("<IqqqqBBHHH")
+RECORD_V2 = struct.Struct("<IqqqBBH")
+RECORD_V1 = struct.Struct("<IqqBBHH")
+RECORD_SIZE = struct.Struct("<I")
+RECORD_ID = struct.Struct("<4xq")
+TAG = struct.Struct("<I")
+TAG_V3 = struct.Struct("<H")
+OFFSET = struct.Struct("<Q")
+STRING_LENGTH = struct.Struct("<I")
+STRING_LENGTH_V3 = struct.Struct("<H")
+
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2}
+
+COMPLETED = 1
+HAS_NEXT_AT = 2
+HAS_RECURRENCE = 4
+HAS_DUE_AT = 8
+HAS_PROJECT = 16
+
+PRIORITIES = list(Priority)
+
+
+def is_snapshot_path(path):
+    """Whether path names a binary snapshot rather than a JSON file."""
+    return path.endswith(".bin")
+
+
+def is_snapshot_file(path):
+    """Whether the file at path holds a binary snapshot.
+
+    A snapshot the binary format could not hold is written as JSON
+    instead, under the same name.
+    """
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def _compress(body, compression):
+    if compression == "zlib":
+        return zlib.compress(body, 6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        return zstandard.ZstdCompressor().compress(body)
+    return body
+
+
+def _decompress(data, compression, size):
+    if compression == COMPRESSIONS["zlib"]:
+        return zlib.decompress(data)
+    if compression == COMPRESSIONS["zstd"]:
+        if zstandard is None:
+            raise ValueError("reading a zstd snapshot needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=size)
+    raise ValueError(f"unknown snapshot compression {compression}")
+
+
+def encode_snapshot(tasks, compression="none"):
+    """Return the snapshot of tasks as bytes."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"unknown snapshot compression {compression!r}")
+    strings = {}
+    records = []
+    for task in tasks:
+        flags = COMPLETED if task.completed else 0
+        rule = 0
+        if task.recurrence is not None:
+            flags |= HAS_RECURRENCE
+            rule = strings.setdefault(task.recurrence, len(strings))
+        if task.next_at is not None:
+            flags |= HAS_NEXT_AT
+        if task.due_at is not None:
+            flags |= HAS_DUE_AT
+        project = 0
+        if task.project is not None:
+            flags |= HAS_PROJECT
+            project = strings.setdefault(task.project, len(strings))
+        tags = b"".join(TAG.pack(strings.setdefault(tag, len(strings))) for tag in task.tags)
+        text = task.text.encode("utf-8")
+        records.append(RECORD.pack(RECORD.size - 4 + len(tags) + len(text), task.id, task.created_at,
+                                   task.next_at or 0, task.due_at or 0, flags, task.priority, rule,
+                                   project, len(task.tags))
+                       + tags + text)
+
+    parts = []
+    for string in strings:
+        data = string.encode("utf-8")
+        parts.append(STRING_LENGTH.pack(len(data)) + data)
+    position = sum(map(len, parts)) + OFFSET.size * len(records)
+    offsets = []
+    for record in records:
+        offsets.append(OFFSET.pack(position))
+        position += len(record)
+    body = b"".join(parts + offsets + records)
+
+    stored = _compress(body, compression)
+    header = HEADER.pack(MAGIC, VERSION, COMPRESSIONS[compression], len(records), len(strings),
+                         len(body), len(stored))
+    return header + stored
+
+
+def write_snapshot(path, tasks, compression="none"):
+    """Write tasks to a snapshot file and flush it to disk."""
+    data = encode_snapshot(tasks, compression)
+    with open(path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def write_snapshot_atomic(path, tasks, compression="none"):
+    # Like write_json_atomic(): a crash leaves the old file or the new one
+    tmp_path = path + ".tmp"
+    write_snapshot(tmp_path, tasks, compression)
+    os.replace(tmp_path, path)
+
+
+class SnapshotReader:
+    """Random access to the tasks of a snapshot file.
+
+    Tasks are decoded one at a time as they are indexed or iterated, and
+    come back as new Task objects each time. close() releases the file;
+    the reader is also a context manager.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        try:
+            header = self._file.read(HEADER.size)
+            if len(header) < HEADER.size or not header.startswith(MAGIC):
+                raise ValueError(f"{path}: not a task snapshot")
+            _, version, compression, self._count, strings, size, stored = HEADER.unpack(header)
+            if version > VERSION:
+                raise ValueError(f"{path}: snapshot version {version} is newer than this app's")
+            self._version = version
+            self._record, self._tag = (RECORD, TAG) if version >= 4 else (RECORD_V3, TAG_V3)
+            string_length = STRING_LENGTH if version >= 4 else STRING_LENGTH_V3
+
+            if compression == COMPRESSIONS["none"]:
+                # An empty file cannot be mapped, but then there is no body
+                if stored:
+                    self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._body = memoryview(self._map)[HEADER.size:HEADER.size + size]
+                else:
+                    self._body = memoryview(b"")
+            else:
+                self._body = memoryview(_decompress(self._file.read(stored), compression, size))
+            if len(self._body) != size:
+                raise ValueError(f"{path}: snapshot is truncated")
+
+            self._strings = []
+            position = 0
+            for _ in range(strings):
+                (length,) = string_length.unpack_from(self._body, position)
+                position += string_length.size
+                self._strings.append(str(self._body[position:position + length], "utf-8"))
+                position += length
+            self._offsets = position
+        except BaseException:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, index):
+        return OFFSET.unpack_from(self._body, self._offsets + index * OFFSET.size)[0]
+
+    def _decode(self, position):
+        if self._version == 1:
+            return self._decode_v1(position)
+        if self._version == 2:
+            return self._decode_v2(position)
+        record, tag = self._record, self._tag
+        (size, task_id, created_at, next_at, due_at, flags, priority, rule, project,
+         tag_count) = record.unpack_from(self._body, position)
+        start = position + record.size
+        strings = self._strings
+        tags = tuple(strings[tag.unpack_from(self._body, start + i * tag.size)[0]]
+                     for i in range(tag_count))
+        start += tag_count * tag.size
+        return Task(
+            task_id,
+            str(self._body[start:position + 4 + size], "utf-8"),
+            bool(flags & COMPLETED),
+            PRIORITIES[priority],
+            created_at,
+            strings[rule] if flags & HAS_RECURRENCE else None,
+            next_at if flags & HAS_NEXT_AT else None,
+            tags,
+            strings[project] if flags & HAS_PROJECT else None,
+            due_at if flags & HAS_DUE_AT else None,
+        )
+
+    def _decode_v2(self, position):
+        size, task_id, created_at, next_at, flags, priority, rule = RECORD_V2.unpack_from(self._body, position)
+        return Task(
+            task_id,
+            str(self._body[position + RECORD_V2.size:position + 4 + size], "utf-8"),
+            bool(flags & COMPLETED),
+            PRIORITIES[priority],
+            created_at,
+            self._strings[rule] if flags & HAS_RECURRENCE else None,
+            next_at if flags & HAS_NEXT_AT else None,
+        )
+
+    def _decode_v1(self, position):
+        size, created_at, next_at, flags, priority, rule, id_length = RECORD_V1.unpack_from(self._body, position)
+        start = position + RECORD_V1.size
+        text_start = start + id_length
+        return Task(
+            parse_task_id(str(self._body[start:text_start], "utf-8"), created_at),
+            str(self._body[text_start:position + 4 + size], "utf-8"),
+            bool(flags & COMPLETED),
+            PRIORITIES[priority],
+            created_at,
+            self._strings[rule] if flags & HAS_RECURRENCE else None,
+            next_at if flags & HAS_NEXT_AT else None,
+        )
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("task index out of range")
+        return self._decode(self._offset(index))
+
+    def id_at(self, index):
+        """The id of the task at index, without decoding the rest of it."""
+        position = self._offset(index)
+        if self._version == 1:
+            _, created_at, *_, id_length = RECORD_V1.unpack_from(self._body, position)
+            start = position + RECORD_V1.size
+            return parse_task_id(str(self._body[start:start + id_length], "utf-8"), created_at)
+        return RECORD_ID.unpack_from(self._body, position)[0]
+
+    def __iter__(self):
+        # Records follow each other, so their lengths lead from one to the next
+        position = self._offsets + self._count * OFFSET.size
+        for _ in range(self._count):
+            yield self._decode(position)
+            position += 4 + RECORD_SIZE.unpack_from(self._body, position)[0]
+
+    def close(self):
+        if getattr(self, "_body", None) is not None:
+            self._body.release()
+            self._body = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_snapshot(path):
+    """Yield the tasks of a snapshot file, closing it once done."""
+    with SnapshotReader(path) as reader:
+        yield from reader
+
+
+def read_snapshot(path):
+    return list(iter_snapshot(path))
+
+
+def convert(source, target, compression="none"):
+    """Convert between a tasks.json style file and a snapshot, by their extensions."""
+    # storage.py imports this module, so not the other way round at import time
+    from .storage import iter_json_array, write_json_tasks
+
+    if is_snapshot_path(source) and is_snapshot_file(source):
+        tasks = iter_snapshot(source)
+    else:
+        tasks = map(Task.from_dict, iter_json_array(source))
+    if is_snapshot_path(target):
+        write_snapshot_atomic(target, list(tasks), compression)
+    else:
+        write_json_tasks(target, tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert between tasks.json files and binary snapshots")
+    parser.add_argument("source", help="file to read: a snapshot if it ends in .bin, JSON otherwise")
+    parser.add_argument("target", help="file to write, likewise")
+    parser.add_argument("--compression", choices=sorted(COMPRESSIONS), default="none",
+                        help="compression of a snapshot target (default: none)")
+    args = parser.parse_args(argv)
+    try:
+        convert(args.source, args.target, args.compression)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1277 @@
+"""Storage backends for the task list.
+
+Backends persist changes handed to apply() as a list of operations:
+
+    ("add", task)       a new Task, replacing any stored one with its id
+    ("update", task)    the full, updated Task
+    ("delete", task_id)
+
+The file backends store tasks in the same shape as tasks.json, which stays
+the import/export format for every backend. They keep their own copy of
+the stored tasks, keyed by id; SqliteStorage reads and writes the database
+directly.
+
+load_iter() streams the stored tasks one at a time instead of reading
+them all first, so a large list can be shown while it is still loading.
+
+Several processes can share the same files. Writes are made under an
+advisory file lock, and each format carries a generation that changes
+whenever another process rewrites it, so every process can tell what it
+has not seen yet. refresh() returns the changes other processes saved
+since the last look, for the caller to merge into its own tasks.
+"""
+import json
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from .instrumentation import instrumentation
+from .locking import FileLock
+from .snapshot import SnapshotReader, is_snapshot_file, is_snapshot_path, write_snapshot
+from .task import Priority, Task, dict_task_id, parse_task_id
+
+
+_JSON_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_JSON_SEPARATOR = re.compile(r"[ \t\r\n]*([,\]]?)[ \t\r\n]*")
+
+
+def write_json_atomic(path, data):
+    """Write data as JSON to path without ever leaving a truncated file.
+
+    The JSON is written to a temporary file next to path, flushed to disk
+    and then renamed over path, so a crash leaves either the old or the new
+    file in place.
+    """
+    tmp_path = path + ".tmp"
+    write_json_durable(tmp_path, data)
+    os.replace(tmp_path, path)
+
+
+def write_json_durable(path, data):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def iter_json_array(path, chunk_size=1024 * 1024):
+    """Yield the items of a JSON array file one at a time.
+
+    The file is read chunk_size characters at a time and each item is
+    decoded as soon as it is complete, so only one chunk and the item being
+    decoded are ever held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as file:
+        buffer = file.read(chunk_size)
+        eof = not buffer
+        pos = _JSON_WHITESPACE.match(buffer).end()
+        # Leading whitespace may run on past the first chunks
+        while pos == len(buffer) and not eof:
+            buffer = file.read(chunk_size)
+            eof = not buffer
+            pos = _JSON_WHITESPACE.match(buffer).end()
+        if buffer[pos:pos + 1] != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+        first = True
+
+        while True:
+            # Whitespace and the separator before the next item
+            match = _JSON_SEPARATOR.match(buffer, pos)
+            end = match.end()
+            if end == len(buffer) and not eof:
+                chunk = file.read(chunk_size)
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                eof = not chunk
+                continue
+            separator = match.group(1)
+            if separator == "]":
+                return
+            if eof and end == len(buffer):
+                raise ValueError(f"{path}: unexpected end of JSON array")
+            if (separator == ",") == first:
+                raise ValueError(f"{path}: expected ',' or ']' in JSON array")
+
+            try:
+                item, item_end = decoder.raw_decode(buffer, end)
+            except ValueError:
+                if eof:
+                    raise
+                item_end = len(buffer)
+            if item_end == len(buffer) and not eof:
+                # The item may continue in the next chunk
+                chunk = file.read(chunk_size)
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                eof = not chunk
+                continue
+            yield item
+            pos = item_end
+            first = False
+
+
+def read_json_tasks(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def write_json_tasks(path, tasks):
+    write_json_atomic(path, [task.to_dict() for task in tasks])
+
+
+def task_id_of(op, payload):
+    return payload if op == "delete" else payload.id
+
+
+def diff_tasks(old, new):
+    """Return the operations that turn old into new, both dicts of tasks by id."""
+    ops = []
+    for task_id, task in new.items():
+        previous = old.get(task_id)
+        if previous is None:
+            ops.append(("add", task))
+        elif previous != task:
+            ops.append(("update", task))
+    ops.extend(("delete", task_id) for task_id in old if task_id not in new)
+    return ops
+
+
+class TaskStorage:
+    """Base class for storage backends.
+
+    Subclasses implement _read() to yield the stored tasks as tasks.json
+    style dicts, or _read_tasks() to yield them as Tasks, and _write() to
+    persist a batch of operations that has already been applied to the
+    in-memory copy.
+
+    The in-memory copy is only complete once loading has finished, so
+    apply() waits for a load running on another thread. After a load that
+    failed, apply() raises instead of saving the tasks read so far over
+    the ones it could not read.
+
+    Reads and writes of the files are made under the lock file at
+    lock_path. Before writing, _catch_up() brings the in-memory copy up to
+    date with what other processes saved, so their changes are never
+    written over; what it finds is kept for refresh() to return.
+    """
+
+    # Whether the backend can return sorted pages of tasks through query()
+    supports_query = False
+
+    def __init__(self, lock_path=None):
+        self._tasks = {}
+        self._loading = threading.Event()
+        self._loading.set()
+        self.load_error = None
+        self._file_lock = FileLock(lock_path) if lock_path else None
+        self._external = []
+        # The watched files as this process last wrote or read them
+        self._seen = None
+
+    def load(self):
+        """Read the stored tasks and return copies of them."""
+        return list(self.load_iter())
+
+    def load_iter(self):
+        """Read the stored tasks, yielding copies of them as they are read."""
+        self._loading.clear()
+        try:
+            self.load_error = None
+            self._tasks = {}
+            for task in self._read_tasks():
+                self._tasks[task.id] = task
+                yield task.copy()
+            self._loaded()
+        except Exception as e:
+            self.load_error = e
+            raise
+        finally:
+            self._loading.set()
+
+    def _loaded(self):
+        """Called once every stored task has been read."""
+
+    def apply(self, ops):
+        """Apply and persist a batch of operations."""
+        ops = [(op, payload if op == "delete" else payload.copy()) for op, payload in ops]
+        if not ops:
+            return
+        self._loading.wait()
+        if self.load_error is not None:
+            raise RuntimeError(f"not saving over tasks that failed to load: {self.load_error}")
+        with self._file_lock:
+            self._merge_external({task_id_of(op, payload) for op, payload in ops})
+            for op, payload in ops:
+                if op == "delete":
+                    self._tasks.pop(payload, None)
+                else:
+                    # Stored tasks are replaced, never mutated, so a snapshot of
+                    # them can be serialized from another thread
+                    self._tasks[payload.id] = payload
+            self._write(ops)
+            self._seen = self._file_stats()
+
+    def _merge_external(self, written=()):
+        # Changes to the tasks about to be written are dropped: ours are
+        # saved after them, so ours are the ones that stay
+        self._external.extend(self._catch_up())
+        if written:
+            self._external = [op for op in self._external if task_id_of(*op) not in written]
+
+    def refresh(self):
+        """Return the operations other processes saved since we last looked.
+
+        They are already part of the stored tasks; the caller merges them
+        into its own copy.
+        """
+        self._loading.wait()
+        with self._file_lock:
+            self._merge_external()
+            ops, self._external = self._external, []
+            self._seen = self._file_stats()
+        return [(op, payload if op == "delete" else payload.copy()) for op, payload in ops]
+
+    def changed(self):
+        """Whether refresh() may find anything new.
+
+        False while the watched files are just as this process last wrote
+        or read them, such as after its own writes, so their change
+        notifications need no refresh.
+        """
+        return bool(self._external) or self._seen is None or self._file_stats() != self._seen
+
+    def _file_stats(self):
+        stats = []
+        for path in self.watch_paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stats.append(None)
+            else:
+                stats.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        return stats
+
+    def watch_paths(self):
+        """Return the files that change when another process saves tasks."""
+        return []
+
+    def tasks(self):
+        return list(self._tasks.values())
+
+    def sync(self):
+        """Make every applied operation durable."""
+
+    def close(self):
+        self.sync()
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _read_tasks(self):
+        return map(Task.from_dict, self._read())
+
+    def _write(self, ops):
+        raise NotImplementedError
+
+    def _catch_up(self):
+        """Apply what other processes saved to the in-memory copy and return it."""
+        return []
+
+
+class JsonStorage(TaskStorage):
+    """All tasks in one JSON file, rewritten on every change.
+
+    The file stays a plain tasks.json array, so the generation is counted
+    in a file next to it, bumped by every write. The file's inode, size
+    and modification time are part of the generation too, to notice
+    other programs editing it. Another process's write is caught up on by
+    reading the file again and comparing it with the in-memory copy.
+    """
+
+    def __init__(self, path="tasks.json"):
+        super().__init__(path + ".lock")
+        self.path = path
+        self.generation_path = path + ".generation"
+        self._generation = None
+
+    def _file_generation(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        try:
+            with open(self.generation_path, "r", encoding="utf-8") as file:
+                count = int(file.read() or 0)
+        except (FileNotFoundError, ValueError):
+            count = 0
+        return (count, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _read(self):
+        self._generation = self._file_generation()
+        if self._generation is not None:
+            return iter_json_array(self.path)
+        return []
+
+    def _write(self, ops):
+        write_json_tasks(self.path, self.tasks())
+        count = self._generation[0] + 1 if self._generation else 1
+        with open(self.generation_path, "w", encoding="utf-8") as file:
+            file.write(str(count))
+        self._generation = self._file_generation()
+
+    def _catch_up(self):
+        generation = self._file_generation()
+        if generation == self._generation:
+            return []
+        tasks = {}
+        if generation is not None:
+            for task in map(Task.from_dict, iter_json_array(self.path)):
+                tasks[task.id] = task
+        ops = diff_tasks(self._tasks, tasks)
+        self._tasks = tasks
+        self._generation = generation
+        return ops
+
+    def watch_paths(self):
+        return [self.path]
+
+
+class JournalStorage(TaskStorage):
+    """Append-only operation log on top of a snapshot.
+
+    Each change is appended to the log as one JSON line, so saving costs
+    the size of the change rather than the size of the list. Lines are
+    flushed to the OS immediately, which survives the app being killed;
+    fsync is batched to every fsync_batch operations or fsync_interval
+    seconds, whichever comes first, and forced by sync() and close().
+
+    Loading replays the log on top of the snapshot. Once the log grows
+    past compact_bytes, a new snapshot of the current state is written in
+    a background thread and the log starts over.
+
+    The snapshot is a tasks.json style array, or a binary snapshot (see
+    snapshot.py) if snapshot_path ends in .bin, compressed with
+    snapshot_compression. Tasks the binary format cannot hold are saved
+    in a JSON snapshot under the same name instead. A compaction that
+    fails puts the rotated log back in front of the current one, so
+    nothing is lost and the next compaction can run.
+
+    Every log starts with a line holding its generation, which goes up
+    each time the log starts over. Another process's changes are caught up
+    on by reading the log from where this one last stopped, as long as the
+    generation is still the same; once another process has started a new
+    log, everything is read again and compared with the in-memory copy.
+    """
+
+    def __init__(self, snapshot_path="tasks.snapshot.json", log_path="tasks.journal",
+                 legacy_path="tasks.json", fsync_interval=1.0, fsync_batch=64,
+                 compact_bytes=4 * 1024 * 1024, snapshot_compression="none"):
+        super().__init__(log_path + ".lock")
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path
+        self.old_log_path = log_path + ".old"
+        self.legacy_path = legacy_path
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.compact_bytes = compact_bytes
+        self.snapshot_compression = snapshot_compression
+
+        self._log = None
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+        self._compaction = None
+        # Generation of the log read so far, and how many bytes of it
+        self._generation = None
+        self._offset = 0
+
+    def _read_tasks(self):
+        # The log is read first, so the snapshot can be streamed with each
+        # task replaced by its latest logged version. A leftover old log
+        # means a compaction was interrupted, or is still being written by
+        # another process; its operations come before the ones in the
+        # current log
+        logged = {}
+        with self._file_lock:
+            for path in (self.old_log_path, self.log_path):
+                if os.path.exists(path):
+                    self._replay(path, logged)
+            self._generation = self._log_generation()
+            self._offset = os.path.getsize(self.log_path) if self._generation is not None else 0
+
+            snapshot = ()
+            reader = None
+            if os.path.exists(self.snapshot_path):
+                if is_snapshot_path(self.snapshot_path) and is_snapshot_file(self.snapshot_path):
+                    reader = SnapshotReader(self.snapshot_path)
+                    snapshot = self._merge_snapshot(reader, logged)
+                else:
+                    snapshot = map(Task.from_dict, iter_json_array(self.snapshot_path))
+            elif self.legacy_path and os.path.exists(self.legacy_path) and not os.path.exists(self.log_path):
+                # First run on an existing tasks.json
+                snapshot = map(Task.from_dict, iter_json_array(self.legacy_path))
+
+        # The snapshot is streamed without the lock: it is only ever
+        # replaced, and this keeps reading the one that was opened
+        try:
+            for task in snapshot:
+                if task.id in logged:
+                    task = logged.pop(task.id)
+                    if task is None:
+                        continue
+                    task = Task.from_dict(task)
+                yield task
+        finally:
+            if reader is not None:
+                reader.close()
+        # Tasks added since the snapshot
+        for task in logged.values():
+            if task is not None:
+                yield Task.from_dict(task)
+
+    @staticmethod
+    def _merge_snapshot(reader, logged):
+        # The offsets lead straight to each record's id, so the records
+        # the log replaced or deleted are skipped without decoding them
+        for index in range(len(reader)):
+            task_id = reader.id_at(index)
+            if task_id not in logged:
+                yield reader[index]
+                continue
+            task = logged.pop(task_id)
+            if task is not None:
+                yield Task.from_dict(task)
+
+    def _replay(self, path, logged):
+        # Keeps the latest logged version of every task, None if deleted
+        valid_end = 0
+        with open(path, "rb") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write at the end of the log from a crash
+                    break
+                if record["op"] == "delete":
+                    logged[parse_task_id(record["id"])] = None
+                elif record["op"] != "generation":
+                    logged[dict_task_id(record["task"])] = record["task"]
+                valid_end += len(line)
+
+        # Drop the torn tail so new records start on a fresh line
+        if valid_end < os.path.getsize(path):
+            with open(path, "r+b") as file:
+                file.truncate(valid_end)
+
+    def _log_generation(self):
+        # None without a log, 0 for logs from before generations
+        try:
+            with open(self.log_path, "rb") as file:
+                line = file.readline()
+        except FileNotFoundError:
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return 0
+        return record["generation"] if record["op"] == "generation" else 0
+
+    def _loaded(self):
+        with self._file_lock:
+            self._merge_external()
+            recovered = os.path.exists(self.old_log_path)
+            migrated = not os.path.exists(self.snapshot_path) and bool(self._tasks)
+            if recovered or migrated:
+                # Fold everything into a fresh snapshot before appending again
+                tmp_path = self.snapshot_path + ".tmp"
+                try:
+                    self._write_snapshot_file(tmp_path, self.tasks())
+                except Exception as e:
+                    # Tasks only found in tasks.json must reach a snapshot
+                    # before there is a log, which hides that file
+                    if self._generation is None:
+                        raise
+                    print(f"Error compacting task journal: {e}")
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    self._restore_old_log()
+                else:
+                    os.replace(tmp_path, self.snapshot_path)
+                    self._start_log()
+                    if recovered:
+                        os.remove(self.old_log_path)
+            elif self._generation is None:
+                self._start_log()
+
+            self._open_log()
+
+    def _start_log(self):
+        # A new, empty log of the next generation
+        self._generation = (self._generation or 0) + 1
+        with open(self.log_path, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"op": "generation", "generation": self._generation}) + "\n")
+        self._offset = os.path.getsize(self.log_path)
+
+    def _open_log(self):
+        self._log = open(self.log_path, "a", encoding="utf-8")
+
+    def _close_log(self):
+        if self._log is not None:
+            self.sync()
+            self._log.close()
+            self._log = None
+
+    def _write(self, ops):
+        if self._log is None:
+            self._open_log()
+
+        lines = []
+        for op, payload in ops:
+            if op == "delete":
+                record = {"op": op, "id": str(payload)}
+            else:
+                record = {"op": op, "task": payload.to_dict()}
+            lines.append(json.dumps(record) + "\n")
+        self._log.write("".join(lines))
+        self._log.flush()
+        self._offset = self._log.tell()
+
+        self._pending += len(ops)
+        if (self._pending >= self.fsync_batch
+                or time.monotonic() - self._last_fsync >= self.fsync_interval):
+            self._fsync()
+
+        if self._offset >= self.compact_bytes and not self.compacting():
+            self.compact()
+
+    def _catch_up(self):
+        generation = self._log_generation()
+        if generation is None and self._generation is None:
+            return []
+        if generation == self._generation and os.path.getsize(self.log_path) >= self._offset:
+            return self._read_new_records()
+
+        # Another process started a new log, which folded the old one into
+        # the snapshot: read everything again and diff it with our copy
+        self._close_log()
+        tasks = {}
+        for task in self._read_tasks():
+            tasks[task.id] = task
+        ops = diff_tasks(self._tasks, tasks)
+        self._tasks = tasks
+        return ops
+
+    def _read_new_records(self):
+        ops = []
+        with open(self.log_path, "rb") as file:
+            file.seek(self._offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self._offset += len(line)
+                if record["op"] == "delete":
+                    task_id = parse_task_id(record["id"])
+                    self._tasks.pop(task_id, None)
+                    ops.append(("delete", task_id))
+                elif record["op"] != "generation":
+                    task = Task.from_dict(record["task"])
+                    self._tasks[task.id] = task
+                    ops.append((record["op"], task))
+
+        # Whatever follows is the torn tail of a process that crashed while
+        # writing; drop it so new records start on a fresh line
+        if self._offset < os.path.getsize(self.log_path):
+            with open(self.log_path, "r+b") as file:
+                file.truncate(self._offset)
+        return ops
+
+    def _fsync(self):
+        if self._log is not None and self._pending:
+            os.fsync(self._log.fileno())
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+
+    def sync(self):
+        if self._log is not None:
+            self._log.flush()
+            self._fsync()
+
+    def compacting(self):
+        return self._compaction is not None and self._compaction.is_alive()
+
+    def compact(self, wait=False):
+        """Write the current state as a new snapshot and start a new log."""
+        if self.compacting():
+            self._compaction.join()
+
+        with self._file_lock:
+            # An old log means another process is compacting already
+            if os.path.exists(self.old_log_path):
+                return
+            self._merge_external()
+
+            # Rotate the log so new operations go to a fresh file while the
+            # snapshot is being written
+            self._close_log()
+            os.replace(self.log_path, self.old_log_path)
+            self._start_log()
+            self._open_log()
+            snapshot = self.tasks()
+
+        self._compaction = threading.Thread(target=self._write_snapshot, args=(snapshot,),
+                                            name="journal-compaction", daemon=True)
+        self._compaction.start()
+        if wait:
+            self._compaction.join()
+
+    def _write_snapshot(self, snapshot):
+        # Named per process: one starting up meanwhile may fold the old
+        # log itself and let another process compact again
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.compacting"
+        try:
+            self._write_snapshot_file(tmp_path, snapshot)
+            with self._file_lock:
+                # A process started meanwhile may have found the old log
+                # and folded it into a snapshot of its own, which is newer
+                if os.path.exists(self.old_log_path):
+                    os.replace(tmp_path, self.snapshot_path)
+                    os.remove(self.old_log_path)
+                else:
+                    os.remove(tmp_path)
+        except Exception as e:
+            print(f"Error compacting task journal: {e}")
+            try:
+                with self._file_lock:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    self._restore_old_log()
+            except OSError as e:
+                # The old log stays in place and is replayed on the next start
+                print(f"Error restoring task journal: {e}")
+
+    def _write_snapshot_file(self, path, tasks):
+        # The binary format has limits JSON does not; past them, the
+        # snapshot is written as JSON under the same name
+        if is_snapshot_path(self.snapshot_path):
+            try:
+                write_snapshot(path, tasks, self.snapshot_compression)
+                return
+            except (ValueError, OverflowError, struct.error) as e:
+                print(f"Error writing binary snapshot, saving it as JSON: {e}")
+        write_json_durable(path, [task.to_dict() for task in tasks])
+
+    def _restore_old_log(self):
+        # The old log's records go back in front of the current ones, in
+        # a log of a new generation, so that other processes read it all
+        # again instead of going on from an offset that moved
+        if not os.path.exists(self.old_log_path):
+            return
+        self._merge_external()
+        self._close_log()
+        lines = []
+        for path in (self.old_log_path, self.log_path):
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    file.readline()  # Its generation
+                    lines.extend(line for line in file if line.endswith(b"\n"))
+        self._generation += 1
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(json.dumps({"op": "generation", "generation": self._generation}).encode() + b"\n")
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.log_path)
+        os.remove(self.old_log_path)
+        self._offset = os.path.getsize(self.log_path)
+
+    def watch_paths(self):
+        return [self.log_path]
+
+    def close(self):
+        if self.compacting():
+            self._compaction.join()
+        self._close_log()
+
+
+class SqliteStorage(TaskStorage):
+    """Tasks in a local SQLite database (WAL mode).
+
+    Each change is a single-row INSERT, UPDATE or DELETE, and every sort
+    mode of the list has a matching index, so query() can return any page
+    of the sorted list with LIMIT/OFFSET instead of sorting in Python.
+
+    On the first run the database is filled from an existing tasks.json.
+
+    SQLite locks the database itself, so each apply() is one transaction
+    that other processes never see half done. Every transaction bumps the
+    generation in the database and stamps the rows it writes with it;
+    deleted ids are kept with their generation in a table of their own.
+    Changes made by other processes are found by their generation.
+    """
+
+    supports_query = True
+
+    # Version 2 stores priority as its Priority rank and created_at as
+    # epoch seconds, the same values the in-memory sort keys compare.
+    # Version 3 adds generations, version 4 recurrence rules, version 5
+    # keeps ids as integers and version 6 adds tags, projects and due dates
+    SCHEMA_VERSION = 6
+
+    # text_key holds Python's text.lower(), so that the database orders
+    # non-ASCII text exactly like the in-memory sort keys do
+    ORDER_BY = {
+        "Priority": "completed, priority, id",
+        "Creation Date": "completed, id",
+        "Alphabetical": "completed, text_key, id",
+    }
+
+    # tags holds a task's tags separated by spaces, or NULL
+    COLUMNS = "id, text, completed, priority, created_at, recurrence, next_at, tags, project, due_at"
+
+    INSERT = ("INSERT OR REPLACE INTO tasks (id, text, completed, priority, created_at, recurrence, "
+              "next_at, tags, project, due_at, text_key, generation) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+    def __init__(self, path="tasks.db", legacy_path="tasks.json"):
+        super().__init__()
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._db = None
+        self._generation = None
+
+    def _connect(self):
+        if self._db is not None:
+            return
+        # Pages are read on the UI thread while writes may come from a
+        # background writer, so access is serialized with a lock instead
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version < self.SCHEMA_VERSION:
+            self._create_schema(version)
+        # Changes saved from here on are caught up on by refresh(); any
+        # made before are read by load_iter()
+        if self._generation is None:
+            self._generation = self._db_generation()
+
+    def _create_schema(self, version):
+        with self._db:
+            old_tasks = []
+            if version == 1:
+                # Version 1 kept priority and created_at as in tasks.json
+                columns = ["id", "text", "completed", "priority", "created_at"]
+                rows = self._db.execute(f"SELECT {', '.join(columns)} FROM tasks").fetchall()
+                old_tasks = [Task.from_dict(dict(zip(columns, row))) for row in rows]
+                self._db.execute("DROP TABLE tasks")
+
+            if version == 2:
+                self._db.execute("ALTER TABLE tasks ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+            if version in (2, 3):
+                self._db.execute("ALTER TABLE tasks ADD COLUMN recurrence TEXT")
+                self._db.execute("ALTER TABLE tasks ADD COLUMN next_at INTEGER")
+            old_rows = []
+            deleted = []
+            if version in (2, 3, 4):
+                # The tables are made again with integer ids, rows and all
+                rows = self._db.execute("SELECT id, text, completed, priority, created_at, recurrence, "
+                                        "next_at, text_key, generation FROM tasks")
+                old_rows = [(parse_task_id(row[0], row[4]),) + row[1:7] + (None, None, None) + row[7:]
+                            for row in rows]
+                if version != 2:
+                    rows = self._db.execute("SELECT id, generation FROM deleted")
+                    deleted = [(parse_task_id(task_id), generation) for task_id, generation in rows]
+                    self._db.execute("DROP TABLE deleted")
+                self._db.execute("DROP TABLE tasks")
+            if version == 5:
+                self._db.execute("ALTER TABLE tasks ADD COLUMN tags TEXT")
+                self._db.execute("ALTER TABLE tasks ADD COLUMN project TEXT")
+                self._db.execute("ALTER TABLE tasks ADD COLUMN due_at INTEGER")
+
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    priority INTEGER NOT NULL DEFAULT 2,
+                    created_at INTEGER NOT NULL,
+                    recurrence TEXT,
+                    next_at INTEGER,
+                    tags TEXT,
+                    project TEXT,
+                    due_at INTEGER,
+                    text_key TEXT NOT NULL,
+                    generation INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS deleted (
+                    id INTEGER PRIMARY KEY,
+                    generation INTEGER NOT NULL
+                )
+            """)
+            self._db.execute("CREATE TABLE IF NOT EXISTS generation (value INTEGER NOT NULL)")
+            if self._db.execute("SELECT COUNT(*) FROM generation").fetchone()[0] == 0:
+                self._db.execute("INSERT INTO generation VALUES (0)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS tasks_by_generation ON tasks (generation)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS deleted_by_generation ON deleted (generation)")
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS tasks_by_priority "
+                             f"ON tasks ({self.ORDER_BY['Priority']})")
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS tasks_by_created_at "
+                             f"ON tasks ({self.ORDER_BY['Creation Date']})")
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS tasks_by_text "
+                             f"ON tasks ({self.ORDER_BY['Alphabetical']})")
+
+            # One-shot migration from tasks.json
+            if version == 0 and self.legacy_path and os.path.exists(self.legacy_path):
+                old_tasks = map(Task.from_dict, read_json_tasks(self.legacy_path))
+            self._db.executemany(self.INSERT, [self._row(task) for task in old_tasks])
+            self._db.executemany(self.INSERT, old_rows)
+            self._db.executemany("INSERT INTO deleted VALUES (?, ?)", deleted)
+
+            self._db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    @staticmethod
+    def _row(task, generation=0):
+        return (task.id, task.text, int(task.completed), int(task.priority), task.created_at,
+                task.recurrence, task.next_at, " ".join(task.tags) or None, task.project, task.due_at,
+                task.text.lower(), generation)
+
+    @staticmethod
+    def _task(row):
+        return Task(row[0], row[1], bool(row[2]), Priority(row[3]), row[4], row[5], row[6],
+                    tuple(row[7].split()) if row[7] else (), row[8], row[9])
+
+    def load_iter(self):
+        with self._lock:
+            self._connect()
+        # A connection of its own reads one consistent snapshot of the
+        # table, so writes can go on while the tasks stream in
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            cursor = db.execute(f"SELECT {self.COLUMNS} FROM tasks")
+            for rows in iter(lambda: cursor.fetchmany(1000), []):
+                for row in rows:
+                    yield self._task(row)
+        finally:
+            db.close()
+
+    def _db_generation(self):
+        return self._db.execute("SELECT value FROM generation").fetchone()[0]
+
+    def _changes_since(self, generation):
+        # Deletes come first: a task deleted and then added again has both
+        ops = [("delete", row[0]) for row in
+               self._db.execute("SELECT id FROM deleted WHERE generation > ?", (generation,))]
+        ops += [("add", self._task(row)) for row in
+                self._db.execute(f"SELECT {self.COLUMNS} FROM tasks WHERE generation > ?",
+                                 (generation,))]
+        return ops
+
+    def apply(self, ops):
+        if not ops:
+            return
+        written = {task_id_of(op, payload) for op, payload in ops}
+        with self._lock:
+            self._connect()
+            with self._db:
+                # Takes the database's write lock before reading the
+                # generation, so no other process commits in between
+                self._db.execute("BEGIN IMMEDIATE")
+                generation = self._db_generation()
+                if generation != self._generation:
+                    self._external.extend(self._changes_since(self._generation))
+                self._external = [op for op in self._external if task_id_of(*op) not in written]
+                generation += 1
+
+                for op, payload in ops:
+                    if op != "delete":
+                        # Updates replace the row too, like in the other
+                        # backends, in case another process deleted it
+                        self._db.execute(self.INSERT, self._row(payload, generation))
+                    else:
+                        self._db.execute("DELETE FROM tasks WHERE id = ?", (payload,))
+                        self._db.execute("INSERT OR REPLACE INTO deleted VALUES (?, ?)",
+                                         (payload, generation))
+                self._db.execute("UPDATE generation SET value = ?", (generation,))
+            self._generation = generation
+
+    def refresh(self):
+        with self._lock:
+            self._connect()
+            ops, self._external = self._external, []
+            with self._db:
+                # One read transaction sees the generation and the changes
+                # up to it together
+                self._db.execute("BEGIN")
+                generation = self._db_generation()
+                if generation != self._generation:
+                    ops += self._changes_since(self._generation)
+                    self._generation = generation
+        return ops
+
+    def watch_paths(self):
+        # Commits go to the write-ahead log until it is checkpointed
+        return [self.path, self.path + "-wal"]
+
+    def query(self, sort_method="Priority", limit=-1, offset=0, completed=None, after=None):
+        """Return one page of tasks in the order of the given sort mode.
+
+        With after, a key of the sort mode's sort_key_for(), the page
+        starts at the first task sorting after it.
+        """
+        order_by = self.ORDER_BY[sort_method]
+        conditions = []
+        params = []
+        if completed is not None:
+            conditions.append("completed = ?")
+            params.append(int(completed))
+        if after is not None:
+            conditions.append(f"({order_by}) > ({', '.join('?' * len(after))})")
+            params += [value if isinstance(value, str) else int(value) for value in after]
+        sql = f"SELECT {self.COLUMNS} FROM tasks"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+        with self._lock:
+            self._connect()
+            rows = self._db.execute(sql, params).fetchall()
+        return [self._task(row) for row in rows]
+
+    def tasks(self):
+        return self.load()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class BackgroundWriter:
+    """Applies storage operations on a background thread.
+
+    submit() only queues operations, so the caller never waits on disk.
+    The writer thread collects everything submitted within `delay` seconds
+    of the first pending change, coalesces it to at most one operation per
+    task and applies the batch to the backend, followed by sync().
+    flush() blocks until everything submitted so far has been written.
+
+    refresh() has the writer thread read what other processes saved, too,
+    after writing what is queued, so that reading never blocks the caller
+    either.
+
+    A batch that fails to write is queued again, under anything submitted
+    since, and retried after RETRY_DELAY seconds. on_error, if given, is
+    called on the writer thread with the exception, and with None once a
+    write succeeds again.
+
+    before() and after() run other writes, such as the archive's, on the
+    writer thread in order with the operations: before the ones submitted
+    in a block, or after all those submitted so far.
+
+    set_read_only() drops whatever is queued and makes submit() raise, for
+    storage whose tasks could not all be loaded.
+    """
+
+    RETRY_DELAY = 5.0
+
+    def __init__(self, storage, delay=0.25, on_error=None):
+        self.storage = storage
+        self.delay = delay
+        self.on_error = on_error
+
+        self._cond = threading.Condition()
+        self._pending = {}
+        # The pending operations being written
+        self._batch = {}
+        self._first_change = None
+        self._writing = False
+        self._flushing = 0
+        self._refreshes = []
+        self._before = []
+        self._after = []
+        self._closed = False
+        self._failures = 0
+        self._failing = False
+        self._retry_at = None
+        self._read_only = None
+
+        self._thread = threading.Thread(target=self._run, name="task-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, ops):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("writer is closed")
+            if self._read_only is not None:
+                raise RuntimeError(f"storage is read-only: {self._read_only}")
+            for op, payload in ops:
+                # Copy now: the caller keeps mutating its tasks
+                task_id = payload if op == "delete" else payload.id
+                if op != "delete":
+                    payload = payload.copy()
+                self._coalesce(task_id, op, payload)
+            if self._pending and self._first_change is None:
+                self._first_change = time.monotonic()
+            self._cond.notify_all()
+
+    def _coalesce(self, task_id, op, payload):
+        previous = self._pending.get(task_id)
+        if previous is None:
+            # Pending entries remember whether the task may already be stored
+            self._pending[task_id] = (op, payload, op != "add")
+            return
+
+        stored = previous[2]
+        if op == "delete":
+            if stored:
+                self._pending[task_id] = (op, payload, stored)
+            else:
+                # Added and deleted before ever being written
+                del self._pending[task_id]
+        elif previous[0] == "update" and op == "update":
+            self._pending[task_id] = (op, payload, stored)
+        else:
+            # Write only the latest version, as an add (which replaces)
+            self._pending[task_id] = ("add", payload, stored)
+
+    def pending(self):
+        with self._cond:
+            return bool(self._pending) or self._writing
+
+    def pending_ops(self):
+        """Return {task id: (op, payload)} for what is not written yet.
+
+        That is everything submitted since the last write finished, as
+        the latest operation per task, including the batch being written.
+        """
+        with self._cond:
+            return {task_id: (op, payload)
+                    for batch in (self._batch, self._pending)
+                    for task_id, (op, payload, _) in batch.items()}
+
+    def flush(self):
+        """Write everything submitted so far and wait for it.
+
+        Returns early if a write fails; what failed stays queued. A write
+        waiting to be retried is tried again right away.
+        """
+        with self._cond:
+            self._flushing += 1
+            self._retry_at = None
+            self._cond.notify_all()
+            failures = self._failures
+            while ((self._pending or self._writing) and self._thread.is_alive()
+                   and self._failures == failures):
+                self._cond.wait()
+            self._flushing -= 1
+
+    def refresh(self, callback):
+        """Read the changes other processes saved, on the writer thread.
+
+        Everything submitted so far is written first. callback is then
+        called on the writer thread with the operations read, which are
+        empty if the files are as this process left them or reading
+        failed.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._refreshes.append(callback)
+            self._cond.notify_all()
+
+    @contextmanager
+    def before(self, function, task_ids, on_error=None):
+        """Run function on the writer thread before writing the operations
+        on task_ids submitted in the block.
+
+        If function raises, those operations are dropped instead, and
+        on_error is called with the exception on the writer thread.
+        """
+        with self._cond:
+            yield
+            self._before.append((function, set(task_ids), on_error))
+            self._cond.notify_all()
+
+    def after(self, function, on_error=None):
+        """Run function on the writer thread once everything submitted so
+        far has been written.
+
+        If function raises, on_error is called with the exception on the
+        writer thread.
+        """
+        with self._cond:
+            self._after.append((function, on_error))
+            self._cond.notify_all()
+
+    def set_read_only(self, reason):
+        """Drop the queued operations and reject any more, giving reason."""
+        with self._cond:
+            self._read_only = reason
+            self._pending = {}
+            self._first_change = None
+            self._retry_at = None
+            self._cond.notify_all()
+
+    def close(self):
+        """Flush, stop the thread and close the backend."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.storage.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._work() and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    # Nobody is left to merge what a refresh would read
+                    self._refreshes = []
+                if not self._work():
+                    return
+
+                # Let more changes arrive until the window closes, unless
+                # a flush or refresh is waiting for them; a failed write
+                # waits to be retried either way
+                while self._pending and not self._closed:
+                    if self._retry_at is not None:
+                        due = self._retry_at
+                    elif self._flushing or self._refreshes or self._before or self._after:
+                        break
+                    else:
+                        due = self._first_change + self.delay
+                    remaining = due - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._batch = self._pending
+                self._pending = {}
+                self._first_change = None
+                self._retry_at = None
+                refreshes, self._refreshes = self._refreshes, []
+                before, self._before = self._before, []
+                after, self._after = self._after, []
+                self._writing = True
+
+            for function, task_ids, on_error in before:
+                if not self._call(function, on_error):
+                    with self._cond:
+                        for task_id in task_ids:
+                            batch.pop(task_id, None)
+
+            error = None
+            if batch:
+                ops = [(op, payload) for op, payload, _ in batch.values()]
+                try:
+                    with instrumentation.measure("storage write"):
+                        self.storage.apply(ops)
+                        self.storage.sync()
+                except Exception as e:
+                    print(f"Error saving tasks: {e}")
+                    error = e
+            if error is None:
+                for function, on_error in after:
+                    self._call(function, on_error)
+            if refreshes:
+                self._refresh(refreshes)
+
+            with self._cond:
+                if error is not None:
+                    self._failures += 1
+                    if not self._closed and self._read_only is None:
+                        self._requeue(batch)
+                        self._retry_at = time.monotonic() + self.RETRY_DELAY
+                        # They wait for what they follow to be written
+                        self._after[:0] = after
+                    elif after:
+                        print(f"Error: {len(after)} writes dropped after failing to save tasks")
+                self._batch = {}
+                self._writing = False
+                self._cond.notify_all()
+            # Report each failure, and the first write that succeeds after one
+            if batch and (error is not None or self._failing):
+                self._failing = error is not None
+                if self.on_error is not None:
+                    self.on_error(error)
+
+    def _work(self):
+        return self._pending or self._refreshes or self._before or self._after
+
+    @staticmethod
+    def _call(function, on_error):
+        # Returns whether function succeeded
+        try:
+            function()
+        except Exception as e:
+            if on_error is None:
+                print(f"Error writing: {e}")
+            else:
+                on_error(e)
+            return False
+        return True
+
+    def _requeue(self, batch):
+        # Any of it may have been written, and whatever was submitted
+        # since applies on top
+        newer, self._pending = self._pending, {}
+        for task_id, (op, payload, _) in batch.items():
+            self._pending[task_id] = (op, payload, True)
+        for task_id, entry in newer.items():
+            if task_id in self._pending:
+                self._coalesce(task_id, entry[0], entry[1])
+            else:
+                self._pending[task_id] = entry
+        self._first_change = time.monotonic()
+
+    def _refresh(self, callbacks):
+        # Change notifications for our own writes find the files as we
+        # left them, and skip reading them
+        external = []
+        try:
+            if self.storage.changed():
+                external = self.storage.refresh()
+        except Exception as e:
+            print(f"Error reading changes from other windows: {e}")
+        # Requests that piled up share one read; only the first merges it
+        for callback in callbacks:
+            callback(external)
+            external = []
+
+
+class BinaryJournalStorage(JournalStorage):
+    """The journal on top of a binary snapshot, in files of its own."""
+
+    def __init__(self, snapshot_path="tasks.snapshot.bin", log_path="tasks.bin.journal", *args, **kwargs):
+        super().__init__(snapshot_path, log_path, *args, **kwargs)
+
+
+STORAGE_BACKENDS = {
+    "journal": JournalStorage,
+    "binary": BinaryJournalStorage,
+    "json": JsonStorage,
+    "sqlite": SqliteStorage,
+}
+
+
+def create_storage(kind="journal"):
+    return STORAGE_BACKENDS[kind]()
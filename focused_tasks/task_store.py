@@ -0,0 +1,699 @@
+"""In-memory task store, the single source of truth for the task list."""
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from .filters import FIELDS, FieldIndex, TaskFilter
+from .instrumentation import instrumentation
+from .search import SearchIndex, matches, tokenize
+
+
+SORT_METHODS = ("Priority", "Creation Date", "Alphabetical")
+# Short names for the sort methods on the command line and in the API
+SORT_CHOICES = {
+    "priority": "Priority",
+    "date": "Creation Date",
+    "alpha": "Alphabetical",
+}
+
+
+def sort_key_for(sort_method):
+    """Return the key function for a sort mode.
+
+    Keys end with the task id so every task has a unique position, which
+    lets a sorted view find a task again by bisecting on its key. Ids go up
+    with the time a task was made, so the id alone orders by creation.
+    """
+    if sort_method == "Priority":
+        # Sort by priority (high > medium > low) and then by completion status
+        return lambda x: (
+            x.completed,  # Incomplete first
+            x.priority,  # Then by priority
+            x.id  # Then by date
+        )
+    elif sort_method == "Creation Date":
+        # Sort by creation date (newest first) and then by completion status
+        return lambda x: (
+            x.completed,  # Incomplete first
+            x.id  # Then by date
+        )
+    else:  # Alphabetical
+        # Sort alphabetically by text and then by completion status
+        return lambda x: (
+            x.completed,  # Incomplete first
+            x.text.lower(),  # Then alphabetically
+            x.id
+        )
+
+
+class SortedView:
+    """Tasks kept in the order of one sort key.
+
+    Tasks are held in buckets of at most 2 * LOAD, and the key of the last
+    task in every bucket is kept in _maxes, so a key is found with one
+    bisect over the buckets and one inside a bucket. A Fenwick tree over
+    the bucket sizes turns rows into bucket positions and back. Inserts,
+    removals and lookups by row or key are all O(log n).
+
+    Keys are not stored per task; they are computed from the tasks while
+    bisecting. A task must therefore be found with find() before it is
+    mutated, and handed back to update() with that position afterwards.
+
+    An observer, such as a list model, is told about every row change
+    before and after it happens, and to reset when merge() adds many tasks
+    at once or when changes are made between hold() and release().
+
+    A view with a filter holds only the tasks the filter accepts; its
+    owner uses accepts() to keep it that way.
+    """
+
+    LOAD = 1000
+
+    def __init__(self, sort_key, tasks=(), filter=None):
+        self.sort_key = sort_key
+        self.filter = filter
+        self._observer = None
+        # While held, the observer that was told to reset, and the current one
+        self._held = None
+        self._holder = None
+        self._holds = 0
+
+        self._fill(sorted(tasks, key=sort_key))
+
+    @classmethod
+    def from_sorted(cls, sort_key, tasks, filter=None):
+        """Build a view from tasks already in sort_key order."""
+        view = cls(sort_key, filter=filter)
+        view._fill(list(tasks))
+        return view
+
+    def _fill(self, tasks):
+        self._buckets = [tasks[i:i + self.LOAD] for i in range(0, len(tasks), self.LOAD)]
+        self._maxes = [self.sort_key(bucket[-1]) for bucket in self._buckets]
+        self._len = len(tasks)
+        self._build_tree()
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self._len
+        if not 0 <= row < self._len:
+            raise IndexError("row out of range")
+        bucket, offset = self._locate(row)
+        return self._buckets[bucket][offset]
+
+    def _build_tree(self):
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket, delta):
+        i = bucket + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _start(self, bucket):
+        # Number of tasks in the buckets before this one
+        total = 0
+        i = bucket
+        while i:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, row):
+        # Walk down the tree to the bucket holding the row
+        bucket = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            i = bucket + step
+            if i < len(self._tree) and self._tree[i] <= row:
+                bucket = i
+                row -= self._tree[i]
+            step >>= 1
+        return bucket, row
+
+    def _bisect_bucket(self, bucket, key):
+        tasks = self._buckets[bucket]
+        sort_key = self.sort_key
+        lo, hi = 0, len(tasks)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if sort_key(tasks[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key):
+        """Return the position of the first task not sorting before key.
+
+        The position stays valid until the view itself changes.
+        """
+        bucket = bisect_left(self._maxes, key)
+        if bucket == len(self._maxes):
+            return bucket, 0
+        return bucket, self._bisect_bucket(bucket, key)
+
+    def bisect(self, key):
+        """Return the row a task with this key has, or would be inserted at."""
+        bucket, offset = self.find(key)
+        if bucket == len(self._buckets):
+            return self._len
+        return self._start(bucket) + offset
+
+    def subset(self, ids, filter=None):
+        """Return a new view of the tasks whose id is in ids."""
+        tasks = [task for bucket in self._buckets for task in bucket if task.id in ids]
+        return SortedView.from_sorted(self.sort_key, tasks, filter)
+
+    def accepts(self, task):
+        return self.filter is None or self.filter(task)
+
+    def _key_at(self, row):
+        return self.sort_key(self[row])
+
+    def _contains(self, key):
+        row = self.bisect(key)
+        return row < self._len and self._key_at(row) == key
+
+    def insert(self, task, key=None):
+        if key is None:
+            key = self.sort_key(task)
+        row = self.bisect(key)
+        if self._observer is not None:
+            self._observer.begin_insert(row)
+
+        if not self._buckets:
+            self._buckets.append([task])
+            self._maxes.append(key)
+            self._build_tree()
+        else:
+            bucket, offset = self.find(key)
+            if bucket == len(self._buckets):
+                bucket -= 1
+                offset = len(self._buckets[bucket])
+            tasks = self._buckets[bucket]
+            tasks.insert(offset, task)
+            if offset == len(tasks) - 1:
+                self._maxes[bucket] = key
+            if len(tasks) > 2 * self.LOAD:
+                half = len(tasks) // 2
+                self._buckets[bucket:bucket + 1] = [tasks[:half], tasks[half:]]
+                self._maxes.insert(bucket, self.sort_key(tasks[half - 1]))
+                self._build_tree()
+            else:
+                self._tree_add(bucket, 1)
+        self._len += 1
+
+        if self._observer is not None:
+            self._observer.end_insert(row)
+        return row
+
+    def extend(self, tasks):
+        """Append tasks that sort after all others, without telling the observer."""
+        observer, self._observer = self._observer, None
+        for task in tasks:
+            self.insert(task)
+        self._observer = observer
+
+    def merge(self, tasks):
+        """Add many tasks at once, telling the observer to reset.
+
+        Costs O(n) on top of sorting the new tasks, and no more than O(n)
+        if they come already sorted.
+        """
+        if self._observer is not None:
+            self._observer.begin_reset()
+        merged = list(self)
+        merged.extend(tasks)
+        # The tasks already here are one sorted run, which the sort merges
+        # the new ones into once it has sorted them
+        merged.sort(key=self.sort_key)
+        self._fill(merged)
+        if self._observer is not None:
+            self._observer.end_reset()
+
+    @property
+    def observer(self):
+        return self._holder if self._holds else self._observer
+
+    @observer.setter
+    def observer(self, observer):
+        if self._holds:
+            self._holder = observer
+        else:
+            self._observer = observer
+
+    def hold(self):
+        """Report the changes until release() to the observer as one reset.
+
+        Holds nest; the reset ends with the release of the outermost one.
+        """
+        self._holds += 1
+        if self._holds > 1:
+            return
+        if self._observer is not None:
+            self._observer.begin_reset()
+        self._held = self._holder = self._observer
+        self._observer = None
+
+    def release(self):
+        self._holds -= 1
+        if self._holds:
+            return
+        # The observer may have been replaced during the hold; the one
+        # told to reset ends it, and a new one missed the changes too
+        held, observer = self._held, self._holder
+        self._held = self._holder = None
+        self._observer = observer
+        if held is not None:
+            held.end_reset()
+        if observer is not None and observer is not held:
+            observer.begin_reset()
+            observer.end_reset()
+
+    def _delete(self, bucket, offset):
+        tasks = self._buckets[bucket]
+        del tasks[offset]
+        self._len -= 1
+        if not tasks:
+            del self._buckets[bucket]
+            del self._maxes[bucket]
+            self._build_tree()
+            return
+        if offset == len(tasks):
+            self._maxes[bucket] = self.sort_key(tasks[-1])
+        self._tree_add(bucket, -1)
+
+    def remove(self, key):
+        """Remove the task with this key; returns it, or None if absent."""
+        if not self._contains(key):
+            return None
+        bucket, offset = self.find(key)
+        task = self._buckets[bucket][offset]
+        row = self._start(bucket) + offset
+        if self._observer is not None:
+            self._observer.begin_remove(row, row)
+        self._delete(bucket, offset)
+        if self._observer is not None:
+            self._observer.end_remove(row, row)
+        return task
+
+    def remove_many(self, keys):
+        """Remove the tasks with these keys, reporting adjacent rows together."""
+        rows = sorted({self.bisect(key) for key in keys if self._contains(key)})
+        while rows:
+            # Runs are removed from the end so the rows before them stay valid
+            first = last = rows.pop()
+            while rows and rows[-1] == first - 1:
+                first = rows.pop()
+            if self._observer is not None:
+                self._observer.begin_remove(first, last)
+            for row in range(last, first - 1, -1):
+                self._delete(*self._locate(row))
+            if self._observer is not None:
+                self._observer.end_remove(first, last)
+
+    def update(self, task, position):
+        """Re-place a changed task, found at position before it changed."""
+        bucket, offset = position
+        row = self._start(bucket) + offset
+        key = self.sort_key(task)
+
+        # Still between its neighbours: the task stays on its row
+        if ((row == 0 or self._key_at(row - 1) < key)
+                and (row + 1 == self._len or key < self._key_at(row + 1))):
+            # The task object may be a different copy of the same task
+            self._buckets[bucket][offset] = task
+            if offset == len(self._buckets[bucket]) - 1:
+                self._maxes[bucket] = key
+            if self._observer is not None:
+                self._observer.row_changed(row)
+            return
+
+        self.discard(position)
+        self.insert(task, key)
+
+    def discard(self, position):
+        """Remove the task at a position returned by find()."""
+        bucket, offset = position
+        row = self._start(bucket) + offset
+        if self._observer is not None:
+            self._observer.begin_remove(row, row)
+        self._delete(bucket, offset)
+        if self._observer is not None:
+            self._observer.end_remove(row, row)
+
+
+class TaskStore:
+    """Tasks indexed by id.
+
+    Tasks live in one dict keyed by id. Dicts keep insertion order, so the
+    same dict is both the ordered storage and the index, and get, update
+    and delete are O(1) with no list to rebuild.
+
+    Every change goes through the store, which reports it to subscribed
+    listeners as a list of (op, task) changes, with op one of "add",
+    "update" or "delete". Bulk operations report all their changes in a
+    single call, so listeners such as storage handle a batch at once, and
+    a batch of more than RESET_THRESHOLD tasks reaches each view's
+    observer as one reset instead of a signal per row.
+
+    merge_external() applies changes that were saved elsewhere, such as by
+    another process, the same way. Listeners subscribed with
+    external=False, like the one that saves changes, are not told about
+    those.
+
+    batch() groups the changes made in a block, such as many small edits
+    that arrive together, into one notification and one reset.
+
+    version goes up with every change, so a reader can tell whether the
+    tasks changed since it last looked.
+
+    view() returns the tasks sorted by one of SORT_METHODS. A view is
+    built the first time it is asked for and from then on kept sorted
+    through every change, so switching between sort modes is free.
+
+    search() returns a view of only the tasks matching a search, found
+    through a SearchIndex over the task text, and a filter (see
+    filters.py), whose tag, project and due date terms are found through a
+    FieldIndex. Each index is built the first time it is needed and then
+    kept up to date like the views, and so is the view of the latest
+    search.
+    """
+
+    # Matches are filtered out of the full sorted view, instead of being
+    # sorted, once they are more than 1/SCAN_RATIO of the tasks
+    SCAN_RATIO = 8
+
+    # Bulk changes to more tasks than this reset the views' observers
+    RESET_THRESHOLD = 64
+
+    def __init__(self, tasks=()):
+        self._tasks = {task.id: task for task in tasks}
+        self._listeners = []
+        self._merging = False
+        self._batched = None
+        self.version = 0
+        self._views = {}
+        self._empty_views = {}
+        self._index = None
+        self._fields = None
+        self._search = None
+        self._search_view = None
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks.values())
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def subscribe(self, listener, external=True):
+        self._listeners.append((listener, external))
+
+    def _notify(self, changes):
+        if not changes:
+            return
+        self.version += 1
+        if self._batched is not None:
+            self._batched.append((changes, self._merging))
+            return
+        for listener, external in self._listeners:
+            if external or not self._merging:
+                listener(changes)
+
+    @contextmanager
+    def batch(self, size=None):
+        """Report the changes made in the block to listeners all at once.
+
+        With a size, the expected number of changes, views are held like
+        for a bulk operation of that many tasks. Batches do not nest.
+        """
+        views = self._all_views()
+        held = self._hold(views, size or 0)
+        self._batched = []
+        try:
+            yield
+        finally:
+            batched, self._batched = self._batched, None
+            for view in held:
+                view.release()
+            # Changes merged from elsewhere stay apart, in order, for the
+            # listeners that skip those
+            runs = []
+            for changes, merging in batched:
+                if runs and runs[-1][1] == merging:
+                    runs[-1][0].extend(changes)
+                else:
+                    runs.append((list(changes), merging))
+            for changes, merging in runs:
+                self._merging = merging
+                try:
+                    self._notify(changes)
+                finally:
+                    self._merging = False
+
+    def view(self, sort_method):
+        view = self._views.get(sort_method)
+        if view is None:
+            with instrumentation.measure("sort"):
+                view = SortedView(sort_key_for(sort_method), self._tasks.values())
+            self._views[sort_method] = view
+        return view
+
+    def empty_view(self, sort_method):
+        """Return a view that never holds any task, shared per sort method."""
+        view = self._empty_views.get(sort_method)
+        if view is None:
+            view = self._empty_views[sort_method] = SortedView(sort_key_for(sort_method))
+        return view
+
+    @instrumentation.timed("search")
+    def search(self, query, sort_method, filter=""):
+        """Return the tasks matching query and filter, sorted by sort_method.
+
+        Every word of the query must start a word of the task's text, so
+        the list narrows down as a word is typed. A query without words
+        and an empty filter end the search and return None. An invalid
+        filter raises ValueError.
+        """
+        terms = tokenize(query)
+        task_filter = TaskFilter(filter)
+        if not terms and not task_filter:
+            self._search = self._search_view = None
+            return None
+        key = (terms, task_filter.key, sort_method)
+        if self._search == key:
+            return self._search_view
+
+        view = self._find(terms, task_filter, sort_method)
+        self._search = key
+        self._search_view = view
+        return view
+
+    def find(self, query, sort_method, filter=""):
+        """Like search(), for a one-off read.
+
+        The view returned is not kept up to date, and the latest search's
+        view is left as it is.
+        """
+        terms = tokenize(query)
+        task_filter = TaskFilter(filter)
+        if not terms and not task_filter:
+            return None
+        if self._search == (terms, task_filter.key, sort_method):
+            return self._search_view
+        return self._find(terms, task_filter, sort_method)
+
+    def _find(self, terms, task_filter, sort_method):
+        ids = None
+        if terms:
+            if self._index is None:
+                self._index = SearchIndex(self._tasks.values())
+            ids = self._index.search(terms)
+        indexed = task_filter.indexed_terms()
+        if indexed:
+            if self._fields is None:
+                self._fields = FieldIndex(self._tasks.values())
+            ids = self._fields.search(indexed, ids)
+
+        def accepts(task):
+            return (not terms or matches(task, terms)) and task_filter.matches(task)
+
+        full = self._views.get(sort_method)
+        if ids is None:
+            # Only terms no index answers, such as "pending": every task
+            # is looked at, in the order of the full view
+            full = self.view(sort_method)
+            return SortedView.from_sorted(full.sort_key, filter(accepts, full), accepts)
+        if not task_filter.fully_indexed():
+            ids = {task_id for task_id in ids if task_filter.matches(self._tasks[task_id])}
+        if full is not None and len(ids) * self.SCAN_RATIO > len(full):
+            return full.subset(ids, accepts)
+        sort_key = sort_key_for(sort_method)
+        tasks = sorted((self._tasks[task_id] for task_id in ids), key=sort_key)
+        return SortedView.from_sorted(sort_key, tasks, accepts)
+
+    def _all_views(self):
+        views = list(self._views.values())
+        if self._search_view is not None:
+            views.append(self._search_view)
+        return views
+
+    def _hold(self, views, count):
+        # Large batches are reported to observers as one reset each
+        if count <= self.RESET_THRESHOLD:
+            return []
+        for view in views:
+            view.hold()
+        return views
+
+    def get(self, task_id):
+        return self._tasks.get(task_id)
+
+    def add(self, task):
+        self.add_many([task])
+        return task
+
+    def update(self, task_id, **changes):
+        """Change fields of a task; returns the task, or None if unknown."""
+        updated = self.update_many([task_id], **changes)
+        return updated[0] if updated else None
+
+    def delete(self, task_id):
+        """Remove a task; returns it, or None if unknown."""
+        deleted = self.delete_many([task_id])
+        return deleted[0] if deleted else None
+
+    def load_many(self, tasks):
+        """Add tasks read from storage.
+
+        Loaded tasks are not changes, so listeners are not told about them,
+        and each sorted view takes them in with one merge. Tasks whose id
+        is already in the store are skipped.
+        """
+        loaded = []
+        for task in tasks:
+            if task.id not in self._tasks:
+                self._tasks[task.id] = task
+                loaded.append(task)
+        if not loaded:
+            return
+        self.version += 1
+        if self._index is not None:
+            for task in loaded:
+                self._index.add(task)
+        if self._fields is not None:
+            for task in loaded:
+                self._fields.add(task)
+        for view in self._all_views():
+            view.merge([task for task in loaded if view.accepts(task)])
+
+    def merge_external(self, ops):
+        """Apply storage operations saved elsewhere, e.g. by another process.
+
+        Only the latest operation per task counts. Tasks that are added or
+        updated replace the store's copy, unless it is equal already.
+        """
+        latest = {}
+        for op, payload in ops:
+            if op == "delete":
+                latest[payload] = None
+            else:
+                latest[payload.id] = payload
+        self._merging = True
+        try:
+            self.add_many([task for task_id, task in latest.items()
+                           if task is not None and task != self._tasks.get(task_id)])
+            self.delete_many([task_id for task_id, task in latest.items() if task is None])
+        finally:
+            self._merging = False
+
+    def add_many(self, tasks):
+        changes = []
+        views = self._all_views()
+        held = self._hold(views, len(tasks))
+        try:
+            for task in tasks:
+                old = self._tasks.get(task.id)
+                self._tasks[task.id] = task
+                if self._index is not None:
+                    self._index.add(task)
+                if self._fields is not None:
+                    self._fields.add(task)
+                for view in views:
+                    if old is not None:
+                        view.remove(view.sort_key(old))
+                    if view.accepts(task):
+                        view.insert(task)
+                changes.append(("add", task))
+        finally:
+            for view in held:
+                view.release()
+        self._notify(changes)
+
+    def update_many(self, task_ids, **changes):
+        updated = []
+        views = self._all_views()
+        held = self._hold(views, len(task_ids))
+        try:
+            for task_id in task_ids:
+                task = self._tasks.get(task_id)
+                if task is not None:
+                    # Views can only find the task by the key it has now
+                    positions = [(view, view.find(view.sort_key(task)) if view.accepts(task) else None)
+                                 for view in views]
+                    for name, value in changes.items():
+                        setattr(task, name, value)
+                    if self._index is not None and "text" in changes:
+                        self._index.update(task)
+                    if self._fields is not None and not changes.keys().isdisjoint(FIELDS):
+                        self._fields.update(task)
+                    for view, position in positions:
+                        if not view.accepts(task):
+                            if position is not None:
+                                view.discard(position)
+                        elif position is None:
+                            view.insert(task)
+                        else:
+                            view.update(task, position)
+                    updated.append(task)
+        finally:
+            for view in held:
+                view.release()
+        self._notify([("update", task) for task in updated])
+        return updated
+
+    def delete_many(self, task_ids):
+        deleted = []
+        for task_id in task_ids:
+            task = self._tasks.pop(task_id, None)
+            if task is not None:
+                deleted.append(task)
+                if self._index is not None:
+                    self._index.remove(task_id)
+                if self._fields is not None:
+                    self._fields.remove(task_id)
+        views = self._all_views()
+        held = self._hold(views, len(deleted))
+        try:
+            for view in views:
+                view.remove_many([view.sort_key(task) for task in deleted if view.accepts(task)])
+        finally:
+            for view in held:
+                view.release()
+        self._notify([("delete", task) for task in deleted])
+        return deleted
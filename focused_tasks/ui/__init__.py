@@ -0,0 +1 @@
+"""The PyQt6 user interface."""
@@ -0,0 +1,964 @@
+"""The main window."""
+import gc
+import os
+import time
+from datetime import datetime
+from heapq import merge
+from itertools import islice
+
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit,
+                             QPushButton, QLabel, QComboBox, QMenu, QAbstractItemView)
+from PyQt6.QtCore import Qt, QFileSystemWatcher, QPoint, QTimer, pyqtSignal
+from PyQt6.QtGui import QAction, QKeySequence, QShortcut
+
+from . import theme
+from .archive_dialog import ArchiveDialog
+from .loader import TaskLoader
+from .task_list import PRIORITY_TOOLTIPS, TaskListModel, TaskListView
+from ..archive import TaskArchive
+from ..filters import parse_task_input
+from ..history import ArchiveCommand, History
+from ..instrumentation import instrumentation, rss_mb
+from ..recurrence import RecurrenceScheduler, first_occurrence
+from ..search import tokenize
+from ..storage import BackgroundWriter, JournalStorage
+from ..task import Priority, Task, new_task_ids
+from ..task_store import TaskStore, sort_key_for
+
+
+# Longest interval a QTimer takes (its milliseconds are a C int), ~24 days
+MAX_TIMER_DELAY = 24 * 86400
+
+
+class ModernTodoApp(QMainWindow):
+    # Emitted from the API server's thread when requests are waiting
+    api_requested = pyqtSignal()
+    # Emitted from the writer thread with what other processes saved, and
+    # what to do once it is merged
+    external_changes_read = pyqtSignal(object, object)
+    # Emitted from the writer thread when saving fails, and with None once
+    # it works again
+    save_failed = pyqtSignal(object)
+    # Emitted from the writer thread with tasks it failed to archive, and
+    # the error
+    archive_failed = pyqtSignal(object, object)
+
+    def __init__(self, storage=None, save_delay=0.25, archive=None, archive_after=30 * 86400,
+                 perf_trace=None, api_port=None):
+        super().__init__()
+
+        # Storage backend (append-only journal unless told otherwise)
+        self.storage = storage if storage is not None else JournalStorage()
+        self.save_delay = save_delay
+
+        # Completed tasks older than archive_after seconds are archived
+        self.archive = archive if archive is not None else TaskArchive()
+        self.archive_after = archive_after
+
+        # Where the performance trace is written, see dump_perf_trace()
+        self.perf_trace = perf_trace
+
+        # App state
+        self.is_focused = True
+
+        # Window size constants
+        self.NORMAL_WIDTH = 320
+        self.NORMAL_HEIGHT = 480
+        self.COMPACT_WIDTH = 250  # Smaller width when unfocused
+        self.COMPACT_HEIGHT = 400  # Smaller height when unfocused
+
+        # App data
+        self.store = TaskStore()
+        self.loader = None
+        # Set if the tasks could not all be loaded, which makes them read-only
+        self.load_error = None
+        self.filter_error = None
+        self.deferred_edits = []
+        self.list_drag = False
+        self.normal_opacity = 1.0
+        self.faded_opacity = 0.85
+
+        # Window setup
+        self.setWindowTitle("Todo")
+        self.setFixedSize(self.NORMAL_WIDTH, self.NORMAL_HEIGHT)
+        self.setWindowFlag(Qt.WindowType.WindowStaysOnTopHint)  # Pin to screen
+        self.setWindowFlag(Qt.WindowType.FramelessWindowHint)  # Frameless window
+
+        # One stylesheet styles the whole app, see theme.py
+        theme.install(QApplication.instance())
+
+        # Changes are written by a background thread, batched per save_delay
+        self.writer = BackgroundWriter(self.storage, self.save_delay, on_error=self.save_failed.emit)
+        self.save_failed.connect(self.on_save_failed)
+        self.archive_failed.connect(self.on_archive_failed)
+        QApplication.instance().aboutToQuit.connect(self.writer.close)
+        self.store.subscribe(self.on_tasks_changed, external=False)
+
+        # Edits made here can be undone with Ctrl+Z and redone with
+        # Ctrl+Shift+Z; changes from other windows are not in the history
+        self.history = History(self.store)
+
+        # Setup UI
+        self.setup_ui()
+
+        # Load saved tasks in the background; the window shows right away
+        self.load_tasks()
+
+        # Old completed tasks are archived once loaded, then every hour
+        self.archive_timer = QTimer(self)
+        self.archive_timer.setInterval(3600 * 1000)
+        self.archive_timer.timeout.connect(self.archive_old_tasks)
+
+        # Changes saved by other processes are merged in once their files
+        # have been quiet for a moment, see watch_storage()
+        self.storage_watcher = QFileSystemWatcher(self)
+        self.storage_watcher.fileChanged.connect(self.on_storage_changed)
+        self.storage_watcher.directoryChanged.connect(self.on_storage_changed)
+        self.merge_timer = QTimer(self)
+        self.merge_timer.setSingleShot(True)
+        self.merge_timer.setInterval(100)
+        self.merge_timer.timeout.connect(lambda: self.merge_external_changes())
+        self.external_changes_read.connect(self.on_external_changes_read)
+
+        # Recurring tasks spawn their next instance when it is due, from a
+        # single timer armed for the earliest one, see arm_recurrence_timer()
+        self.scheduler = RecurrenceScheduler(self.store)
+        self.store.subscribe(self.on_recurrence_changed)
+        self.recurrence_timer = QTimer(self)
+        self.recurrence_timer.setSingleShot(True)
+        self.recurrence_timer.timeout.connect(self.spawn_recurring_tasks)
+
+        # Performance overlay above the date, updated twice a second;
+        # Ctrl+Shift+P toggles it and Ctrl+Shift+D writes the trace
+        self.perf_seen = 0.0
+        self.perf_timer = QTimer(self)
+        self.perf_timer.setInterval(500)
+        self.perf_timer.timeout.connect(self.update_perf_overlay)
+        for key, slot in (("Ctrl+Shift+P", self.toggle_perf_overlay),
+                          ("Ctrl+Shift+D", self.dump_perf_trace),
+                          ("Ctrl+Z", self.undo),
+                          ("Ctrl+Shift+Z", self.redo)):
+            QShortcut(QKeySequence(key), self).activated.connect(slot)
+        if instrumentation.enabled:
+            self.show_perf_overlay(True)
+
+        # Local HTTP API on api_port, if given; its requests are handled
+        # here on the UI thread, a batch at a time, see run_api_requests()
+        self.api_server = None
+        if api_port is not None:
+            # Imported here: asyncio alone adds tens of ms to startup
+            from ..server import ApiDispatcher, ApiServer, TaskApi
+            self.api_dispatcher = ApiDispatcher(TaskApi(self.store), self.api_requested.emit)
+            self.api_requested.connect(self.run_api_requests)
+            try:
+                self.api_server = ApiServer(self.api_dispatcher, api_port)
+                self.api_server.start()
+            except OSError as e:
+                print(f"Error starting API server on port {api_port}: {e}")
+                self.api_server = None
+
+        # Connect focus events
+        self.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self:
+            if event.type() == event.Type.WindowActivate:
+                self.on_focus_gained()
+            elif event.type() == event.Type.WindowDeactivate and QApplication.activeModalWidget() is None:
+                # The app's own dialogs keep the full view
+                self.on_focus_lost()
+        elif obj in (self.task_view.viewport(), self.minimal_view.viewport()):
+            # Dragging from anywhere on the list except its buttons moves the window
+            if event.type() == event.Type.MouseButtonPress and event.button() == Qt.MouseButton.LeftButton:
+                if obj.parent().hit_target(event.position().toPoint()) is None:
+                    self.get_pos(event)
+                    self.list_drag = True
+            elif event.type() == event.Type.MouseMove and self.list_drag:
+                self.move_window(event)
+                return True
+            elif event.type() == event.Type.MouseButtonRelease:
+                self.list_drag = False
+        return super().eventFilter(obj, event)
+
+    @instrumentation.timed("on_focus_gained")
+    def on_focus_gained(self):
+        self.is_focused = True
+        self.setWindowOpacity(self.normal_opacity)
+
+        # Show full UI at the original window size
+        self.switch_mode(self.show_full_view, self.NORMAL_WIDTH, self.NORMAL_HEIGHT)
+
+    @instrumentation.timed("on_focus_lost")
+    def on_focus_lost(self):
+        self.is_focused = False
+        self.setWindowOpacity(self.faded_opacity)
+
+        # Show minimalist UI (just task names) in a smaller window
+        self.switch_mode(self.show_minimalist_view, self.COMPACT_WIDTH, self.COMPACT_HEIGHT)
+
+    def switch_mode(self, show_view, width, height):
+        # Swap the UI and resize the window in a single layout pass, so
+        # that neither list is ever laid out at the other one's size
+        layouts = (self.centralWidget().layout(), self.task_view.parentWidget().layout())
+        for layout in layouts:
+            layout.setEnabled(False)
+        show_view()
+        self.setFixedSize(width, height)
+        for layout in layouts:
+            layout.setEnabled(True)
+        for layout in layouts:
+            layout.activate()
+
+    def show_full_view(self):
+        # Show all UI controls
+        self.title_bar.show()
+        self.input_widget.show()
+        self.sort_widget.show()
+        self.status_widget.show()
+
+        # Show all task controls
+        self.switch_list(self.minimal_view, self.task_view)
+        theme.set_state(self, "minimal", False)
+
+    def show_minimalist_view(self):
+        # Hide non-essential UI elements
+        self.title_bar.hide()
+        self.input_widget.hide()
+        self.sort_widget.hide()
+        self.status_widget.hide()
+
+        # Show only task names with larger font
+        self.switch_list(self.task_view, self.minimal_view)
+        theme.set_state(self, "minimal", True)
+
+    def switch_list(self, old, new):
+        # Each mode has its own list, laid out once for its own width and
+        # row heights, so switching is a show/hide whatever the list size
+        if new.isVisible():
+            return
+        top = old.first_visible_index()
+        old.hide()
+        new.show()
+        if top.isValid():
+            new.scrollTo(top, QAbstractItemView.ScrollHint.PositionAtTop)
+
+    def setup_ui(self):
+        # Create main widget and layout
+        main_widget = QWidget()
+        main_layout = QVBoxLayout(main_widget)
+        main_layout.setContentsMargins(15, 15, 15, 15)  # Smaller margins
+        main_layout.setSpacing(10)  # Reduced spacing
+
+        # Dark theme for the whole window comes from the app stylesheet
+        main_widget.setObjectName("centralWidget")
+        self.setCentralWidget(main_widget)
+
+        # Custom title bar with move functionality
+        self.title_bar = QWidget()
+        title_layout = QHBoxLayout(self.title_bar)
+        title_layout.setContentsMargins(0, 0, 0, 5)  # Reduced bottom margin
+
+        # App title
+        app_title = QLabel("Focused Tasks")
+        app_title.setObjectName("titleLabel")
+        title_layout.addWidget(app_title)
+
+        # Close button
+        close_btn = QPushButton("✕")
+        close_btn.setFixedSize(26, 26)  # Smaller button
+        close_btn.setObjectName("closeButton")
+        close_btn.clicked.connect(self.close)
+        title_layout.addWidget(close_btn, 0, Qt.AlignmentFlag.AlignRight)
+
+        # Minimize button
+        min_btn = QPushButton("–")
+        min_btn.setFixedSize(26, 26)  # Smaller button
+        min_btn.setObjectName("minimizeButton")
+        min_btn.clicked.connect(self.showMinimized)
+        title_layout.insertWidget(1, min_btn, 0, Qt.AlignmentFlag.AlignRight)
+
+        main_layout.addWidget(self.title_bar)
+
+        # Make title bar draggable
+        app_title.mouseMoveEvent = self.move_window
+        app_title.mousePressEvent = self.get_pos
+
+        # Input area with priority selection
+        self.input_widget = QWidget()
+        input_layout = QHBoxLayout(self.input_widget)
+        input_layout.setContentsMargins(0, 0, 0, 0)
+        input_layout.setSpacing(8)  # Reduced spacing
+
+        # Priority selector for new tasks - with matched height
+        self.priority_combo = QComboBox()
+        self.priority_combo.addItems(["Low", "Medium", "High"])
+        self.priority_combo.setCurrentIndex(0)
+        self.priority_combo.setFixedHeight(36)  # Match heights
+        self.priority_combo.setObjectName("priorityCombo")
+        self.priority_combo.setProperty("priority", "low")
+        self.priority_combo.currentTextChanged.connect(
+            lambda text: theme.set_state(self.priority_combo, "priority", text.lower()))
+        input_layout.addWidget(self.priority_combo)
+
+        # Task input field - with matched height
+        self.task_input = QLineEdit()
+        self.task_input.setPlaceholderText("Add a new task...")
+        self.task_input.setFixedHeight(36)  # Match heights
+        self.task_input.setObjectName("taskInput")
+        self.task_input.returnPressed.connect(self.add_task)
+        input_layout.addWidget(self.task_input)
+
+        # Add button - with matched height
+        self.add_btn = QPushButton("Add")
+        self.add_btn.setFixedHeight(36)  # Match heights
+        self.add_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.add_btn.setObjectName("addButton")
+        self.add_btn.clicked.connect(self.add_task)
+        input_layout.addWidget(self.add_btn)
+
+        main_layout.addWidget(self.input_widget)
+
+        # Sort options - more compact
+        self.sort_widget = QWidget()
+        sort_layout = QHBoxLayout(self.sort_widget)
+        sort_layout.setContentsMargins(0, 0, 0, 0)
+
+        # Sort label
+        sort_label = QLabel("Sort by:")
+        sort_label.setObjectName("sortLabel")
+        sort_layout.addWidget(sort_label)
+
+        # Sort options
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItems(["Priority", "Creation Date", "Alphabetical"])
+        self.sort_combo.setCurrentIndex(0)  # Default to Priority
+        self.sort_combo.setObjectName("sortCombo")
+        self.sort_combo.currentIndexChanged.connect(lambda: self.render_tasks())
+        sort_layout.addWidget(self.sort_combo)
+
+        # Search - filters the list as you type
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search...")
+        self.search_input.setFixedHeight(24)
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setObjectName("searchInput")
+        self.search_input.textChanged.connect(lambda: self.render_tasks())
+        sort_layout.addWidget(self.search_input, 1)
+
+        # Filter - by tag, project, due date and completion
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter...")
+        self.filter_input.setToolTip(
+            "#tag or tag:name, +project or project:name,\n"
+            "due<=today, due>YYYY-MM-DD, due:none,\n"
+            "completed, pending; \"not\" or - negates a term")
+        self.filter_input.setFixedHeight(24)
+        self.filter_input.setClearButtonEnabled(True)
+        self.filter_input.setObjectName("filterInput")
+        self.filter_input.textChanged.connect(lambda: self.render_tasks())
+        sort_layout.addWidget(self.filter_input, 1)
+
+        main_layout.addWidget(self.sort_widget)
+
+        # Tasks area
+        tasks_container = QWidget()
+        tasks_layout = QVBoxLayout(tasks_container)
+        tasks_layout.setContentsMargins(0, 0, 0, 0)
+        tasks_layout.setSpacing(0)
+
+        # Virtualized list of tasks
+        self.task_model = TaskListModel(self.store, self)
+        self.task_view = TaskListView()
+        self.task_view.setModel(self.task_model)
+        self.task_view.task_delegate.checkmark = theme.checkmark()
+        self.task_view.setObjectName("taskList")
+
+        self.task_view.status_changed.connect(self.update_task)
+        self.task_view.priority_changed.connect(self.update_task_priority)
+        self.task_view.recurrence_changed.connect(self.update_task_recurrence)
+        self.task_view.due_changed.connect(self.update_task_due)
+        self.task_view.delete_requested.connect(self.delete_task)
+        tasks_layout.addWidget(self.task_view)
+
+        # Task names only, shown instead of the full list while unfocused
+        self.minimal_view = TaskListView(minimal=True)
+        self.minimal_view.setModel(self.task_model)
+        self.minimal_view.setObjectName("taskList")
+        self.minimal_view.hide()
+        tasks_layout.addWidget(self.minimal_view)
+
+        main_layout.addWidget(tasks_container, 1)  # 1 is stretch factor
+
+        # Status bar - more compact
+        self.status_widget = QWidget()
+        status_column = QVBoxLayout(self.status_widget)
+        status_column.setContentsMargins(0, 3, 0, 0)  # Smaller margins
+        status_column.setSpacing(0)
+
+        # Performance overlay, hidden unless instrumentation is on. It
+        # gets a line of its own above the date, as the bar is full
+        self.perf_label = QLabel()
+        self.perf_label.setObjectName("perfLabel")
+        self.perf_label.hide()
+        status_column.addWidget(self.perf_label)
+
+        # Shown while changes cannot be saved; they stay queued and are
+        # retried
+        self.save_error_label = QLabel()
+        self.save_error_label.setObjectName("saveErrorLabel")
+        self.save_error_label.hide()
+        status_column.addWidget(self.save_error_label)
+
+        status_layout = QHBoxLayout()
+        status_layout.setSpacing(0)
+        status_column.addLayout(status_layout)
+
+        # Date and list actions, swapped for the selection bar while tasks
+        # are selected
+        self.info_bar = QWidget()
+        info_layout = QHBoxLayout(self.info_bar)
+        info_layout.setContentsMargins(0, 0, 0, 0)
+        info_layout.setSpacing(0)
+
+        # Date display
+        date_label = QLabel(f"Today: {datetime.now().strftime('%Y-%m-%d')}")
+        date_label.setObjectName("dateLabel")
+        info_layout.addWidget(date_label)
+
+        # Clear completed button
+        self.clear_btn = QPushButton("Clear Completed")
+        self.clear_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.clear_btn.setObjectName("clearButton")
+        self.clear_btn.clicked.connect(self.clear_completed)
+        info_layout.addStretch(1)
+        info_layout.addWidget(self.clear_btn)
+
+        # Archive button
+        archive_btn = QPushButton("Archive")
+        archive_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        archive_btn.setObjectName("clearButton")
+        archive_btn.clicked.connect(self.show_archive)
+        info_layout.addWidget(archive_btn)
+        status_layout.addWidget(self.info_bar)
+
+        # Bulk actions on the selected tasks
+        self.selection_bar = QWidget()
+        selection_layout = QHBoxLayout(self.selection_bar)
+        selection_layout.setContentsMargins(0, 0, 0, 0)
+        selection_layout.setSpacing(0)
+
+        self.selection_label = QLabel()
+        self.selection_label.setObjectName("dateLabel")
+        selection_layout.addWidget(self.selection_label)
+        selection_layout.addStretch(1)
+
+        self.complete_btn = self.create_bar_button("Complete", self.complete_selected)
+        selection_layout.addWidget(self.complete_btn)
+        self.priority_btn = self.create_bar_button("Priority", self.show_selection_priority_menu)
+        selection_layout.addWidget(self.priority_btn)
+        selection_layout.addWidget(self.create_bar_button("Delete", self.delete_selected))
+        selection_layout.addWidget(self.create_bar_button("Cancel", self.task_view.clearSelection))
+        self.selection_bar.hide()
+        status_layout.addWidget(self.selection_bar)
+
+        main_layout.addWidget(self.status_widget)
+
+        # The bar follows the selection, which a model reset clears silently
+        self.task_view.selectionModel().selectionChanged.connect(self.update_selection_bar)
+        self.task_model.modelReset.connect(self.update_selection_bar)
+
+        # Keyboard shortcuts while the list has focus; Ctrl+A and
+        # shift-arrows select as in any list
+        for key, slot in ((QKeySequence.StandardKey.Delete, self.delete_selected),
+                          (Qt.Key.Key_Backspace, self.delete_selected),
+                          (Qt.Key.Key_Escape, self.task_view.clearSelection)):
+            shortcut = QShortcut(QKeySequence(key), self.task_view)
+            shortcut.setContext(Qt.ShortcutContext.WidgetShortcut)
+            shortcut.activated.connect(slot)
+
+        # Make the tasks area draggable too
+        self.task_view.viewport().installEventFilter(self)
+        self.minimal_view.viewport().installEventFilter(self)
+
+        # Render existing tasks
+        self.render_tasks()
+
+    def create_bar_button(self, text, slot):
+        button = QPushButton(text)
+        button.setCursor(Qt.CursorShape.PointingHandCursor)
+        button.setObjectName("clearButton")
+        button.clicked.connect(slot)
+        return button
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            # Store the initial position for dragging
+            self.dragPos = event.globalPosition().toPoint()
+
+            # If clicked while in minimalist view, switch back to full view
+            if not self.is_focused:
+                self.activateWindow()
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() == Qt.MouseButton.LeftButton:
+            # Move window
+            self.move(self.pos() + event.globalPosition().toPoint() - self.dragPos)
+            self.dragPos = event.globalPosition().toPoint()
+            event.accept()
+
+    def get_pos(self, event):
+        self.dragPos = event.globalPosition().toPoint()
+
+        # If clicked while in minimalist view, switch back to full view
+        if not self.is_focused:
+            self.activateWindow()
+
+    def move_window(self, event):
+        # If left mouse button is pressed
+        if event.buttons() == Qt.MouseButton.LeftButton:
+            # Move window
+            self.move(self.pos() + event.globalPosition().toPoint() - self.dragPos)
+            self.dragPos = event.globalPosition().toPoint()
+            event.accept()
+
+    def add_task(self):
+        if self.load_error is not None:
+            return
+        task_text = self.task_input.text().strip()
+        priority = Priority.from_label(self.priority_combo.currentText())
+
+        # #tag, +project and due:DATE words set the task's fields
+        task_text, fields = parse_task_input(task_text)
+        if task_text:
+            task = Task(new_task_ids(1)[0], task_text, priority=priority, **fields)
+            # The store moves the task into the list's sorted view
+            self.history.add_many([task])
+            self.task_input.clear()
+
+    def update_task(self, task_id, completed):
+        self.update_tasks(self.targets(task_id), completed=completed)
+
+    def update_task_priority(self, task_id, priority):
+        self.update_tasks(self.targets(task_id), priority=priority)
+
+    def update_task_recurrence(self, task_id, rule):
+        # The tasks repeat from now on, all at the same times
+        next_at = None if rule is None else first_occurrence(rule)
+        self.update_tasks(self.targets(task_id), recurrence=rule, next_at=next_at)
+
+    def update_task_due(self, task_id, due_at):
+        self.update_tasks(self.targets(task_id), due_at=due_at)
+
+    def delete_task(self, task_id):
+        self.delete_tasks(self.targets(task_id))
+
+    def update_tasks(self, task_ids, **changes):
+        # One store call for all the tasks, so the list updates once and
+        # storage writes them in one batch
+        if self.load_error is not None:
+            return
+        task_ids = self.defer_missing(task_ids, self.update_tasks, **changes)
+        self.history.update_many(task_ids, **changes)
+
+    def delete_tasks(self, task_ids):
+        if self.load_error is not None:
+            return
+        self.history.delete_many(self.defer_missing(task_ids, self.delete_tasks))
+
+    def undo(self):
+        self.step_history(self.history.undo)
+
+    def redo(self):
+        self.step_history(self.history.redo)
+
+    def step_history(self, step):
+        # The history may hold tasks that are still loading
+        if self.loader is not None:
+            self.deferred_edits.append((self.step_history, (step,), {}))
+            return
+        if self.load_error is not None:
+            return
+        self.task_view.clearSelection()
+        try:
+            step()
+        except Exception as e:
+            print(f"Error undoing or redoing: {e}")
+
+    def targets(self, task_id):
+        # A button on a selected task acts on the whole selection
+        tasks = self.task_view.selected_tasks()
+        if not any(task.id == task_id for task in tasks):
+            return [task_id]
+        self.task_view.clearSelection()
+        return [task.id for task in tasks]
+
+    def complete_selected(self):
+        tasks = self.task_view.selected_tasks()
+        # Reopens the tasks instead if they are all completed already
+        completed = not all(task.completed for task in tasks)
+        self.task_view.clearSelection()
+        self.update_tasks([task.id for task in tasks], completed=completed)
+
+    def set_selected_priority(self, priority):
+        tasks = self.task_view.selected_tasks()
+        self.task_view.clearSelection()
+        self.update_tasks([task.id for task in tasks], priority=priority)
+
+    def delete_selected(self):
+        tasks = self.task_view.selected_tasks()
+        self.task_view.clearSelection()
+        self.delete_tasks([task.id for task in tasks])
+
+    def show_selection_priority_menu(self):
+        menu = QMenu(self)
+        menu.setObjectName("priorityMenu")
+        for priority in Priority:
+            action = QAction(PRIORITY_TOOLTIPS[priority], self)
+            action.triggered.connect(lambda checked=False, p=priority: self.set_selected_priority(p))
+            menu.addAction(action)
+        # Opens above the button, at the bottom of the window
+        pos = self.priority_btn.mapToGlobal(QPoint(0, 0))
+        menu.exec(pos - QPoint(0, menu.sizeHint().height()))
+
+    def update_selection_bar(self):
+        tasks = self.task_view.selected_tasks()
+        if tasks:
+            self.selection_label.setText(f"{len(tasks)} selected")
+            self.complete_btn.setText("Reopen" if all(task.completed for task in tasks) else "Complete")
+        self.info_bar.setVisible(not tasks)
+        self.selection_bar.setVisible(bool(tasks))
+
+    def clear_completed(self):
+        # Completed tasks that are still loading would be missed
+        if self.loader is not None:
+            self.deferred_edits.append((self.clear_completed, (), {}))
+            return
+        if self.load_error is not None:
+            return
+        # Cleared tasks go to the archive, from where they can be restored,
+        # or brought back with undo
+        tasks = [task for task in self.store if task.completed]
+        if tasks:
+            self.history.push(self.archive_tasks(tasks))
+
+    def archive_old_tasks(self):
+        # The latest instance of a recurring task stays until the next one
+        # has spawned, or the task would stop recurring
+        cutoff = time.time() - self.archive_after
+        self.archive_tasks([task for task in self.store if task.completed
+                            and task.created_at < cutoff and task.recurrence is None])
+
+    def archive_tasks(self, tasks):
+        # The writer thread puts the tasks in the archive before it saves
+        # them leaving the list; if that fails, on_archive_failed() brings
+        # them back. Returns the command, for the history
+        if not tasks:
+            return None
+        command = ArchiveCommand(tasks, self.archive, self.writer, self.archive_failed.emit)
+        command.redo(self.store)
+        return command
+
+    def on_archive_failed(self, tasks, error):
+        print(f"Error archiving tasks: {error}")
+        # Undoing or redoing the archiving would no longer match the list
+        self.history.discard([task.id for task in tasks])
+        self.store.add_many([task for task in tasks if task.id not in self.store])
+
+    def restore_tasks(self, tasks):
+        # Restored tasks come back unchecked, so the next archiving does
+        # not take them away again
+        if self.load_error is not None:
+            return
+        restored = [task.copy() for task in tasks]
+        for task in restored:
+            task.completed = False
+        self.store.add_many(restored)
+        # Taken out of the archive once they are saved on the list again
+        task_ids = [task.id for task in restored]
+        self.writer.after(lambda: self.archive.restore(task_ids),
+                          lambda e: print(f"Error updating archive: {e}"))
+
+    def show_archive(self):
+        dialog = ArchiveDialog(self.archive, self)
+        dialog.restore_requested.connect(self.restore_tasks)
+        dialog.exec()
+
+    def defer_missing(self, task_ids, edit, **changes):
+        # Rows paged in from the database can be clicked before the
+        # background load has reached their task; edits to such tasks are
+        # made once loading is done. Returns the ids that can be edited now
+        if self.loader is None:
+            return task_ids
+        missing = [task_id for task_id in task_ids if task_id not in self.store]
+        if not missing:
+            return task_ids
+        self.deferred_edits.append((edit, (missing,), changes))
+        return [task_id for task_id in task_ids if task_id in self.store]
+
+    def on_tasks_changed(self, changes):
+        # Every change to the store is persisted
+        self.save_tasks(*[(op, task.id if op == "delete" else task) for op, task in changes])
+
+    def watch_storage(self):
+        # Files that are replaced or renamed drop out of the watcher, so
+        # their directories are watched too, to add them back
+        paths = [os.path.abspath(path) for path in self.storage.watch_paths()]
+        paths += {os.path.dirname(path) for path in paths}
+        watched = set(self.storage_watcher.files() + self.storage_watcher.directories())
+        missing = [path for path in paths if path not in watched and os.path.exists(path)]
+        if missing:
+            self.storage_watcher.addPaths(missing)
+
+    def on_storage_changed(self, path):
+        # Our own writes land here too; the writer skips reading for them
+        self.watch_storage()
+        self.merge_timer.start()
+
+    def merge_external_changes(self, then=None):
+        # The writer thread writes what we have queued first, so that our
+        # changes come after any that other processes made to the same
+        # tasks, and stay; then it reads theirs and posts them back here
+        self.writer.refresh(lambda ops: self.external_changes_read.emit(ops, then))
+
+    def on_external_changes_read(self, ops, then):
+        if ops:
+            self.store.merge_external(ops)
+        if then is not None:
+            then()
+
+    def on_recurrence_changed(self, changes):
+        # Tasks that are still loading are scheduled all at once afterwards
+        if self.scheduler.on_tasks_changed(changes) and self.loader is None:
+            self.arm_recurrence_timer()
+
+    def arm_recurrence_timer(self):
+        next_at = self.scheduler.next_time()
+        if next_at is None:
+            self.recurrence_timer.stop()
+            return
+        # A timer capped at MAX_TIMER_DELAY finds nothing due and is armed again
+        delay = min(max(next_at - time.time(), 0), MAX_TIMER_DELAY)
+        self.recurrence_timer.start(int(delay * 1000))
+
+    def spawn_recurring_tasks(self):
+        # Another window may have spawned them already; merging its changes
+        # first takes the due tasks off the schedule here
+        self.merge_external_changes(then=self.spawn_due_tasks)
+
+    def spawn_due_tasks(self):
+        # Undoing an edit of a task that has handed its rule on would no
+        # longer undo it, so such edits leave the history
+        spawned_from, _ = self.scheduler.spawn_due()
+        self.history.discard(spawned_from)
+        self.arm_recurrence_timer()
+
+    @instrumentation.timed("api requests")
+    def run_api_requests(self):
+        # Requests wait until loading is done, which runs them
+        if self.loader is None:
+            self.api_dispatcher.run_pending()
+
+    @instrumentation.timed("render_tasks")
+    def render_tasks(self):
+        # Used on startup and when the sort method, search or filter
+        # changes; edits reach the list through the store's sorted views
+        sort_method = self.sort_combo.currentText()
+
+        # Only the visible rows are painted, so no widgets are built here
+        self.filter_error = None
+        try:
+            results = self.store.search(self.search_input.text(), sort_method, self.filter_input.text())
+        except ValueError as e:
+            # Nothing matches a filter still being typed
+            self.filter_error = str(e)
+            results = self.store.empty_view(sort_method)
+        self.update_placeholder()
+        if results is not None:
+            # The store keeps the matching tasks in a view of their own
+            self.task_model.set_view(results)
+        elif self.storage.supports_query:
+            # Let the database sort with its indexes, a page at a time
+            self.task_model.set_query(
+                lambda after, limit: self.query_page(sort_method, after, limit),
+                sort_key_for(sort_method))
+        else:
+            # The store keeps every sort mode's view sorted, so this is a swap
+            self.task_model.set_view(self.store.view(sort_method))
+
+    def query_page(self, sort_method, after, limit):
+        # Pages must include every change already shown in the list. The
+        # changes still queued for the writer are laid over the database's
+        # rows instead of waiting for them to be written
+        pending = self.writer.pending_ops()
+        sort_key = sort_key_for(sort_method)
+        rows = []
+        start = after
+        while True:
+            page = self.storage.query(sort_method, limit, after=start)
+            rows += [task for task in page if task.id not in pending]
+            if len(page) < limit or len(rows) >= limit:
+                break
+            start = sort_key(page[-1])
+        queued = sorted((payload for op, payload in pending.values()
+                         if op != "delete" and (after is None or sort_key(payload) > after)),
+                        key=sort_key)
+        return list(islice(merge(rows, queued, key=sort_key), limit))
+
+    @instrumentation.timed("save_tasks")
+    def save_tasks(self, *ops):
+        # Only the changed tasks are queued, as storage operations; the
+        # background writer puts them on disk
+        self.writer.submit(ops)
+
+    def load_tasks(self):
+        # Loading only creates objects that live on, which the cycle
+        # collector would otherwise scan over and over as they pile up;
+        # on_tasks_loaded() turns it back on
+        gc.disable()
+        try:
+            # Batches come pre-sorted for the list, unless the database sorts it
+            sort_key = None
+            if not self.storage.supports_query:
+                sort_key = sort_key_for(self.sort_combo.currentText())
+            self.load_started = time.perf_counter()
+            self.loader = TaskLoader(self.storage, sort_key, self)
+            self.loader.batch_loaded.connect(instrumentation.timed("load batch")(self.store.load_many))
+            self.loader.finished.connect(self.on_tasks_loaded)
+            self.loader.start()
+        except BaseException:
+            # No loader will finish to turn it back on
+            gc.enable()
+            raise
+        self.update_placeholder()
+
+    def on_tasks_loaded(self):
+        # Freezing and unfreezing moves everything loaded so far to the
+        # oldest generation, where young collections skip it but deleted
+        # tasks can still be collected
+        gc.freeze()
+        gc.unfreeze()
+        gc.enable()
+        error, self.loader = self.loader.error, None
+        if instrumentation.enabled:
+            instrumentation.record("load_tasks", time.perf_counter() - self.load_started)
+        self.update_placeholder()
+        if error is not None:
+            self.make_read_only(error)
+            return
+        edits, self.deferred_edits = self.deferred_edits, []
+        for edit, args, kwargs in edits:
+            edit(*args, **kwargs)
+        self.archive_old_tasks()
+        self.archive_timer.start()
+        # Occurrences missed while the app was closed are due right away
+        self.scheduler.rebuild()
+        self.arm_recurrence_timer()
+        # Anything other processes saved while we were loading, then
+        # whatever they save from now on
+        self.watch_storage()
+        self.merge_external_changes()
+        if self.api_server is not None:
+            self.run_api_requests()
+
+    def toggle_perf_overlay(self):
+        self.show_perf_overlay(self.perf_label.isHidden())
+
+    def show_perf_overlay(self, shown):
+        # Hot paths are only timed while the overlay is up
+        if shown:
+            instrumentation.enable()
+            self.perf_seen = instrumentation.elapsed()
+            self.update_perf_overlay()
+            self.perf_timer.start()
+        else:
+            instrumentation.disable()
+            self.perf_timer.stop()
+        self.perf_label.setVisible(shown)
+
+    def update_perf_overlay(self):
+        # The slowest call since the last update, and memory in use; the
+        # tooltip has every path's numbers so far
+        recent = instrumentation.since(self.perf_seen)
+        self.perf_seen = instrumentation.elapsed()
+        text = "idle"
+        if recent:
+            _, name, ms = max(recent, key=lambda event: event[2])
+            text = f"{name} {ms:.1f}ms"
+        gauges = self.perf_gauges()
+        if gauges["rss_mb"] is not None:
+            text += f" · {gauges['rss_mb']:.0f}MB"
+        self.perf_label.setText(text)
+
+        lines = [f"{name}: {stats['count']} calls, mean {stats['mean_ms']:.1f}ms, "
+                 f"p95 {stats['p95_ms']:.1f}ms, max {stats['max_ms']:.1f}ms"
+                 for name, stats in sorted(instrumentation.summary().items())]
+        lines.append(f"{gauges['widgets']} widgets, {gauges['tasks']} tasks")
+        self.perf_label.setToolTip("\n".join(lines))
+
+    def perf_gauges(self):
+        return {"rss_mb": rss_mb(), "widgets": len(QApplication.allWidgets()), "tasks": len(self.store)}
+
+    def dump_perf_trace(self):
+        path = self.perf_trace or "perf-trace.json"
+        try:
+            instrumentation.dump(path, self.perf_gauges())
+        except OSError as e:
+            print(f"Error writing performance trace: {e}")
+            return
+        if not self.perf_label.isHidden():
+            self.perf_label.setText(f"Trace: {os.path.basename(path)}")
+
+    def make_read_only(self, error):
+        # Saving now would write the tasks read so far over the rest, so
+        # nothing is saved or edited until the storage is fixed and the app
+        # restarted; the list still shows what was read
+        self.load_error = error
+        self.writer.set_read_only(error)
+        self.deferred_edits = []
+        if self.api_server is not None:
+            self.api_dispatcher.api.read_only = str(error)
+            self.run_api_requests()
+        for widget in (self.priority_combo, self.task_input, self.add_btn, self.clear_btn):
+            widget.setEnabled(False)
+        self.task_view.read_only = True
+        self.minimal_view.read_only = True
+        self.save_error_label.setText("Tasks failed to load, changes are not saved")
+        self.save_error_label.setToolTip(str(error))
+        self.save_error_label.show()
+
+    def on_save_failed(self, error):
+        # A failed load already says nothing is saved
+        if self.load_error is not None:
+            return
+        if error is None:
+            self.save_error_label.hide()
+            return
+        self.save_error_label.setText("Changes not saved, retrying...")
+        self.save_error_label.setToolTip(str(error))
+        self.save_error_label.show()
+
+    def update_placeholder(self):
+        # What the list says while it is empty
+        if self.loader is not None:
+            text = "Loading tasks..."
+        elif self.filter_error is not None:
+            text = f"Invalid filter: {self.filter_error}"
+        elif tokenize(self.search_input.text()) or self.filter_input.text().strip():
+            text = "No matching tasks"
+        else:
+            text = "Add a new task above"
+        self.task_view.set_placeholder(text)
+        self.minimal_view.set_placeholder(text)
+
+    def closeEvent(self, event):
+        # Stop merging changes from other processes, then write anything
+        # still queued before the window goes away
+        self.storage_watcher.blockSignals(True)
+        self.merge_timer.stop()
+        self.recurrence_timer.stop()
+        if self.api_server is not None:
+            self.api_server.stop()
+        if self.perf_trace is not None:
+            self.dump_perf_trace()
+        self.writer.close()
+        super().closeEvent(event)
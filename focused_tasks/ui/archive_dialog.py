@@ -0,0 +1,111 @@
+"""Dialog for searching the archive and restoring tasks from it."""
+from datetime import datetime
+
+from PyQt6.QtWidgets import (QAbstractItemView, QDateEdit, QDialog, QHBoxLayout, QLabel, QLineEdit,
+                             QListWidget, QListWidgetItem, QPushButton, QVBoxLayout)
+from PyQt6.QtCore import Qt, QDate, pyqtSignal
+
+from ..archive import select
+
+
+class ArchiveDialog(QDialog):
+    """Searches the archive and restores tasks from it.
+
+    The archive is read once when the dialog opens; searching then only
+    filters what was read.
+    """
+
+    # Most tasks listed at once, newest first
+    RESULT_LIMIT = 500
+
+    restore_requested = pyqtSignal(list)
+
+    def __init__(self, archive, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Archive")
+        self.setObjectName("archiveDialog")
+        self.resize(360, 420)
+
+        try:
+            self.tasks = archive.load()
+        except Exception as e:
+            print(f"Error reading archive: {e}")
+            self.tasks = []
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(8)
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search archive...")
+        self.search_input.setFixedHeight(28)
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setObjectName("searchInput")
+        self.search_input.textChanged.connect(self.refresh)
+        layout.addWidget(self.search_input)
+
+        # Created between, both days included
+        dates = [datetime.fromtimestamp(task.created_at).date() for task in self.tasks]
+        first = min(dates, default=datetime.now().date())
+        date_layout = QHBoxLayout()
+        self.from_date = self.create_date_edit(first)
+        self.to_date = self.create_date_edit(max(dates + [datetime.now().date()]))
+        for text, date_edit in (("From", self.from_date), ("To", self.to_date)):
+            label = QLabel(text)
+            label.setObjectName("sortLabel")
+            date_layout.addWidget(label)
+            date_layout.addWidget(date_edit, 1)
+        layout.addLayout(date_layout)
+
+        self.result_list = QListWidget()
+        self.result_list.setObjectName("archiveList")
+        self.result_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        layout.addWidget(self.result_list, 1)
+
+        button_layout = QHBoxLayout()
+        self.count_label = QLabel()
+        self.count_label.setObjectName("dateLabel")
+        button_layout.addWidget(self.count_label, 1)
+
+        restore_btn = QPushButton("Restore")
+        restore_btn.setFixedHeight(30)
+        restore_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        restore_btn.setObjectName("addButton")
+        restore_btn.clicked.connect(self.restore_selected)
+        button_layout.addWidget(restore_btn)
+        layout.addLayout(button_layout)
+
+        self.refresh()
+
+    def create_date_edit(self, date):
+        date_edit = QDateEdit(QDate(date.year, date.month, date.day))
+        date_edit.setCalendarPopup(True)
+        date_edit.setDisplayFormat("yyyy-MM-dd")
+        date_edit.setObjectName("archiveDate")
+        date_edit.dateChanged.connect(self.refresh)
+        return date_edit
+
+    def refresh(self):
+        start = self.from_date.date().startOfDay().toSecsSinceEpoch()
+        end = self.to_date.date().addDays(1).startOfDay().toSecsSinceEpoch()
+        found = select(self.tasks, start, end, self.search_input.text())
+
+        self.result_list.clear()
+        for task in found[:self.RESULT_LIMIT]:
+            created = datetime.fromtimestamp(task.created_at).strftime("%Y-%m-%d")
+            item = QListWidgetItem(f"{task.text}  ·  {created}")
+            item.setData(Qt.ItemDataRole.UserRole, task.id)
+            self.result_list.addItem(item)
+
+        if len(found) > self.RESULT_LIMIT:
+            self.count_label.setText(f"Newest {self.RESULT_LIMIT} of {len(found)} tasks")
+        else:
+            self.count_label.setText(f"{len(found)} tasks")
+
+    def restore_selected(self):
+        ids = {item.data(Qt.ItemDataRole.UserRole) for item in self.result_list.selectedItems()}
+        if not ids:
+            return
+        self.restore_requested.emit([task for task in self.tasks if task.id in ids])
+        self.tasks = [task for task in self.tasks if task.id not in ids]
+        self.refresh()
@@ -0,0 +1,60 @@
+"""Background loading of the stored tasks."""
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .task_list import TaskListModel
+
+
+class TaskLoader(QObject):
+    """Reads the stored tasks on a background thread.
+
+    Tasks are handed to the UI thread through batch_loaded in batches that
+    start at one page and double in size, so the top of the list shows up
+    right away. Each batch is sorted here by sort_key, if given, which
+    leaves the UI thread only a linear merge into the list's sorted view.
+
+    finished is emitted after the last batch, or after a read that failed,
+    which leaves the exception in error.
+    """
+
+    batch_loaded = pyqtSignal(list)
+    finished = pyqtSignal()
+
+    FIRST_BATCH = TaskListModel.PAGE_SIZE
+
+    def __init__(self, storage, sort_key=None, parent=None):
+        super().__init__(parent)
+        self.storage = storage
+        self.sort_key = sort_key
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="task-loader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _emit(self, batch):
+        if self.sort_key is not None:
+            batch.sort(key=self.sort_key)
+        # Queued to the UI thread
+        self.batch_loaded.emit(batch)
+
+    def _run(self):
+        batch = []
+        size = self.FIRST_BATCH
+        try:
+            for task in self.storage.load_iter():
+                batch.append(task)
+                if len(batch) == size:
+                    self._emit(batch)
+                    batch = []
+                    size *= 2
+            if batch:
+                self._emit(batch)
+        except Exception as e:
+            print(f"Error loading tasks: {e}")
+            self.error = e
+            # What was read is still shown
+            if batch:
+                self._emit(batch)
+        self.finished.emit()
@@ -0,0 +1,632 @@
+"""The virtualized task list: its model, row delegate and view."""
+from datetime import date, datetime, timedelta
+
+from PyQt6.QtWidgets import QAbstractItemView, QListView, QMenu, QStyle, QStyledItemDelegate, QToolTip
+from PyQt6.QtCore import (Qt, QAbstractListModel, QEvent, QModelIndex, QPoint, QRect, QRectF,
+                          QSize, pyqtSignal)
+from PyQt6.QtGui import QAction, QFont, QFontMetrics, QPainter, QPen
+
+from . import theme
+from ..filters import day_start
+from ..recurrence import COMMON_RULES
+from ..task import Priority
+from ..task_store import SortedView, TaskStore, sort_key_for
+
+
+PRIORITY_TOOLTIPS = {
+    Priority.HIGH: "High Priority",
+    Priority.MEDIUM: "Medium Priority",
+    Priority.LOW: "Low Priority",
+}
+
+
+class TaskListModel(QAbstractListModel):
+    """List model over a sorted view of the tasks.
+
+    Rows are handed to the view a page at a time through fetchMore(), so the
+    view only ever lays out the part of the list that has been scrolled to.
+
+    With set_view() the model shows one of the store's sorted views. The
+    store keeps that view sorted through every change and the view reports
+    each row it inserts, removes or changes to the model, so an edit only
+    touches its own rows and switching the sort mode just swaps the view.
+
+    With set_query() the pages come from a sorted query instead, and the
+    model keeps the rows fetched so far in a view of its own, which it
+    updates from the store's change notifications.
+    """
+
+    PAGE_SIZE = 200
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self._view = SortedView(sort_key_for("Priority"))
+        self._loaded = 0
+        self._fetch_page = None
+        self._fetched = {}
+        self._more = False
+        self._changing = False
+        self._insert_visible = False
+        self._remove_visible = 0
+        store.subscribe(self.on_tasks_changed)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        if self._fetch_page is not None:
+            return self._more
+        return self._loaded < len(self._view)
+
+    def fetchMore(self, parent=QModelIndex()):
+        # Fetching while rows are being inserted or removed would read
+        # offsets that are about to shift
+        if parent.isValid() or self._changing:
+            return
+        if self._fetch_page is not None:
+            if self._more:
+                self._fetch_next_page()
+            return
+        count = min(self.PAGE_SIZE, len(self._view) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._view[index.row()].text
+        return None
+
+    def task_at(self, row):
+        # The delegate reads the task directly instead of going through
+        # data(), which would wrap it in a QVariant on every paint
+        return self._view[row]
+
+    def _set_view(self, view):
+        if self._view.observer is self:
+            self._view.observer = None
+        self._view = view
+        view.observer = self
+
+    def set_view(self, view):
+        """Show a sorted view that its owner keeps up to date."""
+        self.beginResetModel()
+        self._set_view(view)
+        self._fetch_page = None
+        self._fetched = {}
+        self._more = False
+        self._loaded = min(self.PAGE_SIZE, len(view))
+        self.endResetModel()
+
+    def set_query(self, fetch_page, sort_key):
+        """Show the rows returned by fetch_page(after, limit).
+
+        fetch_page must return the first limit tasks whose sort_key is
+        greater than after, or of all of them if after is None, in order,
+        such as an indexed database query with LIMIT.
+        """
+        self.beginResetModel()
+        self._set_view(SortedView(sort_key))
+        self._fetch_page = fetch_page
+        self._fetched = {}
+        self._loaded = 0
+        self._more = True
+        self._fetch_next_page(notify=False)
+        self.endResetModel()
+
+    def _fetch_next_page(self, notify=True):
+        # The rows fetched so far are always the start of the query's
+        # order, so the next page starts after the last of them
+        after = None
+        if len(self._view):
+            after = self._view.sort_key(self._view[len(self._view) - 1])
+        page = self._fetch_page(after, self.PAGE_SIZE)
+        self._more = len(page) == self.PAGE_SIZE
+        if not page:
+            return
+
+        start = len(self._view)
+        self._changing = True
+        if notify:
+            self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self._view.extend(page)
+        for task in page:
+            self._fetched[task.id] = self._view.sort_key(task)
+        self._loaded = len(self._view)
+        if notify:
+            self.endInsertRows()
+        self._changing = False
+
+    def on_tasks_changed(self, changes):
+        # Store views update themselves; only fetched query rows need this
+        if self._fetch_page is None:
+            return
+        # Like the store's views, a large batch is shown with one reset
+        held = len(changes) > TaskStore.RESET_THRESHOLD
+        if held:
+            self._view.hold()
+        try:
+            deleted = [self._fetched.pop(task.id) for op, task in changes
+                       if op == "delete" and task.id in self._fetched]
+            if deleted:
+                self._view.remove_many(deleted)
+            for op, task in changes:
+                if op != "delete":
+                    self._place(task)
+        finally:
+            if held:
+                self._view.release()
+
+    def _place(self, task):
+        # Fetched rows are private copies, so that later in-place edits to
+        # the store's tasks cannot change their keys behind the view's back
+        task = task.copy()
+        view = self._view
+        key = view.sort_key(task)
+
+        # Rows sorting past the fetched ones are left to fetchMore(), as
+        # unfetched rows may come before them
+        fits = view.bisect(key) < len(view) or not self._more
+
+        old_key = self._fetched.get(task.id)
+        if old_key is not None:
+            if fits:
+                view.update(task, view.find(old_key))
+                self._fetched[task.id] = key
+            else:
+                view.remove(old_key)
+                del self._fetched[task.id]
+        elif fits:
+            view.insert(task, key)
+            self._fetched[task.id] = key
+
+    # Row changes reported by the view
+
+    def begin_insert(self, row):
+        # Rows past the loaded page are picked up later by fetchMore()
+        self._insert_visible = row < self._loaded or not self.canFetchMore()
+        self._changing = True
+        if self._insert_visible:
+            self.beginInsertRows(QModelIndex(), row, row)
+
+    def end_insert(self, row):
+        if self._insert_visible:
+            self._loaded += 1
+            self.endInsertRows()
+        self._changing = False
+
+    def begin_remove(self, first, last):
+        # Only the loaded part of the rows is known to the list view
+        last = min(last, self._loaded - 1)
+        self._remove_visible = max(0, last - first + 1)
+        self._changing = True
+        if self._remove_visible:
+            self.beginRemoveRows(QModelIndex(), first, last)
+
+    def end_remove(self, first, last):
+        if self._remove_visible:
+            self._loaded -= self._remove_visible
+            self.endRemoveRows()
+        self._changing = False
+
+    def row_changed(self, row):
+        self.refresh_row(row)
+
+    def begin_reset(self):
+        self._changing = True
+        self.beginResetModel()
+
+    def end_reset(self):
+        if self._fetch_page is not None:
+            # Every fetched row is shown
+            self._loaded = len(self._view)
+        else:
+            # Keep at least as many rows loaded as before the reset
+            self._loaded = min(max(self._loaded, self.PAGE_SIZE), len(self._view))
+        self.endResetModel()
+        self._changing = False
+
+    def refresh_row(self, row):
+        if row < self._loaded:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+
+class TaskDelegate(QStyledItemDelegate):
+    """Paints a task row with the look of a task card.
+
+    Nothing is instantiated per task: the priority button, checkbox and
+    delete button are painted, and clicks on them are hit-tested here.
+    """
+
+    button_clicked = pyqtSignal(str, QModelIndex, QRect)
+
+    ROW_SPACING = 6
+    CARD_MARGIN_H = 1
+    CARD_MARGIN_V = 2
+    PADDING = 10
+    MINIMAL_PADDING = 7
+    SPACING = 8
+    PRIORITY_SIZE = 22
+    CHECKBOX_SIZE = 20
+
+    TEXT_FLAGS = (Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+                  | Qt.TextFlag.TextWordWrap)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.minimal = False
+        self.hover_pos = None
+        self.checkmark = None
+        self._pressed = None
+        self._height_cache = {}
+
+        self.text_font = QFont(theme.FONT_FAMILY)
+        self.text_font.setPixelSize(13)
+        self.minimal_font = QFont(theme.FONT_FAMILY)
+        self.minimal_font.setPixelSize(14)  # Larger text in minimalist view
+
+        self.priority_font = QFont()
+        self.priority_font.setPixelSize(12)
+        self.priority_font.setBold(True)
+
+        self.delete_font = QFont()
+        self.delete_font.setPixelSize(18)
+        self.delete_font.setBold(True)
+        self.delete_width = QFontMetrics(self.delete_font).horizontalAdvance("×") + 6
+
+    def layout_rects(self, rect):
+        """Return the card, priority, checkbox, text and delete rects of a row."""
+        card = rect.adjusted(self.CARD_MARGIN_H, self.CARD_MARGIN_V,
+                             -self.CARD_MARGIN_H, -(self.CARD_MARGIN_V + self.ROW_SPACING))
+        if self.minimal:
+            pad = self.MINIMAL_PADDING
+            return card, QRect(), QRect(), card.adjusted(pad, pad, -pad, -pad), QRect()
+
+        content = card.adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING)
+        center_y = content.center().y()
+
+        priority = QRect(content.left(), center_y - self.PRIORITY_SIZE // 2 + 1,
+                         self.PRIORITY_SIZE, self.PRIORITY_SIZE)
+        checkbox = QRect(priority.right() + 1 + self.SPACING, center_y - self.CHECKBOX_SIZE // 2 + 1,
+                         self.CHECKBOX_SIZE, self.CHECKBOX_SIZE)
+        delete = QRect(content.right() + 1 - self.delete_width, content.top(),
+                       self.delete_width, content.height())
+        text_left = checkbox.right() + 1 + self.SPACING
+        text = QRect(text_left, content.top(),
+                     delete.left() - self.SPACING - text_left, content.height())
+        return card, priority, checkbox, text, delete
+
+    def hit_target(self, rect, pos):
+        """Return which button of the row at rect is under pos, if any."""
+        if self.minimal:
+            return None
+        _, priority, checkbox, _, delete = self.layout_rects(rect)
+        if priority.contains(pos):
+            return "priority"
+        if checkbox.contains(pos):
+            return "checkbox"
+        if delete.contains(pos):
+            return "delete"
+        return None
+
+    def display_text(self, task):
+        # Recurring tasks are marked in front of their text, and the full
+        # list shows the project, tags and due date on a line below it
+        text = task.text if task.recurrence is None else f"↻ {task.text}"
+        if self.minimal:
+            return text
+        fields = [f"+{task.project}"] if task.project is not None else []
+        fields += [f"#{tag}" for tag in task.tags]
+        if task.due_at is not None:
+            fields.append(f"due {datetime.fromtimestamp(task.due_at).date().isoformat()}")
+        return text if not fields else text + "\n" + " ".join(fields)
+
+    def _text_width(self, row_width):
+        row = QRect(0, 0, row_width, 1000)
+        return self.layout_rects(row)[3].width()
+
+    def sizeHint(self, option, index):
+        task = index.model().task_at(index.row())
+        view = option.widget
+        row_width = view.viewport().width() if view is not None else 300
+
+        # Heights only depend on text, width and mode, so they are cached
+        # to keep relayouts of long lists cheap
+        cache = self._height_cache.setdefault((row_width, self.minimal), {})
+        text = self.display_text(task)
+        height = cache.get(text)
+        if height is None:
+            font = self.minimal_font if self.minimal else self.text_font
+            text_width = max(self._text_width(row_width), 1)
+            bounds = QFontMetrics(font).boundingRect(QRect(0, 0, text_width, 100000),
+                                                     self.TEXT_FLAGS, text)
+            if self.minimal:
+                content = bounds.height()
+                pad = self.MINIMAL_PADDING
+            else:
+                content = max(bounds.height(), self.PRIORITY_SIZE)
+                pad = self.PADDING
+            height = content + 2 * (pad + self.CARD_MARGIN_V) + self.ROW_SPACING
+            cache[text] = height
+
+        return QSize(row_width, height)
+
+    def paint(self, painter, option, index):
+        task = index.model().task_at(index.row())
+        card, priority_rect, checkbox_rect, text_rect, delete_rect = self.layout_rects(option.rect)
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        hover_pos = self.hover_pos if hovered else None
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # Card background
+        painter.setPen(Qt.PenStyle.NoPen)
+        if selected:
+            painter.setBrush(theme.CARD_SELECTED)
+        else:
+            painter.setBrush(theme.CARD_HOVER if hovered else theme.BACKGROUND)
+        painter.drawRoundedRect(QRectF(card), 8, 8)
+
+        if not self.minimal:
+            self._paint_priority(painter, priority_rect, task.priority, hover_pos)
+            self._paint_checkbox(painter, checkbox_rect, task.completed, hover_pos)
+            self._paint_delete(painter, delete_rect, hover_pos)
+
+        # Task text
+        font = QFont(self.minimal_font if self.minimal else self.text_font)
+        if task.completed:
+            font.setStrikeOut(True)
+            color = theme.DONE_TEXT
+        else:
+            color = theme.TEXT if self.minimal else theme.TASK_TEXT
+        painter.setFont(font)
+        painter.setPen(color)
+        painter.drawText(text_rect, self.TEXT_FLAGS, self.display_text(task))
+
+        painter.restore()
+
+    def _paint_priority(self, painter, rect, priority, hover_pos):
+        color, hover_color = theme.PRIORITY_COLORS[priority]
+        if hover_pos is not None and rect.contains(hover_pos):
+            color = hover_color
+
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(color)
+        painter.drawEllipse(QRectF(rect))
+
+        painter.setFont(self.priority_font)
+        painter.setPen(theme.WHITE)
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "!")
+
+    def _paint_checkbox(self, painter, rect, checked, hover_pos):
+        indicator = QRectF(rect).adjusted(1, 1, -1, -1)
+        hovered = hover_pos is not None and rect.contains(hover_pos)
+
+        pen = QPen(theme.ACCENT if checked or hovered else theme.CHECKBOX_BORDER)
+        pen.setWidth(2)
+        painter.setPen(pen)
+        painter.setBrush(theme.ACCENT if checked else Qt.GlobalColor.transparent)
+        painter.drawEllipse(indicator)
+
+        if checked and self.checkmark is not None:
+            x = rect.x() + (rect.width() - self.checkmark.width()) // 2
+            y = rect.y() + (rect.height() - self.checkmark.height()) // 2
+            painter.drawPixmap(x, y, self.checkmark)
+
+    def _paint_delete(self, painter, rect, hover_pos):
+        hovered = hover_pos is not None and rect.contains(hover_pos)
+        painter.setFont(self.delete_font)
+        painter.setPen(theme.DANGER if hovered else theme.MUTED)
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "×")
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease,
+                                QEvent.Type.MouseButtonDblClick):
+            return False
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
+
+        target = self.hit_target(option.rect, event.position().toPoint())
+        if event.type() == QEvent.Type.MouseButtonRelease:
+            pressed, self._pressed = self._pressed, None
+            if target is not None and pressed == (target, index.row()):
+                rects = self.layout_rects(option.rect)
+                rect = {"priority": rects[1], "checkbox": rects[2], "delete": rects[4]}[target]
+                self.button_clicked.emit(target, index, rect)
+        elif target is not None:
+            self._pressed = (target, index.row())
+
+        # Swallow clicks on the buttons so the view does not act on them
+        return target is not None
+
+    def helpEvent(self, event, view, option, index):
+        if event.type() == QEvent.Type.ToolTip and index.isValid():
+            if self.hit_target(option.rect, event.pos()) == "priority":
+                task = index.model().task_at(index.row())
+                QToolTip.showText(event.globalPos(),
+                                  PRIORITY_TOOLTIPS[task.priority], view)
+                return True
+            QToolTip.hideText()
+            return True
+        return super().helpEvent(event, view, option, index)
+
+    def clear_size_cache(self):
+        self._height_cache.clear()
+
+
+class TaskListView(QListView):
+    """Virtualized task list: only visible rows are ever painted.
+
+    The full list supports selecting several tasks with shift- and
+    ctrl-click for bulk actions; the minimal one has no selection.
+    """
+
+    # Ids are 64-bit, wider than a Qt int
+    status_changed = pyqtSignal(object, bool)
+    priority_changed = pyqtSignal(object, object)
+    recurrence_changed = pyqtSignal(object, object)
+    due_changed = pyqtSignal(object, object)
+    delete_requested = pyqtSignal(object)
+
+    def __init__(self, minimal=False, parent=None):
+        super().__init__(parent)
+        self.task_delegate = TaskDelegate(self)
+        self.task_delegate.minimal = minimal
+        self.task_delegate.button_clicked.connect(self.on_button_clicked)
+        self.setItemDelegate(self.task_delegate)
+
+        self.setMouseTracking(True)
+        if minimal:
+            self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+            self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        else:
+            self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+            # Focused by a click, for the keyboard shortcuts on the selection
+            self.setFocusPolicy(Qt.FocusPolicy.ClickFocus)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+
+        # Relayouts on resize are handled in resizeEvent()
+        self.setResizeMode(QListView.ResizeMode.Fixed)
+        self._layout_width = None
+
+        # Lay out long lists in batches so the UI stays responsive
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(200)
+
+        # Shown while the list is empty
+        self.placeholder = "Add a new task above"
+        # Set when the tasks cannot be saved; the row buttons then do nothing
+        self.read_only = False
+
+    def hit_target(self, pos):
+        index = self.indexAt(pos)
+        if not index.isValid():
+            return None
+        return self.task_delegate.hit_target(self.visualRect(index), pos)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Row heights only depend on the width (the text wraps), so a new
+        # height, or being shown again at the same width, needs no relayout.
+        # Heights cached for the old width would never be used again
+        width = self.viewport().width()
+        if width != self._layout_width:
+            self._layout_width = width
+            self.task_delegate.clear_size_cache()
+            self.scheduleDelayedItemsLayout()
+
+    def first_visible_index(self):
+        return self.indexAt(QPoint(0, 0))
+
+    def selected_tasks(self):
+        model = self.model()
+        return [model.task_at(index.row()) for index in self.selectionModel().selectedRows()]
+
+    def on_button_clicked(self, target, index, rect):
+        if self.read_only:
+            return
+        task = self.model().task_at(index.row())
+        if target == "priority":
+            self.show_priority_menu(task, self.viewport().mapToGlobal(rect.bottomLeft()))
+        elif target == "checkbox":
+            self.status_changed.emit(task.id, not task.completed)
+        elif target == "delete":
+            self.delete_requested.emit(task.id)
+
+    def show_priority_menu(self, task, pos):
+        menu = QMenu(self)
+        menu.setObjectName("priorityMenu")
+        task_id = task.id
+
+        for priority in Priority:
+            action = QAction(PRIORITY_TOOLTIPS[priority], self)
+            action.triggered.connect(lambda checked=False, p=priority: self.priority_changed.emit(task_id, p))
+            menu.addAction(action)
+
+        # How often the task repeats, with its current rule checked
+        menu.addSeparator()
+        rules = {"Don't Repeat": None, **COMMON_RULES}
+        if task.recurrence is not None and task.recurrence not in rules.values():
+            rules[f"Repeats {task.recurrence}"] = task.recurrence
+        for label, rule in rules.items():
+            action = QAction(label, self)
+            action.setCheckable(True)
+            action.setChecked(task.recurrence == rule)
+            action.triggered.connect(lambda checked=False, r=rule: self.recurrence_changed.emit(task_id, r))
+            menu.addAction(action)
+
+        # When the task is due, as the start of a local day
+        menu.addSeparator()
+        today = date.today()
+        due_dates = {
+            "No Due Date": None,
+            "Due Today": day_start(today),
+            "Due Tomorrow": day_start(today + timedelta(days=1)),
+            "Due Next Week": day_start(today + timedelta(days=7)),
+        }
+        for label, due_at in due_dates.items():
+            action = QAction(label, self)
+            action.setCheckable(True)
+            action.setChecked(task.due_at == due_at)
+            action.triggered.connect(lambda checked=False, d=due_at: self.due_changed.emit(task_id, d))
+            menu.addAction(action)
+
+        menu.exec(pos)
+
+    def mouseMoveEvent(self, event):
+        old_pos = self.task_delegate.hover_pos
+        pos = event.position().toPoint()
+        self.task_delegate.hover_pos = pos
+
+        # Repaint the rows whose button hover state may have changed
+        for point in (old_pos, pos):
+            if point is not None:
+                index = self.indexAt(point)
+                if index.isValid():
+                    self.viewport().update(self.visualRect(index))
+
+        if self.hit_target(pos) is not None:
+            self.viewport().setCursor(Qt.CursorShape.PointingHandCursor)
+        else:
+            self.viewport().unsetCursor()
+
+        super().mouseMoveEvent(event)
+
+    def leaveEvent(self, event):
+        self.task_delegate.hover_pos = None
+        self.viewport().unsetCursor()
+        super().leaveEvent(event)
+
+    def set_placeholder(self, text):
+        self.placeholder = text
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+
+        model = self.model()
+        if model is not None and model.rowCount() == 0:
+            # Empty state
+            painter = QPainter(self.viewport())
+            font = QFont(theme.FONT_FAMILY)
+            font.setPixelSize(13)
+            font.setItalic(True)
+            painter.setFont(font)
+            painter.setPen(theme.MUTED)
+            height = QFontMetrics(font).height() + 40
+            painter.drawText(QRect(0, 0, self.viewport().width(), height),
+                             Qt.AlignmentFlag.AlignCenter, self.placeholder)
+            painter.end()
@@ -0,0 +1,328 @@
+"""Colors, fonts and the application stylesheet.
+
+The whole UI is styled by STYLESHEET, installed once on the application
+with install(). Widgets are picked out by object name, and state that
+changes at runtime is exposed as dynamic properties the stylesheet
+selects on (for example [minimal="true"]); set_state() updates such a
+property and re-polishes only that widget.
+
+The task list is painted by its delegate rather than styled, so the
+delegate takes its colors from here as ready-made QColor objects, and
+its checkmark from checkmark().
+"""
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor, QPainter, QPen, QPixmap
+
+from ..task import Priority
+
+FONT_FAMILY = "Segoe UI"
+
+BACKGROUND = QColor("#1e1f21")
+CARD_HOVER = QColor("#28292c")
+CARD_SELECTED = QColor("#2c2f4a")
+TEXT = QColor("#e0e1e2")
+TASK_TEXT = QColor("#f8f9fa")
+DONE_TEXT = QColor("#6e7175")
+MUTED = QColor("#6c757d")
+BORDER = QColor("#3e3e42")
+WINDOW_BORDER = QColor("#3d3d3d")
+CHECKBOX_BORDER = QColor("#6a6a6a")
+ACCENT = QColor("#5865F2")
+ACCENT_HOVER = QColor("#4752c4")
+ACCENT_PRESSED = QColor("#3c45a5")
+DANGER = QColor("#ff5252")
+WHITE = QColor("white")
+
+# Priority colors as (normal, hover)
+PRIORITY_COLORS = {
+    Priority.HIGH: (QColor("#ff5252"), QColor("#ff7070")),
+    Priority.MEDIUM: (QColor("#ffc107"), QColor("#ffcd38")),
+    Priority.LOW: (QColor("#4caf50"), QColor("#6abe6d")),
+}
+
+
+def _priority_rules():
+    # Text of the new-task priority selector takes the priority's color
+    return "\n".join(
+        f'QComboBox#priorityCombo[priority="{priority.label}"] {{ color: {colors[0].name()}; }}'
+        for priority, colors in PRIORITY_COLORS.items())
+
+
+STYLESHEET = f"""
+QMainWindow {{
+    background-color: {BACKGROUND.name()};
+    border-radius: 10px;
+    border: 1px solid {WINDOW_BORDER.name()};
+}}
+/* Only the task names stand out in the minimalist view */
+QMainWindow[minimal="true"] {{
+    border-color: {BACKGROUND.name()};
+}}
+
+/* Dark theme for everything in the window */
+#centralWidget, #centralWidget * {{
+    background-color: {BACKGROUND.name()};
+    color: {TEXT.name()};
+    border-radius: 10px;
+}}
+QDialog#archiveDialog, QDialog#archiveDialog * {{
+    background-color: {BACKGROUND.name()};
+    color: {TEXT.name()};
+}}
+
+QLabel#titleLabel {{
+    color: {TEXT.name()};
+    font-family: '{FONT_FAMILY}';
+    font-size: 18px;
+    font-weight: bold;
+}}
+
+QPushButton#closeButton, QPushButton#minimizeButton {{
+    background-color: transparent;
+    color: {MUTED.name()};
+    border: none;
+    font-size: 14px;
+}}
+QPushButton#closeButton:hover {{
+    color: {DANGER.name()};
+}}
+QPushButton#minimizeButton:hover {{
+    color: {ACCENT.name()};
+}}
+
+QComboBox#priorityCombo {{
+    background-color: {BACKGROUND.name()};
+    color: {TEXT.name()};
+    border: 1px solid {BORDER.name()};
+    border-radius: 6px;
+    padding: 2px 10px;
+    font-family: '{FONT_FAMILY}';
+    font-size: 12px;
+    min-width: 80px;
+    max-width: 80px;
+}}
+QComboBox#priorityCombo:hover {{
+    border: 1px solid {ACCENT.name()};
+}}
+{_priority_rules()}
+
+QComboBox#priorityCombo::drop-down, QComboBox#sortCombo::drop-down {{
+    border: none;
+    width: 20px;
+}}
+QComboBox#sortCombo::drop-down {{
+    width: 12px;
+}}
+QComboBox#priorityCombo QAbstractItemView, QComboBox#sortCombo QAbstractItemView {{
+    background-color: {BACKGROUND.name()};
+    color: {TEXT.name()};
+    border: 1px solid {BORDER.name()};
+    selection-background-color: {ACCENT.name()};
+    border-radius: 6px;
+}}
+QComboBox#sortCombo QAbstractItemView {{
+    border-radius: 4px;
+}}
+
+QLineEdit#taskInput {{
+    background-color: {BACKGROUND.name()};
+    border: 1px solid {BORDER.name()};
+    border-radius: 6px;
+    color: {TEXT.name()};
+    padding: 2px 10px;
+    font-family: '{FONT_FAMILY}';
+    font-size: 13px;
+}}
+QLineEdit#taskInput:focus {{
+    border: 1px solid {ACCENT.name()};
+}}
+
+QPushButton#addButton {{
+    background-color: {ACCENT.name()};
+    color: white;
+    border: none;
+    border-radius: 6px;
+    padding: 2px 12px;
+    font-family: '{FONT_FAMILY}';
+    font-size: 13px;
+    font-weight: bold;
+}}
+QPushButton#addButton:hover {{
+    background-color: {ACCENT_HOVER.name()};
+}}
+QPushButton#addButton:pressed {{
+    background-color: {ACCENT_PRESSED.name()};
+}}
+
+QLabel#sortLabel {{
+    color: {MUTED.name()};
+    font-family: '{FONT_FAMILY}';
+    font-size: 11px;
+}}
+
+QComboBox#sortCombo {{
+    background-color: transparent;
+    color: {TEXT.name()};
+    border: none;
+    padding: 0px 5px;
+    font-family: '{FONT_FAMILY}';
+    font-size: 11px;
+}}
+QComboBox#sortCombo:hover {{
+    color: {ACCENT.name()};
+}}
+
+QLineEdit#searchInput, QLineEdit#filterInput {{
+    background-color: {BACKGROUND.name()};
+    border: 1px solid {BORDER.name()};
+    border-radius: 6px;
+    color: {TEXT.name()};
+    padding: 0px 8px;
+    font-family: '{FONT_FAMILY}';
+    font-size: 11px;
+}}
+QLineEdit#searchInput:focus, QLineEdit#filterInput:focus {{
+    border: 1px solid {ACCENT.name()};
+}}
+
+QListView#taskList {{
+    background-color: {BACKGROUND.name()};
+    border: none;
+    outline: none;
+    padding: 2px;
+}}
+#taskList QScrollBar:vertical {{
+    border: none;
+    background: {BACKGROUND.name()};
+    width: 8px;
+    margin: 0px;
+}}
+#taskList QScrollBar::handle:vertical {{
+    background-color: {BORDER.name()};
+    border-radius: 4px;
+    min-height: 20px;
+}}
+#taskList QScrollBar::handle:vertical:hover {{
+    background-color: {ACCENT.name()};
+}}
+#taskList QScrollBar::add-line:vertical, #taskList QScrollBar::sub-line:vertical {{
+    height: 0px;
+}}
+#taskList QScrollBar::add-page:vertical, #taskList QScrollBar::sub-page:vertical {{
+    background: none;
+}}
+
+QListWidget#archiveList {{
+    border: 1px solid {BORDER.name()};
+    border-radius: 6px;
+    outline: none;
+    font-family: '{FONT_FAMILY}';
+    font-size: 12px;
+}}
+QListWidget#archiveList::item {{
+    padding: 4px 6px;
+}}
+QListWidget#archiveList::item:selected {{
+    background-color: {CARD_HOVER.name()};
+    color: {TEXT.name()};
+}}
+
+QDateEdit#archiveDate {{
+    border: 1px solid {BORDER.name()};
+    border-radius: 6px;
+    padding: 2px 6px;
+    font-family: '{FONT_FAMILY}';
+    font-size: 11px;
+}}
+
+QMenu#priorityMenu {{
+    background-color: {BACKGROUND.name()};
+    color: {TEXT.name()};
+    border: 1px solid {BORDER.name()};
+    padding: 5px;
+    border-radius: 6px;
+}}
+QMenu#priorityMenu::item {{
+    padding: 5px 15px;
+}}
+QMenu#priorityMenu::item:selected {{
+    background-color: {CARD_HOVER.name()};
+}}
+QMenu#priorityMenu::separator {{
+    height: 1px;
+    background-color: {BORDER.name()};
+    margin: 4px 6px;
+}}
+
+QLabel#dateLabel {{
+    color: {MUTED.name()};
+    font-family: '{FONT_FAMILY}';
+    font-size: 10px;
+}}
+
+QLabel#perfLabel {{
+    color: {ACCENT.name()};
+    font-family: '{FONT_FAMILY}';
+    font-size: 10px;
+}}
+
+QLabel#saveErrorLabel {{
+    color: {DANGER.name()};
+    font-family: '{FONT_FAMILY}';
+    font-size: 10px;
+}}
+
+QPushButton#clearButton {{
+    background-color: transparent;
+    color: {MUTED.name()};
+    border: none;
+    font-family: '{FONT_FAMILY}';
+    font-size: 10px;
+    padding: 3px 8px;
+}}
+QPushButton#clearButton:hover {{
+    color: {ACCENT.name()};
+    text-decoration: underline;
+}}
+"""
+
+
+_checkmark = None
+
+
+def checkmark():
+    """The checkmark drawn in checked checkboxes, rendered once per process.
+
+    Needs a QApplication, like every QPixmap.
+    """
+    global _checkmark
+    if _checkmark is None:
+        pixmap = QPixmap(12, 12)
+        pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        pen = QPen(WHITE)
+        pen.setWidth(2)
+        painter.setPen(pen)
+        painter.drawLine(2, 6, 5, 9)
+        painter.drawLine(5, 9, 10, 3)
+        painter.end()
+
+        _checkmark = pixmap
+    return _checkmark
+
+
+def install(app):
+    app.setStyleSheet(STYLESHEET)
+
+
+def set_state(widget, name, value):
+    """Set a dynamic property used by the stylesheet and re-polish the widget."""
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+    widget.update()
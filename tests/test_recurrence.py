@@ -0,0 +1,17 @@
+from focused_tasks.recurrence import RecurrenceScheduler
+from focused_tasks.task import Task
+from focused_tasks.task_store import TaskStore
+
+
+def test_spawn_due_leaves_unparsable_rules_alone():
+    store = TaskStore([Task(1, "water plants", created_at=100, recurrence="daily", next_at=200),
+                       Task(2, "odd one", created_at=100, recurrence="every fortnight-ish", next_at=200)])
+    scheduler = RecurrenceScheduler(store)
+    scheduler.rebuild()
+    store.subscribe(scheduler.on_tasks_changed)
+
+    spawned_from, instances = scheduler.spawn_due(now=300)
+    assert spawned_from == [1]
+    assert [(task.text, task.recurrence) for task in instances] == [("water plants", "daily")]
+    assert store.get(1).recurrence is None
+    assert (store.get(2).recurrence, store.get(2).next_at) == ("every fortnight-ish", 200)
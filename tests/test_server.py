@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from focused_tasks.server import MAX_BODY, ApiError, ApiServer, Request, TaskApi, check_request
+from focused_tasks.task import Task
+from focused_tasks.task_store import TaskStore
+
+
+def read_request(data):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await ApiServer(None)._read_request(reader)
+
+    return asyncio.run(read())
+
+
+def test_parse_request_with_body():
+    request = read_request(b"POST /tasks/12?sort=date&search=milk%20bread HTTP/1.1\r\n"
+                           b"Host: localhost:8765\r\n"
+                           b"Content-Type: application/json\r\n"
+                           b"Content-Length: 16\r\n"
+                           b"\r\n"
+                           b'{"text": "milk"}')
+    assert request.method == "POST"
+    assert request.path == "/tasks/12"
+    assert request.query == {"sort": "date", "search": "milk bread"}
+    assert request.headers["host"] == "localhost:8765"
+    assert request.json() == {"text": "milk"}
+
+
+def test_parse_request_without_body():
+    request = read_request(b"get /tasks HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    assert request.method == "GET"
+    assert request.body == b""
+
+
+def test_end_of_connection_is_no_request():
+    assert read_request(b"") is None
+
+
+@pytest.mark.parametrize("data", [
+    b"GET /tasks\r\n\r\n",
+    b"GET /tasks HTTP/1.1\r\nContent-Length: many\r\n\r\n",
+])
+def test_malformed_request(data):
+    with pytest.raises(ApiError) as error:
+        read_request(data)
+    assert error.value.status == 400
+
+
+def test_body_too_large():
+    with pytest.raises(ApiError) as error:
+        read_request(b"POST /tasks HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY + 1))
+    assert error.value.status == 413
+
+
+def test_truncated_body():
+    with pytest.raises(asyncio.IncompleteReadError):
+        read_request(b"POST /tasks HTTP/1.1\r\nContent-Length: 10\r\n\r\n{}")
+
+
+@pytest.mark.parametrize("headers, body, status", [
+    ({"host": "localhost:8765"}, b"", None),
+    ({"host": "127.0.0.1"}, b"", None),
+    ({"host": "example.com"}, b"", 403),
+    ({"host": "localhost", "content-type": "text/plain"}, b"{}", 415),
+    ({"host": "localhost", "content-type": "application/json; charset=utf-8"}, b"{}", None),
+])
+def test_check_request(headers, body, status):
+    response = check_request(Request("POST", "/tasks", headers=headers, body=body))
+    assert (response and response.status) == status
+
+
+def test_read_only_api_refuses_changes():
+    api = TaskApi(TaskStore([Task(1, "milk")]))
+    api.read_only = "tasks.json is damaged"
+    assert api.handle(Request("GET", "/tasks/1")).status == 200
+    assert api.handle(Request("DELETE", "/tasks/1")).status == 503
+    assert 1 in api.store
@@ -0,0 +1,241 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from focused_tasks.storage import (BinaryJournalStorage, JournalStorage, JsonStorage, SqliteStorage,
+                                   write_json_tasks)
+from focused_tasks.task import Priority, Task
+
+
+def open_storage(kind, directory):
+    path = str(directory)
+    if kind == "json":
+        return JsonStorage(os.path.join(path, "tasks.json"))
+    if kind == "journal":
+        return JournalStorage(os.path.join(path, "tasks.snapshot.json"), os.path.join(path, "tasks.journal"),
+                              os.path.join(path, "tasks.json"))
+    if kind == "binary":
+        return BinaryJournalStorage(os.path.join(path, "tasks.snapshot.bin"),
+                                    os.path.join(path, "tasks.bin.journal"), os.path.join(path, "tasks.json"))
+    return SqliteStorage(os.path.join(path, "tasks.db"), os.path.join(path, "tasks.json"))
+
+
+def stored(storage):
+    return sorted((task.to_dict() for task in storage.load()), key=lambda task: task["id"])
+
+
+def as_dicts(tasks):
+    return sorted((task.to_dict() for task in tasks), key=lambda task: task["id"])
+
+
+def sample_tasks():
+    return [
+        Task(1, "buy milk"),
+        Task(2, "write report", True, Priority.HIGH, 1_700_000_100, tags=("work",), project="q3"),
+        Task(3, "water plants", priority=Priority.MEDIUM, created_at=1_700_000_200,
+             recurrence="every 3 days", next_at=1_700_259_400, due_at=1_700_172_800),
+        Task(4, "ünïcode ✓ text\nover two lines"),
+    ]
+
+
+BACKENDS = ["json", "journal", "binary", "sqlite"]
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_round_trip(tmp_path, kind):
+    storage = open_storage(kind, tmp_path)
+    assert storage.load() == []
+    tasks = sample_tasks()
+    storage.apply([("add", task) for task in tasks])
+    tasks[0].completed = True
+    tasks[0].priority = Priority.HIGH
+    storage.apply([("update", tasks[0]), ("delete", 2)])
+    storage.close()
+
+    expected = as_dicts([tasks[0], tasks[2], tasks[3]])
+    storage = open_storage(kind, tmp_path)
+    assert stored(storage) == expected
+    storage.close()
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_first_run_reads_tasks_json(tmp_path, kind):
+    tasks = sample_tasks()
+    write_json_tasks(str(tmp_path / "tasks.json"), tasks)
+    storage = open_storage(kind, tmp_path)
+    assert stored(storage) == as_dicts(tasks)
+    storage.close()
+
+
+@pytest.mark.parametrize("kind", ["journal", "binary"])
+def test_journal_drops_torn_tail(tmp_path, kind):
+    storage = open_storage(kind, tmp_path)
+    storage.load()
+    tasks = sample_tasks()
+    storage.apply([("add", task) for task in tasks])
+    storage.close()
+    # A crash in the middle of appending a record
+    with open(storage.log_path, "ab") as file:
+        file.write(b'{"op": "add", "task": {"id": "5", "te')
+
+    storage = open_storage(kind, tmp_path)
+    assert stored(storage) == as_dicts(tasks)
+    storage.apply([("add", Task(6, "after the crash"))])
+    storage.close()
+    storage = open_storage(kind, tmp_path)
+    assert stored(storage) == as_dicts(tasks + [Task(6, "after the crash")])
+    storage.close()
+
+
+@pytest.mark.parametrize("kind", ["journal", "binary"])
+def test_journal_recovers_interrupted_compaction(tmp_path, kind):
+    storage = open_storage(kind, tmp_path)
+    storage.load()
+    tasks = sample_tasks()
+    storage.apply([("add", task) for task in tasks[:2]])
+    storage.close()
+    # Killed after rotating the log, before the new snapshot was in place
+    os.replace(storage.log_path, storage.old_log_path)
+    storage = open_storage(kind, tmp_path)
+    storage.load()
+    storage.apply([("add", task) for task in tasks[2:]])
+    storage.close()
+
+    storage = open_storage(kind, tmp_path)
+    assert stored(storage) == as_dicts(tasks)
+    assert not os.path.exists(storage.old_log_path)
+    storage.close()
+
+
+@pytest.mark.parametrize("kind", ["journal", "binary"])
+def test_journal_compaction(tmp_path, kind):
+    storage = open_storage(kind, tmp_path)
+    storage.load()
+    tasks = sample_tasks()
+    storage.apply([("add", task) for task in tasks])
+    storage.compact(wait=True)
+    storage.apply([("delete", 1)])
+    storage.close()
+
+    assert os.path.exists(storage.snapshot_path)
+    assert not os.path.exists(storage.old_log_path)
+    storage = open_storage(kind, tmp_path)
+    assert stored(storage) == as_dicts(tasks[1:])
+    storage.close()
+
+
+@pytest.mark.parametrize("kind", ["journal", "binary"])
+def test_failed_compaction_keeps_the_log(tmp_path, kind, monkeypatch):
+    storage = open_storage(kind, tmp_path)
+    storage.load()
+    tasks = sample_tasks()
+    storage.apply([("add", task) for task in tasks[:2]])
+
+    def fail(path, tasks):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage, "_write_snapshot_file", fail)
+    storage.compact(wait=True)
+    assert not os.path.exists(storage.old_log_path)
+    monkeypatch.undo()
+    storage.apply([("add", task) for task in tasks[2:]])
+    storage.compact(wait=True)
+    storage.close()
+
+    storage = open_storage(kind, tmp_path)
+    assert stored(storage) == as_dicts(tasks)
+    storage.close()
+
+
+@pytest.mark.parametrize("kind", ["journal", "binary"])
+def test_journal_generations(tmp_path, kind):
+    # Two processes on the same files, one compacting under the other
+    first = open_storage(kind, tmp_path)
+    second = open_storage(kind, tmp_path)
+    first.load()
+    second.load()
+    tasks = sample_tasks()
+
+    first.apply([("add", tasks[0])])
+    assert [(op, task.id) for op, task in second.refresh()] == [("add", 1)]
+    assert second.refresh() == []
+
+    first.compact(wait=True)
+    first.apply([("add", tasks[1]), ("delete", 1)])
+    ops = second.refresh()
+    assert sorted((op, payload if op == "delete" else payload.id) for op, payload in ops) == \
+        [("add", 2), ("delete", 1)]
+
+    # The second process's writes land in the new generation too
+    second.apply([("add", tasks[2])])
+    assert [(op, task.id) for op, task in first.refresh()] == [("add", 3)]
+    first.close()
+    second.close()
+
+    storage = open_storage(kind, tmp_path)
+    assert stored(storage) == as_dicts(tasks[1:3])
+    storage.close()
+
+
+def test_json_ignores_leftover_temporary_file(tmp_path):
+    storage = open_storage("json", tmp_path)
+    storage.load()
+    tasks = sample_tasks()
+    storage.apply([("add", task) for task in tasks])
+    storage.close()
+    # A crash while writing the next version
+    with open(storage.path + ".tmp", "w", encoding="utf-8") as file:
+        file.write('[{"id": "1", "te')
+
+    storage = open_storage("json", tmp_path)
+    assert stored(storage) == as_dicts(tasks)
+    storage.close()
+
+
+def test_sqlite_ignores_uncommitted_transaction(tmp_path):
+    storage = open_storage("sqlite", tmp_path)
+    storage.load()
+    tasks = sample_tasks()
+    storage.apply([("add", task) for task in tasks])
+    storage.close()
+    # Another connection that dies in the middle of a transaction
+    db = sqlite3.connect(str(tmp_path / "tasks.db"))
+    db.execute("BEGIN")
+    db.execute("DELETE FROM tasks")
+    db.close()
+
+    storage = open_storage("sqlite", tmp_path)
+    assert stored(storage) == as_dicts(tasks)
+    storage.close()
+
+
+@pytest.mark.parametrize("kind", ["json", "journal"])
+def test_failed_load_refuses_writes(tmp_path, kind):
+    storage = open_storage(kind, tmp_path)
+    storage.load()
+    storage.apply([("add", task) for task in sample_tasks()])
+    storage.close()
+    path = storage.path if kind == "json" else storage.log_path
+    with open(path, "rb") as file:
+        before = file.read()
+    if kind == "json":
+        with open(path, "wb") as file:
+            file.write(before[:-10])
+        before = before[:-10]
+    else:
+        # A record the loader cannot make a task of
+        with open(path, "ab") as file:
+            file.write(json.dumps({"op": "add", "task": {"text": "no id"}}).encode() + b"\n")
+        with open(path, "rb") as file:
+            before = file.read()
+
+    storage = open_storage(kind, tmp_path)
+    with pytest.raises(Exception):
+        storage.load()
+    with pytest.raises(RuntimeError):
+        storage.apply([("add", Task(9, "not saved"))])
+    storage.close()
+    with open(path, "rb") as file:
+        assert file.read() == before
@@ -0,0 +1,153 @@
+import random
+
+import pytest
+
+from focused_tasks.task import Priority, Task
+from focused_tasks.task_store import SORT_METHODS, SortedView, TaskStore, sort_key_for
+
+
+class RecordingObserver:
+    """Records what a view tells its observer, like a list model would."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name,) + args)
+
+
+def make_task(rnd, task_id):
+    return Task(task_id, rnd.choice(["milk", "Bread", "apples", "bread", "éclair"]),
+                rnd.random() < 0.3, rnd.choice(list(Priority)), 1_700_000_000 + task_id)
+
+
+def check_view(view, tasks):
+    # Order, rows and positions against a brute-force sort
+    expected = sorted(tasks, key=view.sort_key)
+    assert len(view) == len(expected)
+    assert [task.id for task in view] == [task.id for task in expected]
+    for row, task in enumerate(expected):
+        assert view[row].id == task.id
+        assert view.bisect(view.sort_key(task)) == row
+        bucket, offset = view.find(view.sort_key(task))
+        assert view._buckets[bucket][offset].id == task.id
+
+
+@pytest.fixture
+def small_buckets(monkeypatch):
+    # Small buckets so a few hundred tasks split, merge and empty them
+    monkeypatch.setattr(SortedView, "LOAD", 4)
+
+
+@pytest.mark.parametrize("sort_method", SORT_METHODS)
+def test_sorted_view_matches_brute_force(small_buckets, sort_method):
+    rnd = random.Random(sort_method)
+    sort_key = sort_key_for(sort_method)
+    tasks = {task_id: make_task(rnd, task_id) for task_id in range(50)}
+    view = SortedView(sort_key, tasks.values())
+    check_view(view, tasks.values())
+
+    next_id = len(tasks)
+    for step in range(600):
+        action = rnd.random()
+        if action < 0.4 or not tasks:
+            task = make_task(rnd, next_id)
+            next_id += 1
+            tasks[task.id] = task
+            view.insert(task)
+        elif action < 0.6:
+            task = tasks.pop(rnd.choice(list(tasks)))
+            assert view.remove(sort_key(task)) is task
+        elif action < 0.7:
+            removed = rnd.sample(list(tasks), min(len(tasks), rnd.randrange(1, 12)))
+            view.remove_many([sort_key(tasks.pop(task_id)) for task_id in removed])
+        else:
+            task = tasks[rnd.choice(list(tasks))]
+            position = view.find(sort_key(task))
+            task.completed = not task.completed
+            task.text = rnd.choice(["milk", "zebra", "Apples"])
+            view.update(task, position)
+        if step % 50 == 0:
+            check_view(view, tasks.values())
+    check_view(view, tasks.values())
+
+
+def test_merge_matches_brute_force(small_buckets):
+    rnd = random.Random(1)
+    sort_key = sort_key_for("Priority")
+    first = [make_task(rnd, task_id) for task_id in range(30)]
+    second = [make_task(rnd, task_id) for task_id in range(30, 100)]
+    view = SortedView(sort_key, first)
+    view.merge(second)
+    check_view(view, first + second)
+
+
+def test_remove_missing_key_returns_none():
+    view = SortedView(sort_key_for("Priority"), [Task(1, "a")])
+    assert view.remove(sort_key_for("Priority")(Task(2, "b"))) is None
+    assert len(view) == 1
+
+
+def test_observer_is_told_about_rows():
+    sort_key = sort_key_for("Alphabetical")
+    view = SortedView(sort_key, [Task(1, "b"), Task(2, "d")])
+    observer = RecordingObserver()
+    view.observer = observer
+    view.insert(Task(3, "c"))
+    view.remove(sort_key(Task(1, "b")))
+    assert observer.calls == [("begin_insert", 1), ("end_insert", 1),
+                              ("begin_remove", 0, 0), ("end_remove", 0, 0)]
+
+
+def test_hold_reports_one_reset():
+    view = SortedView(sort_key_for("Priority"))
+    observer = RecordingObserver()
+    view.observer = observer
+    view.hold()
+    view.hold()
+    for task_id in range(5):
+        view.insert(Task(task_id, "task"))
+    view.release()
+    assert observer.calls == [("begin_reset",)]
+    view.release()
+    assert observer.calls == [("begin_reset",), ("end_reset",)]
+    assert view.observer is observer
+
+
+def test_release_resets_an_observer_attached_during_hold():
+    view = SortedView(sort_key_for("Priority"))
+    old, new = RecordingObserver(), RecordingObserver()
+    view.observer = old
+    view.hold()
+    view.observer = new
+    assert view.observer is new
+    view.insert(Task(1, "task"))
+    view.release()
+    # The reset ends on the observer it began on, and the new one starts over
+    assert old.calls == [("begin_reset",), ("end_reset",)]
+    assert new.calls == [("begin_reset",), ("end_reset",)]
+    assert view.observer is new
+
+
+def test_release_after_observer_detached_during_hold():
+    view = SortedView(sort_key_for("Priority"))
+    observer = RecordingObserver()
+    view.observer = observer
+    view.hold()
+    view.observer = None
+    view.insert(Task(1, "task"))
+    view.release()
+    assert observer.calls == [("begin_reset",), ("end_reset",)]
+    assert view.observer is None
+
+
+def test_store_views_follow_bulk_changes(small_buckets):
+    rnd = random.Random(2)
+    store = TaskStore(make_task(rnd, task_id) for task_id in range(40))
+    views = [store.view(sort_method) for sort_method in SORT_METHODS]
+    store.add_many([make_task(rnd, task_id) for task_id in range(40, 80)])
+    store.update_many(rnd.sample(range(80), 30), completed=True)
+    store.update_many(rnd.sample(range(80), 10), text="renamed")
+    store.delete_many(rnd.sample(range(80), 25))
+    for view in views:
+        check_view(view, list(store))
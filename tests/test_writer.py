@@ -0,0 +1,115 @@
+import pytest
+
+from focused_tasks.storage import BackgroundWriter, JsonStorage
+from focused_tasks.task import Task
+
+
+class FlakyStorage(JsonStorage):
+    """JSON storage whose next `failures` writes fail."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.failures = 0
+        self.writes = []
+
+    def _write(self, ops):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.writes.append(ops)
+        super()._write(ops)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = FlakyStorage(str(tmp_path / "tasks.json"))
+    storage.load()
+    return storage
+
+
+@pytest.fixture
+def writer(storage, monkeypatch):
+    monkeypatch.setattr(BackgroundWriter, "RETRY_DELAY", 0.05)
+    errors = []
+    writer = BackgroundWriter(storage, delay=0.01, on_error=errors.append)
+    writer.errors = errors
+    yield writer
+    writer.close()
+
+
+def texts(storage):
+    # What is on disk, rather than the in-memory copy a failed write changed
+    return {task.id: task.text for task in JsonStorage(storage.path).load()}
+
+
+def test_flush_writes_everything(storage, writer):
+    writer.submit([("add", Task(1, "a")), ("add", Task(2, "b"))])
+    writer.submit([("update", Task(1, "c")), ("delete", 2)])
+    writer.flush()
+    assert texts(storage) == {1: "c"}
+    assert not writer.pending()
+    assert writer.errors == []
+
+
+def test_failed_write_is_retried(storage, writer):
+    storage.failures = 1
+    writer.submit([("add", Task(1, "a"))])
+    writer.flush()
+    # flush() returns once the write has failed, which stays queued
+    assert texts(storage) == {}
+    assert isinstance(writer.errors[0], OSError)
+    assert writer.pending_ops()[1][0] == "add"
+
+    writer.flush()
+    assert texts(storage) == {1: "a"}
+    assert writer.errors[1:] == [None]
+
+
+def test_requeued_batch_goes_under_newer_changes(storage, writer):
+    storage.failures = 1
+    writer.submit([("add", Task(1, "a")), ("add", Task(2, "b"))])
+    writer.flush()
+    writer.submit([("update", Task(1, "newer")), ("delete", 2), ("add", Task(3, "c"))])
+    writer.flush()
+    assert texts(storage) == {1: "newer", 3: "c"}
+    # The failed batch and the newer changes went out as one write
+    assert len(storage.writes) == 1
+
+
+def test_failed_before_drops_its_operations(storage, writer):
+    writer.submit([("add", Task(1, "a")), ("add", Task(2, "b"))])
+    writer.flush()
+
+    def fail():
+        raise OSError("archive disk full")
+
+    errors = []
+    with writer.before(fail, [1], errors.append):
+        writer.submit([("delete", 1), ("delete", 2)])
+    writer.flush()
+    assert texts(storage) == {1: "a"}
+    assert [str(e) for e in errors] == ["archive disk full"]
+
+
+def test_after_waits_for_a_failed_write(storage, writer):
+    calls = []
+    storage.failures = 1
+    writer.submit([("add", Task(1, "a"))])
+    writer.after(lambda: calls.append(texts(storage)))
+    writer.flush()
+    assert calls == []
+    writer.flush()
+    writer.flush()
+    assert calls == [{1: "a"}]
+
+
+def test_read_only_writer_drops_and_rejects(storage, writer):
+    storage.failures = 1
+    writer.submit([("add", Task(1, "a"))])
+    writer.flush()
+    writer.set_read_only("tasks.json is damaged")
+    with pytest.raises(RuntimeError, match="read-only"):
+        writer.submit([("add", Task(2, "b"))])
+    writer.flush()
+    assert texts(storage) == {}
+    assert not writer.pending()